@@ -8,13 +8,28 @@ import time
 import math
 import json
 
-from typing import List, Tuple, Optional, Union
+from typing import Dict, List, Tuple, Optional, Union
 from collections import Counter, defaultdict
 
 from storage.HeapFile import HeapFile
+from storage.ColumnarFile import COLUMN_SUFFIX, ColumnarFile
+from storage.SlottedFile import SlottedFile
 from storage.Record import Record
 from storage.Sound import Sound
 from storage.HistogramFile import HistogramFile
+from storage.HistogramMatrix import HistogramMatrix
+from storage.BufferPool import get_buffer_pool
+from storage.PKLocator import PKLocator
+from storage.PKBloomFilter import PKBloomFilter
+from storage.SideFileCache import get_side_files
+from storage.ZoneMap import ZoneMap
+from storage.ValidityBitmap import ValidityBitmap
+from storage.ParallelScan import get_parallel_scan
+from storage.WriteAheadLog import get_wal, wal_remove
+from storage.Catalog import get_catalog
+from storage.ExtentAllocator import get_extents
+from storage.RowCache import get_row_cache
+from storage.ColumnDictionary import DICT_SUFFIX, ColumnDictionary
 from indexing.SequentialIndex import SequentialIndex
 from indexing.ExtendibleHashIndex import ExtendibleHashIndex
 from indexing.BPlusTreeIndex import BPlusTreeIndex, BPlusTreeIndexWrapper
@@ -23,6 +38,7 @@ from indexing.RTreeIndex import RTreeIndex
 from indexing.Spimi import SPIMIIndexer
 from indexing.utils_spimi import preprocess
 import pickle
+from contextlib import contextmanager
 
 # Ruta base para almacenamiento de tablas
 base_dir = os.path.dirname(os.path.abspath(__file__))
@@ -51,11 +67,210 @@ def check_table_exists(table_name: str):
 def get_table_schema(table_name: str):
     if not check_table_exists(table_name):
         raise Exception(f"Table {table_name} does not exist")
-    table_path = _table_path(table_name)
-    heap = HeapFile(
-        table_path
-    )  # TODO: load schema from file instead of creating heapfile
-    return heap.schema
+    return get_catalog().schema(_table_path(table_name))[0]
+
+
+# =============================================================================
+# 📚 Catálogo: esquemas e índices abiertos
+# =============================================================================
+
+_INDEX_CLASSES = {
+    "seq": SequentialIndex,
+    "hash": ExtendibleHashIndex,
+    "btree": BPlusTreeIndexWrapper,
+    "rtree": RTreeIndex,
+}
+
+
+def _index(table_path: str, field_name: str, idx_type: str):
+    """Objeto índice abierto del catálogo (se construye una vez por DDL)."""
+    return get_catalog().index(table_path, field_name, idx_type, _INDEX_CLASSES[idx_type])
+
+
+@contextmanager
+def _ddl(table_path: Optional[str] = None):
+    """Envuelve un DDL: checkpoint del WAL (el DDL no pasa por el log) e
+    invalidación del catálogo antes (cierra los índices abiertos) y después
+    (lo cacheado durante el DDL ya no vale)."""
+    get_wal().checkpoint()
+    get_catalog().invalidate(table_path)
+    try:
+        yield
+    finally:
+        get_catalog().invalidate(table_path)
+
+
+def catalog_version() -> int:
+    """Sube con cada DDL; sirve para invalidar cachés que dependan del esquema."""
+    return get_catalog().version
+
+
+# =============================================================================
+# 💾 Buffer pool compartido
+# =============================================================================
+
+
+def configure_buffer_pool(capacity_bytes: int = None, slots_per_page: int = None) -> None:
+    """Ajusta el límite de memoria (bytes) y/o los slots por página del pool."""
+    get_buffer_pool().configure(capacity_bytes, slots_per_page)
+
+
+def buffer_pool_stats() -> dict:
+    """Contadores de aciertos/fallos del pool para dimensionarlo."""
+    return get_buffer_pool().stats()
+
+
+def flush_buffers(table_name: Optional[str] = None) -> None:
+    """Escribe a disco las páginas sucias de una tabla (o de todas), sus zone maps,
+    bitmaps, PKLocators y filtros de Bloom."""
+    pool = get_buffer_pool()
+    if table_name is None:
+        pool.flush()
+        ZoneMap.save_all()
+        ValidityBitmap.save_all()
+        PKLocator.save_all()
+        PKBloomFilter.save_all()
+    else:
+        pool.flush(_table_path(table_name) + ".dat")
+        ZoneMap.save_open(_table_path(table_name) + ".zonemap")
+        ValidityBitmap.save_open(_table_path(table_name) + ".valid")
+        PKLocator.save_open(_table_path(table_name) + ".pk.loc")
+        PKBloomFilter.save_open(_table_path(table_name) + ".pk.bloom")
+
+
+def configure_row_cache(max_rows: int) -> None:
+    """Filas por PK que se guardan decodificadas (0 la desactiva)."""
+    get_row_cache().configure(max_rows)
+
+
+def row_cache_stats() -> dict:
+    """Aciertos/fallos de la caché de filas para dimensionarla."""
+    return get_row_cache().stats()
+
+
+def configure_extents(extent_bytes: int = None, enabled: bool = None) -> None:
+    """Tamaño de los extents con que crecen heaps e índices (o desactivar la reserva)."""
+    get_extents().configure(extent_bytes, enabled)
+
+
+def extent_stats() -> dict:
+    """Extents reservados y bytes recortados al cerrar / VACUUM."""
+    return get_extents().stats()
+
+
+def configure_wal(
+    group_size: int = None,
+    group_delay: float = None,
+    checkpoint_bytes: int = None,
+    enabled: bool = None,
+) -> None:
+    """Transacciones por fsync del log, espera máxima y tamaño que dispara un checkpoint."""
+    get_wal().configure(group_size, group_delay, checkpoint_bytes, enabled)
+
+
+def wal_stats() -> dict:
+    """Commits, fsyncs y bytes del WAL para dimensionar el group commit."""
+    return get_wal().stats()
+
+
+def checkpoint() -> None:
+    """Baja todo a disco y vacía el WAL."""
+    get_wal().checkpoint()
+
+
+def _tables_of(paths) -> List[str]:
+    """Tablas (ruta sin extensión) cuyo archivo de slots está entre `paths`."""
+    tables = set()
+    for path in paths:
+        if path.endswith(".dat"):
+            table_path = path[: -len(".dat")]
+        elif path.endswith(COLUMN_SUFFIX):
+            table_path = path.rsplit(".", 2)[0]  # <tabla>.<columna>.col
+        else:
+            continue  # archivo lateral o de índice
+        if os.path.exists(table_path + ".schema.json"):
+            tables.add(table_path)
+    return sorted(tables)
+
+
+def _rebuild_derived(table_path: str) -> None:
+    """Descarta lo que se deriva del heap de una tabla cuyos slots cambiaron por
+    fuera de HeapFile (recuperación o rollback del WAL): se reconstruye al usarse."""
+    get_catalog().invalidate(table_path)  # cierra el R-Tree y reabre los demás índices
+    PKLocator.discard(f"{table_path}.pk.loc", remove_file=True)
+    PKBloomFilter.discard(f"{table_path}.pk.bloom", remove_file=True)
+    ZoneMap.discard(f"{table_path}.zonemap", remove_file=True)
+    ValidityBitmap.discard(f"{table_path}.valid", remove_file=True)
+    SlottedFile.discard(f"{table_path}.dat")
+    for filename in glob.glob(ColumnDictionary.filename_for(glob.escape(table_path), "*")):
+        ColumnDictionary.discard(filename)  # vuelve a leerse del archivo
+    get_row_cache().invalidate_table(table_path)
+    # el R-Tree no pasa por el log: se reconstruye desde el heap ya repuesto
+    heap = HeapFile(table_path)
+    for field_name, idx_type, _, _ in list(_secondary_indexes(table_path, heap.schema)):
+        if idx_type == "rtree":
+            for idx_file in glob.glob(f"{table_path}.{field_name}.rtree.*"):
+                os.remove(idx_file)
+            RTreeIndex.build_index(table_path, heap.extract_index, field_name)
+
+
+def _recover_from_wal() -> None:
+    """Rehace lo confirmado en el WAL al iniciar y descarta lo derivado de las tablas tocadas."""
+    touched = get_wal().recover()
+    for table_path in _tables_of(touched):
+        _rebuild_derived(table_path)
+        print(f"Tabla '{os.path.basename(table_path)}' recuperada desde el WAL.")
+    if touched:
+        get_catalog().invalidate()
+
+
+_started = False
+
+
+def startup() -> None:
+    """Deja las tablas como quedaron tras el último commit (recupera el WAL).
+
+    La llama el servidor o la CLI al arrancar, y cada `Database()`; sólo la
+    primera vez del proceso hace algo.
+    """
+    global _started
+    if not _started:
+        _started = True
+        _recover_from_wal()
+
+
+def _after_rollback(touched) -> None:
+    """Tras deshacer una sentencia fallida: olvida lo cacheado de las tablas repuestas."""
+    for table_path in _tables_of(touched):
+        _rebuild_derived(table_path)
+    for path in touched:
+        if path.endswith(DICT_SUFFIX):
+            ColumnDictionary.discard(path)
+    get_catalog().invalidate()  # los heaps abiertos de las sesiones se reabren
+
+
+get_wal().on_rollback(_after_rollback)
+
+
+def configure_parallel_scan(workers: int = None, min_slots: int = None) -> None:
+    """Procesos del scan paralelo y slots mínimos para usarlo (menos = scan serial)."""
+    get_parallel_scan().configure(workers, min_slots)
+
+
+def configure_pk_bloom(fpr: float, table_name: Optional[str] = None) -> None:
+    """Fija la tasa de falsos positivos del filtro de Bloom de PK.
+
+    Sin `table_name` aplica a los filtros que se construyan desde ahora; con
+    una tabla, además reconstruye su filtro con la nueva tasa.
+    """
+    PKBloomFilter.configure(fpr)
+    if table_name is not None:
+        _rebuild_pk_bloom(HeapFile(_table_path(table_name)))
+
+
+def _rebuild_pk_bloom(heap: HeapFile) -> None:
+    if heap.primary_key is not None:
+        heap.pk_bloom.rebuild(key for key, _ in heap.extract_index(heap.primary_key))
 
 
 # =============================================================================
@@ -63,16 +278,41 @@ def get_table_schema(table_name: str):
 # =============================================================================
 
 
+# Formatos de almacenamiento de tabla (CREATE TABLE ... USING COLUMNAR | SLOTTED)
+_STORAGE_CLASSES = {
+    "heap": HeapFile,
+    "columnar": ColumnarFile,
+    "slotted": SlottedFile,
+}
+
+
 def create_table(
-    table_name: str, schema: List[Tuple[str, str]], primary_key: str
+    table_name: str,
+    schema: List[Tuple[str, str]],
+    primary_key: str,
+    storage: str = "heap",
+    encodings: Optional[Dict[str, str]] = None,
 ) -> None:
-    for field_name, field_type in schema:
-        if field_type.upper() == "SOUND":
-            HistogramFile.build_file(_table_path(table_name), field_name)
-    HeapFile.build_file(_table_path(table_name), schema, primary_key)
+    """Crea la tabla; `encodings` (campo -> "dict") guarda esos VARCHAR con diccionario
+    y (campo -> "zlib" / "lzma") comprime los textos de esas columnas TEXT."""
+    if storage not in _STORAGE_CLASSES:
+        raise ValueError(f"Almacenamiento '{storage}' no soportado.")
+    with _ddl(_table_path(table_name)):
+        for field_name, field_type in schema:
+            if field_type.upper() == "SOUND":
+                HistogramFile.build_file(_table_path(table_name), field_name)
+        _STORAGE_CLASSES[storage].build_file(
+            _table_path(table_name), schema, primary_key, encodings=encodings
+        )
     print(f"Tabla '{table_name}' creada con éxito.")
 
 
+def dictionary_stats(table_name: str) -> Dict[str, int]:
+    """Valores distintos de cada columna con diccionario (campo -> cantidad)."""
+    heap = HeapFile(_table_path(table_name))
+    return {name: len(dictionary) for name, dictionary in heap.dictionaries.items()}
+
+
 def create_table_with_btree_pk(
     table_name: str,
     schema: List[Tuple[str, str]],
@@ -95,24 +335,37 @@ def create_table_with_hash_pk(
 
 
 def drop_table(table_name: str) -> None:
-    # Eliminar todos los índices asociados
-    drop_all_indexes(table_name)
-
-    table_path = _table_path(table_name)
-    if not os.path.exists(f"{table_path}.dat"):
-        raise FileNotFoundError(f"La tabla '{table_name}' no existe.")
-
-    # Eliminar el archivo principal de la tabla
-    os.remove(f"{table_path}.dat")
-
-    if not os.path.exists(f"{table_path}.schema.json"):
-        raise FileNotFoundError(
-            f"El archivo de esquema de la tabla '{table_name}' no existe."
-        )
-
-    os.remove(f"{table_path}.schema.json")
-
-    print(f"Tabla '{table_name}' eliminada correctamente.")
+    with _ddl(_table_path(table_name)):
+        # Eliminar todos los índices asociados
+        drop_all_indexes(table_name)
+
+        table_path = _table_path(table_name)
+        if not os.path.exists(f"{table_path}.dat"):
+            raise FileNotFoundError(f"La tabla '{table_name}' no existe.")
+
+        # Eliminar el archivo principal de la tabla
+        get_buffer_pool().discard(f"{table_path}.dat")
+        os.remove(f"{table_path}.dat")
+        ColumnarFile.remove_files(table_path)  # archivos .col si la tabla es columnar
+        ColumnDictionary.remove_files(table_path)  # y .dict de columnas codificadas
+        HistogramMatrix.remove_files(table_path)  # y matrices de histogramas de SOUND
+        # handles de lectura abiertos a sus archivos .text / sonido
+        get_side_files().close(f"{table_path}.")
+
+        if not os.path.exists(f"{table_path}.schema.json"):
+            raise FileNotFoundError(
+                f"El archivo de esquema de la tabla '{table_name}' no existe."
+            )
+
+        os.remove(f"{table_path}.schema.json")
+        PKLocator.discard(f"{table_path}.pk.loc", remove_file=True)
+        PKBloomFilter.discard(f"{table_path}.pk.bloom", remove_file=True)
+        ZoneMap.discard(f"{table_path}.zonemap", remove_file=True)
+        ValidityBitmap.discard(f"{table_path}.valid", remove_file=True)
+        get_row_cache().invalidate_table(table_path)
+        get_extents().trim(f"{table_path}.")  # sólo olvida los archivos ya borrados
+
+        print(f"Tabla '{table_name}' eliminada correctamente.")
 
 
 # =============================================================================
@@ -121,98 +374,204 @@ def drop_table(table_name: str) -> None:
 
 
 def insert_record(table_name: str, record: Record) -> int:
-    table_path = _table_path(table_name)
-    heap = HeapFile(table_path)
+    return _insert_record(HeapFile(_table_path(table_name)), record)
+
+
+def _insert_record(heap: HeapFile, record: Record) -> int:
+    with get_wal().transaction():
+        record.values = list(record.values)  # el heap reemplaza TEXT / SOUND por sus offsets
+        offset = heap.insert_record(record)
+        _update_secondary_indexes(heap.table_path, record, offset)
+        return offset
+
+
+def insert_many(table_name: str, records: List[Record]) -> List[int]:
+    """Inserta un lote de registros: una pasada al heap y una por índice."""
+    return _insert_many(HeapFile(_table_path(table_name)), records)
 
-    values = list(record.values)
-    for i, (field_name, field_type) in enumerate(record.schema):
-        if field_type.upper() == "SOUND":
-            sound_path = values[i]
-            if isinstance(sound_path, str):
-                sound_file = Sound(_table_path(table_name), field_name)
-                sound_offset = sound_file.insert(sound_path)
-                values[i] = (sound_offset, -1)  # -1 for histogram offset
-    record.values = list(values)
 
-    offset = heap.insert_record(record)
-    _update_secondary_indexes(table_path, record, offset)
-    return offset
+def _insert_many(heap: HeapFile, records: List[Record]) -> List[int]:
+    with get_wal().transaction():
+        records = list(records)
+        offsets = heap.insert_many(records)
+        _update_secondary_indexes_many(heap.table_path, records, offsets)
+        return offsets
 
 
 def insert_record_free(table_name: str, record: Record) -> int:
     """Esto es de testing (no usar en frontend)"""
-    table_path = _table_path(table_name)
-    heap = HeapFile(table_path)
-    return heap.insert_record_free(record)
+    with get_wal().transaction():
+        table_path = _table_path(table_name)
+        heap = HeapFile(table_path)
+        return heap.insert_record_free(record)
 
 
 def insert_record_hash_pk(table_name: str, record: Record) -> int:
-    table_path = _table_path(table_name)
-    heap = HeapFile(table_path)
+    with get_wal().transaction():
+        table_path = _table_path(table_name)
+        heap = HeapFile(table_path)
 
-    if heap.primary_key is None:
-        raise ValueError(f"La tabla '{table_name}' no tiene clave primaria.")
+        if heap.primary_key is None:
+            raise ValueError(f"La tabla '{table_name}' no tiene clave primaria.")
 
-    pk_idx = [i for i, (n, _) in enumerate(record.schema) if n == heap.primary_key][0]
-    pk_value = record.values[pk_idx]
+        pk_idx = [i for i, (n, _) in enumerate(record.schema) if n == heap.primary_key][0]
+        pk_value = record.values[pk_idx]
 
-    hidx = ExtendibleHashIndex(table_path, heap.primary_key)
-    if hidx.search_record(pk_value):
-        raise ValueError(f"PK duplicada detectada por índice hash: {pk_value}")
+        # el Bloom descarta sin abrir el índice la mayoría de las PK nuevas
+        if pk_value in heap.pk_bloom:
+            hidx = _index(table_path, heap.primary_key, "hash")
+            if hidx.search_record(pk_value):
+                raise ValueError(f"PK duplicada detectada por índice hash: {pk_value}")
 
-    offset = heap.insert_record_free(record)
-    _update_secondary_indexes(table_path, record, offset)
-    return offset
+        offset = heap.insert_record_free(record)
+        _update_secondary_indexes(table_path, record, offset)
+        return offset
 
 
 def insert_record_btree_pk(table_name: str, record: Record) -> int:
-    table_path = _table_path(table_name)
-    heap = HeapFile(table_path)
+    with get_wal().transaction():
+        table_path = _table_path(table_name)
+        heap = HeapFile(table_path)
 
-    if heap.primary_key is None:
-        raise ValueError(f"La tabla '{table_name}' no tiene clave primaria.")
+        if heap.primary_key is None:
+            raise ValueError(f"La tabla '{table_name}' no tiene clave primaria.")
 
-    pk_idx = [i for i, (n, _) in enumerate(record.schema) if n == heap.primary_key][0]
-    pk_value = record.values[pk_idx]
+        pk_idx = [i for i, (n, _) in enumerate(record.schema) if n == heap.primary_key][0]
+        pk_value = record.values[pk_idx]
 
-    btree = BPlusTreeIndexWrapper(table_path, heap.primary_key)
-    if btree.search(pk_value):
-        raise ValueError(f"PK duplicada detectada por índice B+ Tree: {pk_value}")
+        if pk_value in heap.pk_bloom:
+            btree = _index(table_path, heap.primary_key, "btree")
+            if btree.search(pk_value):
+                raise ValueError(f"PK duplicada detectada por índice B+ Tree: {pk_value}")
 
-    offset = heap.insert_record_free(record)
+        offset = heap.insert_record_free(record)
 
-    _update_secondary_indexes(table_path, record, offset)
-    return offset
+        _update_secondary_indexes(table_path, record, offset)
+        return offset
 
 
 def insert_record_rtree_pk(table_name: str, record: Record) -> int:
-    table_path = _table_path(table_name)
-    heap = HeapFile(table_path)
+    with get_wal().transaction():
+        table_path = _table_path(table_name)
+        heap = HeapFile(table_path)
 
-    if heap.primary_key is None:
-        raise ValueError(f"La tabla '{table_name}' no tiene clave primaria.")
+        if heap.primary_key is None:
+            raise ValueError(f"La tabla '{table_name}' no tiene clave primaria.")
 
-    pk_idx = [i for i, (n, _) in enumerate(record.schema) if n == heap.primary_key][0]
-    pk_value = record.values[pk_idx]
+        pk_idx = [i for i, (n, _) in enumerate(record.schema) if n == heap.primary_key][0]
+        pk_value = record.values[pk_idx]
 
-    rtree = RTreeIndex(table_path, heap.primary_key)
-    if rtree.search_record(pk_value):
-        raise ValueError(f"PK duplicada detectada por índice R-Tree: {pk_value}")
+        if pk_value in heap.pk_bloom:
+            rtree = _index(table_path, heap.primary_key, "rtree")
+            if rtree.search_record(pk_value):
+                raise ValueError(f"PK duplicada detectada por índice R-Tree: {pk_value}")
 
-    offset = heap.insert_record_free(record)
+        offset = heap.insert_record_free(record)
 
-    _update_secondary_indexes(table_path, record, offset)
-    return offset
+        _update_secondary_indexes(table_path, record, offset)
+        return offset
 
 
 def delete_record(table_name: str, pk_value):
+    return _delete_record(HeapFile(_table_path(table_name)), pk_value)
+
+
+def _delete_record(heap: HeapFile, pk_value) -> bool:
+    with get_wal().transaction():
+        ok, offset, old_rec = heap.delete_by_pk(pk_value)
+        if not ok:
+            return False
+        _remove_from_secondary_indexes(heap.table_path, old_rec, offset)
+        return True
+
+
+def delete_record_at(table_name: str, offset: int):
+    """Borra el registro del slot `offset`; sirve para tablas sin clave primaria."""
+    return _delete_record_at(HeapFile(_table_path(table_name)), offset)
+
+
+def _delete_record_at(heap: HeapFile, offset: int) -> bool:
+    with get_wal().transaction():
+        ok, old_rec = heap.delete_by_offset(offset)
+        if not ok:
+            return False
+        _remove_from_secondary_indexes(heap.table_path, old_rec, offset)
+        return True
+
+
+def count_records(table_name: str) -> int:
+    """Registros vivos de la tabla, en O(1) vía el bitmap de validez."""
+    return HeapFile(_table_path(table_name)).live_count
+
+
+# =============================================================================
+# 🧹 Compactación (VACUUM)
+# =============================================================================
+
+
+def vacuum_table(table_name: str, return_map: bool = False) -> dict:
+    """Compacta el heap y sus archivos TEXT/SOUND y remapea los índices.
+
+    El índice secuencial se reescribe con el mapa slot viejo -> nuevo; los
+    B+ Tree, hash y R-Tree se reconstruyen desde el heap ya compactado.
+
+    Heap, archivos TEXT/SOUND, índice secuencial, histogramas y el borrado
+    de los demás índices van en una transacción: si algo falla (o el proceso
+    cae) antes del commit, todo vuelve a los RIDs viejos.
+    """
     table_path = _table_path(table_name)
-    heap = HeapFile(table_path)
-    ok, offset, old_rec = heap.delete_by_pk(pk_value)
-    if not ok:
-        return False
-    _remove_from_secondary_indexes(table_path, old_rec, offset)
-    return True
+    if not os.path.exists(f"{table_path}.dat"):
+        raise FileNotFoundError(f"La tabla '{table_name}' no existe.")
+    with _ddl(table_path):
+        heap = HeapFile(table_path)
+        rebuilt = []
+        with get_wal().transaction():
+            offset_map, stats = heap.vacuum()
+            for field_name, idx_type, _, _ in list(_secondary_indexes(table_path, heap.schema)):
+                if idx_type == "seq":
+                    SequentialIndex(table_path, field_name).rebuild_file(offset_map)
+                    continue
+                for idx_file in glob.glob(f"{table_path}.{field_name}.{idx_type}.*"):
+                    wal_remove(idx_file)
+                rebuilt.append((field_name, idx_type))
+
+        # con los RIDs nuevos confirmados, los índices borrados se arman de nuevo
+        for field_name, idx_type in rebuilt:
+            if idx_type == "btree":
+                BPlusTreeIndex.build_index(table_path, heap.extract_index, field_name)
+            elif idx_type == "hash":
+                ExtendibleHashIndex.build_index(table_path, heap.extract_index, field_name)
+            elif idx_type == "rtree":
+                RTreeIndex.build_index(table_path, heap.extract_index, field_name)
+        heap.flush()
+        get_wal().checkpoint()  # las copias de undo retienen el espacio de los archivos viejos
+        get_extents().trim(f"{table_path}.")  # cola reservada de los índices reconstruidos
+
+        print(
+            f"VACUUM '{table_name}': {stats['slots_before']} -> {stats['slots_after']} slots, "
+            f"{stats['heap_bytes_reclaimed'] + stats['side_bytes_reclaimed']} bytes recuperados."
+        )
+        if return_map:
+            stats["offset_map"] = offset_map
+        return stats
+
+
+def compact_side_files(table_name: str, columns: Optional[List[str]] = None) -> Dict[str, int]:
+    """Compacta los archivos TEXT/SOUND de la tabla (o sólo de `columns`).
+
+    A diferencia de VACUUM los registros no se mueven, así que los índices
+    quedan como están; devuelve campo -> bytes recuperados.
+    """
+    table_path = _table_path(table_name)
+    if not os.path.exists(f"{table_path}.dat"):
+        raise FileNotFoundError(f"La tabla '{table_name}' no existe.")
+    with _ddl(table_path):
+        with get_wal().transaction():  # archivos nuevos y offsets del heap, juntos
+            reclaimed = HeapFile(table_path).compact_side_files(columns)
+        get_wal().checkpoint()
+        for field_name, n_bytes in reclaimed.items():
+            print(f"COMPACT '{table_name}.{field_name}': {n_bytes} bytes recuperados.")
+        return reclaimed
 
 
 # =============================================================================
@@ -227,44 +586,51 @@ def search_by_field(table_name: str, field_name: str, value, crude_data=False) -
 def search_seq_idx(table_name: str, field_name: str, field_value):
     table_path = _table_path(table_name)
     heap = HeapFile(table_path)
-    seq_idx = SequentialIndex(table_path, field_name)
-    return [
-        heap.fetch_record_by_offset(r.offset)
-        for r in seq_idx.search_record(field_value)
-    ]
+    cached = heap.cached_rows(field_name, field_value)
+    if cached is not None:
+        return cached
+    seq_idx = _index(table_path, field_name, "seq")
+    records = heap.fetch_many([r.offset for r in seq_idx.search_record(field_value)])
+    return heap.cache_rows(field_name, field_value, records)
 
 
 def search_btree_idx(table_name: str, field_name: str, field_value):
     table_path = _table_path(table_name)
     heap = HeapFile(table_path)
-    btree = BPlusTreeIndexWrapper(table_path, field_name)
+    cached = heap.cached_rows(field_name, field_value)
+    if cached is not None:
+        return cached
+    btree = _index(table_path, field_name, "btree")
     offsets = btree.search(field_value)
-    return [heap.fetch_record_by_offset(off) for off in offsets] if offsets else []
+    records = heap.fetch_many(offsets) if offsets else []
+    return heap.cache_rows(field_name, field_value, records)
 
 
 def search_btree_idx_range(table_name: str, field_name: str, start_value, end_value):
     table_path = _table_path(table_name)
     heap = HeapFile(table_path)
-    btree = BPlusTreeIndexWrapper(table_path, field_name)
+    btree = _index(table_path, field_name, "btree")
     offsets = btree.range_search(start_value, end_value)
-    return [heap.fetch_record_by_offset(off) for off in offsets] if offsets else []
+    return heap.fetch_many(offsets) if offsets else []
 
 
 def search_hash_idx(table_name: str, field_name: str, field_value):
     table_path = _table_path(table_name)
     heap = HeapFile(table_path)
-    hidx = ExtendibleHashIndex(table_path, field_name)
-    return [
-        heap.fetch_record_by_offset(r.offset) for r in hidx.search_record(field_value)
-    ]
+    cached = heap.cached_rows(field_name, field_value)
+    if cached is not None:
+        return cached
+    hidx = _index(table_path, field_name, "hash")
+    records = heap.fetch_many([r.offset for r in hidx.search_record(field_value)])
+    return heap.cache_rows(field_name, field_value, records)
 
 
 def search_seq_idx_range(table_name: str, field_name: str, start_value, end_value):
     table_path = _table_path(table_name)
     heap = HeapFile(table_path)
-    idx = SequentialIndex(table_path, field_name)
+    idx = _index(table_path, field_name, "seq")
     records = idx.search_range(start_value, end_value)
-    return [heap.fetch_record_by_offset(rec.offset) for rec in records]
+    return heap.fetch_many([rec.offset for rec in records])
 
 
 def search_rtree_record(
@@ -272,9 +638,9 @@ def search_rtree_record(
 ) -> List[Record]:
     table_path = _table_path(table_name)
     heap = HeapFile(table_path)
-    rtree = RTreeIndex(table_path, field_name)
+    rtree = _index(table_path, field_name, "rtree")
     records = rtree.search_record(point)
-    return [heap.fetch_record_by_offset(rec.offset) for rec in records]
+    return heap.fetch_many([rec.offset for rec in records])
 
 
 def search_rtree_bounds(
@@ -285,9 +651,9 @@ def search_rtree_bounds(
 ) -> List[Record]:
     table_path = _table_path(table_name)
     heap = HeapFile(table_path)
-    rtree = RTreeIndex(table_path, field_name)
+    rtree = _index(table_path, field_name, "rtree")
     records = rtree.search_bounds(lower_bound, upper_bound)
-    return [heap.fetch_record_by_offset(rec.offset) for rec in records]
+    return heap.fetch_many([rec.offset for rec in records])
 
 
 def search_rtree_radius(
@@ -298,9 +664,9 @@ def search_rtree_radius(
 ) -> List[Record]:
     table_path = _table_path(table_name)
     heap = HeapFile(table_path)
-    rtree = RTreeIndex(table_path, field_name)
+    rtree = _index(table_path, field_name, "rtree")
     records = rtree.search_radius(point, radius)
-    return [heap.fetch_record_by_offset(rec.offset) for rec in records]
+    return heap.fetch_many([rec.offset for rec in records])
 
 
 def search_rtree_knn(
@@ -308,9 +674,9 @@ def search_rtree_knn(
 ) -> List[Record]:
     table_path = _table_path(table_name)
     heap = HeapFile(table_path)
-    rtree = RTreeIndex(table_path, field_name)
+    rtree = _index(table_path, field_name, "rtree")
     records = rtree.search_knn(point, k)
-    return [heap.fetch_record_by_offset(rec.offset) for rec in records]
+    return heap.fetch_many([rec.offset for rec in records])
 
 
 # =============================================================================
@@ -318,28 +684,38 @@ def search_rtree_knn(
 # =============================================================================
 
 
-def _update_secondary_indexes(table_path: str, record: Record, offset: int) -> None:
-    schema = record.schema
-    for idx_file in glob.glob(f"{table_path}.*.*.idx"):
-        parts = os.path.basename(idx_file).split(".")
-        if len(parts) < 4:
+def _secondary_indexes(table_path: str, schema: List[Tuple[str, str]]):
+    """Índices existentes de la tabla como (campo, tipo_idx, tipo_campo, posición)."""
+    names = [n for n, _ in schema]
+    for field_name, idx_type in get_catalog().indexes(table_path):
+        if field_name not in names or idx_type not in _INDEX_CLASSES:
             continue
-        field_name, idx_type = parts[1], parts[2]
-        field_type = next((fmt for name, fmt in schema if name == field_name), None)
-        if field_type is None:
-            continue
-        value = record.values[[n for n, _ in schema].index(field_name)]
+        pos = names.index(field_name)
+        yield field_name, idx_type, schema[pos][1], pos
+
+
+def _update_secondary_indexes(table_path: str, record: Record, offset: int) -> None:
+    for field_name, idx_type, field_type, pos in _secondary_indexes(
+        table_path, record.schema
+    ):
+        value = record.values[pos]
         idx_rec = IndexRecord(field_type, value, offset)
-        if idx_type == "seq":
-            SequentialIndex(table_path, field_name).insert_record(idx_rec)
-        elif idx_type == "hash":
-            ExtendibleHashIndex(table_path, field_name).insert_record(idx_rec)
-        elif idx_type == "btree":
-            start = time.time()
-            BPlusTreeIndexWrapper(table_path, field_name).insert_record(idx_rec)
-            end = time.time()
-        elif idx_type == "rtree":
-            RTreeIndex(table_path, field_name).insert_record(idx_rec)
+        _index(table_path, field_name, idx_type).insert_record(idx_rec)
+
+
+def _update_secondary_indexes_many(
+    table_path: str, records: List[Record], offsets: List[int]
+) -> None:
+    if not records:
+        return
+    for field_name, idx_type, field_type, pos in _secondary_indexes(
+        table_path, records[0].schema
+    ):
+        idx_recs = [
+            IndexRecord(field_type, rec.values[pos], off)
+            for rec, off in zip(records, offsets)
+        ]
+        _index(table_path, field_name, idx_type).insert_many(idx_recs)
 
 
 def _remove_from_secondary_indexes(
@@ -347,24 +723,9 @@ def _remove_from_secondary_indexes(
 ) -> None:
     if record is None:
         return  # No hay registro para eliminar
-    schema = record.schema
-    for idx_file in glob.glob(f"{table_path}.*.*.idx"):
-        parts = os.path.basename(idx_file).split(".")
-        if len(parts) < 4:
-            continue
-        field_name, idx_type = parts[1], parts[2]
-        field_type = next((fmt for name, fmt in schema if name == field_name), None)
-        if field_type is None:
-            continue
-        value = record.values[[n for n, _ in schema].index(field_name)]
-        if idx_type == "seq":
-            SequentialIndex(table_path, field_name).delete_record(value, offset)
-        elif idx_type == "hash":
-            ExtendibleHashIndex(table_path, field_name).delete_record(value, offset)
-        elif idx_type == "btree":
-            BPlusTreeIndexWrapper(table_path, field_name).delete_record(value, offset)
-        elif idx_type == "rtree":
-            RTreeIndex(table_path, field_name).delete_record(value, offset)
+    for field_name, idx_type, _, pos in _secondary_indexes(table_path, record.schema):
+        value = record.values[pos]
+        _index(table_path, field_name, idx_type).delete_record(value, offset)
 
 
 # =============================================================================
@@ -374,29 +735,45 @@ def _remove_from_secondary_indexes(
 
 # TODO: allow for index_name
 def create_seq_idx(table_name: str, field_name: str):
-    path = _table_path(table_name)
-    SequentialIndex.build_index(path, HeapFile(path).extract_index, field_name)
-    print(f"Índice secuencial creado para '{field_name}' en la tabla '{table_name}'.")
+    with _ddl(_table_path(table_name)):
+        path = _table_path(table_name)
+        heap = HeapFile(path)
+        SequentialIndex.build_index(path, heap.extract_index, field_name)
+        if field_name == heap.primary_key:
+            _rebuild_pk_bloom(heap)
+        print(f"Índice secuencial creado para '{field_name}' en la tabla '{table_name}'.")
 
 
 def create_btree_idx(table_name: str, field_name: str):
-    path = _table_path(table_name)
-    BPlusTreeIndex.build_index(path, HeapFile(path).extract_index, field_name)
-    print(f"Índice B+ Tree creado para '{field_name}' en la tabla '{table_name}'.")
+    with _ddl(_table_path(table_name)):
+        path = _table_path(table_name)
+        heap = HeapFile(path)
+        BPlusTreeIndex.build_index(path, heap.extract_index, field_name)
+        if field_name == heap.primary_key:
+            _rebuild_pk_bloom(heap)
+        print(f"Índice B+ Tree creado para '{field_name}' en la tabla '{table_name}'.")
 
 
 def create_hash_idx(table_name: str, field_name: str):
-    path = _table_path(table_name)
-    ExtendibleHashIndex.build_index(path, HeapFile(path).extract_index, field_name)
-    print(
-        f"Índice Extendible Hash creado para '{field_name}' en la tabla '{table_name}'."
-    )
+    with _ddl(_table_path(table_name)):
+        path = _table_path(table_name)
+        heap = HeapFile(path)
+        ExtendibleHashIndex.build_index(path, heap.extract_index, field_name)
+        if field_name == heap.primary_key:
+            _rebuild_pk_bloom(heap)
+        print(
+            f"Índice Extendible Hash creado para '{field_name}' en la tabla '{table_name}'."
+        )
 
 
 def create_rtree_idx(table_name: str, field_name: str):
-    path = _table_path(table_name)
-    RTreeIndex.build_index(path, HeapFile(path).extract_index, field_name)
-    print(f"Índice R-Tree creado para '{field_name}' en la tabla '{table_name}'.")
+    with _ddl(_table_path(table_name)):
+        path = _table_path(table_name)
+        heap = HeapFile(path)
+        RTreeIndex.build_index(path, heap.extract_index, field_name)
+        if field_name == heap.primary_key:
+            _rebuild_pk_bloom(heap)
+        print(f"Índice R-Tree creado para '{field_name}' en la tabla '{table_name}'.")
 
 
 # =============================================================================
@@ -405,47 +782,51 @@ def create_rtree_idx(table_name: str, field_name: str):
 
 
 def drop_seq_idx(table_name: str, field_name: str) -> None:
-    table_path = _table_path(table_name)
-    idx_path = f"{table_path}.{field_name}.seq.idx"
-    if not os.path.exists(idx_path):
-        raise FileNotFoundError(f"Index file {idx_path} does not exist.")
-    os.remove(idx_path)
-    print(
-        f"Índice secuencial para '{field_name}' en la tabla '{table_name}' eliminado."
-    )
+    with _ddl(_table_path(table_name)):
+        table_path = _table_path(table_name)
+        idx_path = f"{table_path}.{field_name}.seq.idx"
+        if not os.path.exists(idx_path):
+            raise FileNotFoundError(f"Index file {idx_path} does not exist.")
+        os.remove(idx_path)
+        print(
+            f"Índice secuencial para '{field_name}' en la tabla '{table_name}' eliminado."
+        )
 
 
 def drop_btree_idx(table_name: str, field_name: str) -> None:
-    table_path = _table_path(table_name)
-    idx_path = f"{table_path}.{field_name}.btree.idx"
-    if not os.path.exists(idx_path):
-        raise FileNotFoundError(f"Index file {idx_path} does not exist.")
-    os.remove(idx_path)
-    print(f"Índice B+ Tree para '{field_name}' en la tabla '{table_name}' eliminado.")
-
-
-def drop_hash_idx(table_name: str, field_name: str) -> None:
-    table_path = _table_path(table_name)
-    idx_paths = (
-        f"{table_path}.{field_name}.hash.{ext}" for ext in ("db", "idx", "tree")
-    )
-    for idx_path in idx_paths:
+    with _ddl(_table_path(table_name)):
+        table_path = _table_path(table_name)
+        idx_path = f"{table_path}.{field_name}.btree.idx"
         if not os.path.exists(idx_path):
             raise FileNotFoundError(f"Index file {idx_path} does not exist.")
         os.remove(idx_path)
-    print(
-        f"Índice Extendible Hash para '{field_name}' en la tabla '{table_name}' eliminado."
-    )
+        print(f"Índice B+ Tree para '{field_name}' en la tabla '{table_name}' eliminado.")
+
+
+def drop_hash_idx(table_name: str, field_name: str) -> None:
+    with _ddl(_table_path(table_name)):
+        table_path = _table_path(table_name)
+        idx_paths = (
+            f"{table_path}.{field_name}.hash.{ext}" for ext in ("db", "idx", "tree")
+        )
+        for idx_path in idx_paths:
+            if not os.path.exists(idx_path):
+                raise FileNotFoundError(f"Index file {idx_path} does not exist.")
+            os.remove(idx_path)
+        print(
+            f"Índice Extendible Hash para '{field_name}' en la tabla '{table_name}' eliminado."
+        )
 
 
 def drop_rtree_idx(table_name: str, field_name: str) -> None:
-    table_path = _table_path(table_name)
-    idx_paths = (f"{table_path}.{field_name}.rtree.{ext}" for ext in ("idx", "dat"))
-    for idx_path in idx_paths:
-        if not os.path.exists(idx_path):
-            raise FileNotFoundError(f"Index file {idx_path} does not exist.")
-        os.remove(idx_path)
-    print(f"Índice R-Tree para '{field_name}' en la tabla '{table_name}' eliminado.")
+    with _ddl(_table_path(table_name)):
+        table_path = _table_path(table_name)
+        idx_paths = (f"{table_path}.{field_name}.rtree.{ext}" for ext in ("idx", "dat"))
+        for idx_path in idx_paths:
+            if not os.path.exists(idx_path):
+                raise FileNotFoundError(f"Index file {idx_path} does not exist.")
+            os.remove(idx_path)
+        print(f"Índice R-Tree para '{field_name}' en la tabla '{table_name}' eliminado.")
 
 
 def drop_all_indexes_for_field(table_name: str, field_name: str) -> None:
@@ -508,20 +889,20 @@ def print_table(table_name: str):
 
 
 def print_seq_idx(table_name: str, field_name: str):
-    SequentialIndex(_table_path(table_name), field_name).print_all()
+    _index(_table_path(table_name), field_name, "seq").print_all()
 
 
 def print_hash_idx(table_name: str, field_name: str):
-    ExtendibleHashIndex(_table_path(table_name), field_name).print_all()
+    _index(_table_path(table_name), field_name, "hash").print_all()
 
 
 def print_btree_idx(table_name: str, field_name: str):
     path = _table_path(table_name)
-    BPlusTreeIndexWrapper(path, field_name).tree.scan_all()
+    _index(path, field_name, "btree").tree.scan_all()
 
 
 def print_rtree_idx(table_name: str, field_name: str):
-    RTreeIndex(_table_path(table_name), field_name).print_all()
+    _index(_table_path(table_name), field_name, "rtree").print_all()
 
 
 def build_spimi_index(table_name: str) -> None:
@@ -529,7 +910,8 @@ def build_spimi_index(table_name: str) -> None:
     Construye el índice invertido SPIMI para los campos de tipo 'text' de la tabla.
     """
     indexer = SPIMIIndexer(_table_path)
-    indexer.build_index(_table_path(table_name))
+    with _ddl():  # crea/reemplaza las tablas del índice invertido
+        indexer.build_index(_table_path(table_name))
 
 
 def build_acoustic_model(table_name: str, field_name: str, num_clusters: int):
@@ -553,30 +935,26 @@ def build_acoustic_model(table_name: str, field_name: str, num_clusters: int):
     if codebook is None:
         return
 
-    # 3. Generar y almacenar histogramas
+    # 3. Generar los histogramas y guardarlos en la matriz (fila = RID del registro)
     from multimedia.histogram import build_histogram
     sound_handler = Sound(_table_path(table_name), field_name)
-    histogram_handler = HistogramFile(_table_path(table_name), field_name)
+    HistogramMatrix.build_file(_table_path(table_name), field_name, len(codebook["centroids"]))
+    heap_file.invalidate_histograms(field_name)  # la matriz vieja (o ninguna) quedó cacheada
 
-    for record in heap_file.get_all_records():
-        sound_offset, _ = record.values[heap_file.schema.index((field_name, "SOUND"))]
-        audio_path = sound_handler.read(sound_offset)
+    positions, histograms = [], []
+    for (sound_offset, _), pos in heap_file.extract_index(field_name):
+        audio_path = sound_handler.read(int(sound_offset))
 
         if audio_path is None:
             continue
 
         histogram = build_histogram(audio_path, codebook)
         if histogram is not None:
-            # Convertir el histograma a una lista de tuplas (ID, COUNT)
-            histogram_tuples = [(i, int(count)) for i, count in enumerate(histogram) if count > 0]
-
-            # Insertar el histograma y obtener el offset
-            histogram_offset = histogram_handler.insert(histogram_tuples)
+            positions.append(pos)
+            histograms.append(histogram)
 
-            # Actualizar el registro en el heap file con el offset del histograma
-            record.values = list(record.values)
-            record.values[heap_file.schema.index((field_name, "SOUND"))] = (sound_offset, histogram_offset)
-            heap_file.update_record(record)
+    with get_wal().transaction():
+        heap_file.store_histograms(field_name, positions, histograms)
 
 def knn_search(table_name: str, field_name: str, query_audio_path: str, k: int) -> list[tuple[Record, float]]:
     """
@@ -612,7 +990,7 @@ def search_text(table_name: str, query: str, k: int = 5) -> list[tuple[Record, f
 
     # 4. Buscar términos en índice invertido
     inverted_index = HeapFile(_table_path("inverted_index"))
-    hash_idx = ExtendibleHashIndex(_table_path("inverted_index"), "term")
+    hash_idx = _index(_table_path("inverted_index"), "term", "hash")
     
     for term in unique_query_terms:
         # 4.1 Buscar término usando índice hash
@@ -668,4 +1046,141 @@ def search_text(table_name: str, query: str, k: int = 5) -> list[tuple[Record, f
         if matching_recs:
             results.append((matching_recs[0], score))
 
-    return results
\ No newline at end of file
+    return results
+
+
+# =============================================================================
+# 🗄️ Sesión: objetos abiertos entre sentencias
+# =============================================================================
+
+_CREATE_IDX = {
+    "seq": create_seq_idx,
+    "btree": create_btree_idx,
+    "hash": create_hash_idx,
+    "rtree": create_rtree_idx,
+}
+_DROP_IDX = {
+    "seq": drop_seq_idx,
+    "btree": drop_btree_idx,
+    "hash": drop_hash_idx,
+    "rtree": drop_rtree_idx,
+}
+_CHECK_IDX = {
+    "seq": check_seq_idx,
+    "btree": check_btree_idx,
+    "hash": check_hash_idx,
+    "rtree": check_rtree_idx,
+}
+
+
+class Database:
+    """Sesión de larga vida sobre las tablas (la usa el visitor).
+
+    • Guarda un HeapFile abierto por tabla (con sus archivos TEXT / SOUND
+      ya abiertos) en vez de construirlo en cada sentencia.
+    • Los índices se piden al catálogo, que los mantiene abiertos: el
+      R-Tree no reabre libspatialindex ni el hash vuelve a leer su trie.
+    • Tras un DDL la versión del catálogo cambia y el heap cacheado se
+      vuelve a abrir la próxima vez que se pida.
+    • `close` (o salir del `with`) baja a disco lo pendiente de las tablas
+      usadas, cierra sus índices y recorta lo reservado de más.
+    """
+
+    def __init__(self):
+        startup()
+        self._heaps: Dict[str, Tuple[int, HeapFile]] = {}  # tabla -> (versión, heap)
+
+    def __enter__(self) -> "Database":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    # ------------------------------------------------------------------
+    # Tablas e índices abiertos -----------------------------------------
+    # ------------------------------------------------------------------
+    def table_exists(self, table_name: str) -> bool:
+        return check_table_exists(table_name)
+
+    def schema(self, table_name: str) -> List[Tuple[str, str]]:
+        return get_table_schema(table_name)
+
+    def heap(self, table_name: str) -> HeapFile:
+        """HeapFile abierto de la tabla; se reabre sólo si hubo DDL desde la última vez."""
+        version = get_catalog().version
+        cached = self._heaps.get(table_name)
+        if cached is None or cached[0] != version:
+            cached = (version, HeapFile(_table_path(table_name)))
+            self._heaps[table_name] = cached
+        return cached[1]
+
+    def index(self, table_name: str, field_name: str, idx_type: str):
+        """Índice abierto (`idx_type`: seq / btree / hash / rtree)."""
+        return _index(_table_path(table_name), field_name, idx_type)
+
+    def has_index(self, table_name: str, field_name: str, idx_type: str) -> bool:
+        return _CHECK_IDX[idx_type](table_name, field_name)
+
+    # ------------------------------------------------------------------
+    # DDL --------------------------------------------------------------
+    # ------------------------------------------------------------------
+    def create_table(
+        self,
+        table_name: str,
+        schema: List[Tuple[str, str]],
+        primary_key: str,
+        storage: str = "heap",
+        encodings: Optional[Dict[str, str]] = None,
+    ) -> None:
+        create_table(table_name, schema, primary_key, storage, encodings)
+
+    def drop_table(self, table_name: str) -> None:
+        self._heaps.pop(table_name, None)
+        drop_table(table_name)
+
+    def vacuum_table(self, table_name: str, return_map: bool = False) -> dict:
+        return vacuum_table(table_name, return_map)
+
+    def compact_side_files(
+        self, table_name: str, columns: Optional[List[str]] = None
+    ) -> Dict[str, int]:
+        return compact_side_files(table_name, columns)
+
+    def create_index(self, table_name: str, field_name: str, idx_type: str) -> None:
+        _CREATE_IDX[idx_type](table_name, field_name)
+
+    def drop_index(self, table_name: str, field_name: str, idx_type: str) -> None:
+        _DROP_IDX[idx_type](table_name, field_name)
+
+    # ------------------------------------------------------------------
+    # Registros --------------------------------------------------------
+    # ------------------------------------------------------------------
+    def insert_record(self, table_name: str, record: Record) -> int:
+        return _insert_record(self.heap(table_name), record)
+
+    def insert_many(self, table_name: str, records: List[Record]) -> List[int]:
+        return _insert_many(self.heap(table_name), records)
+
+    def delete_record(self, table_name: str, pk_value) -> bool:
+        return _delete_record(self.heap(table_name), pk_value)
+
+    def delete_record_at(self, table_name: str, offset: int) -> bool:
+        return _delete_record_at(self.heap(table_name), offset)
+
+    def count_records(self, table_name: str) -> int:
+        return self.heap(table_name).live_count
+
+    # ------------------------------------------------------------------
+    # Cierre -----------------------------------------------------------
+    # ------------------------------------------------------------------
+    def flush(self) -> None:
+        for table_name in self._heaps:
+            if check_table_exists(table_name):
+                flush_buffers(table_name)
+
+    def close(self) -> None:
+        self.flush()
+        for table_name in self._heaps:
+            get_catalog().invalidate(_table_path(table_name))  # cierra sus índices
+            get_extents().trim(f"{_table_path(table_name)}.")
+        self._heaps.clear()
@@ -1,11 +1,18 @@
 from .IndexRecord import IndexRecord
 from . import utils
+from storage.WriteAheadLog import wal_open
+from storage.ExtentAllocator import get_extents
 import struct
 import os
 import math
 import json
 
 NODE_HEADER_FORMAT = 'iiQ'  # is_leaf, key_count, next_leaf_offset
+FILE_MAGIC = b'BPT\x02'  # marca + versión del formato del archivo
+FILE_HEADER_FORMAT = '<4sQQ'  # magic, root_offset, fin lógico (el archivo se reserva por extents)
+FILE_HEADER_SIZE = struct.calcsize(FILE_HEADER_FORMAT)
+ROOT_AT = 4  # posición de root_offset en la cabecera
+END_AT = 12  # posición del fin lógico
 
 class BPlusTreeNode:
     def __init__(self, is_leaf=False):
@@ -35,17 +42,39 @@ class BPlusTreeIndex:
         self.leaf_record_size = sample_record.size
         self.node_size_leaf = 16 + self.order * self.leaf_record_size
 
-        try:
+        header = b''
+        if os.path.exists(self.auxname):
             with open(self.auxname, 'rb') as f:
-                self.root_offset = struct.unpack('Q', f.read(8))[0]
-        except (FileNotFoundError, struct.error):
-            root = BPlusTreeNode(is_leaf=True)
+                header = f.read(FILE_HEADER_SIZE)
+
+        if len(header) == FILE_HEADER_SIZE and header[:4] == FILE_MAGIC:
+            self.root_offset = struct.unpack(FILE_HEADER_FORMAT, header)[1]
+        elif header:
+            # archivo de una versión anterior (cabecera sin magic): no se puede
+            # extender sin pisar nodos, se vuelve a armar desde el heap
+            self._rebuild_from_heap()
+        else:
+            self._create_empty()
+
+    def _create_empty(self):
+        get_extents().discard(self.auxname)
+        with open(self.auxname, 'wb') as f:
+            f.write(struct.pack(FILE_HEADER_FORMAT, FILE_MAGIC, 0, FILE_HEADER_SIZE))
+
+        self.root_offset = self.save_node(BPlusTreeNode(is_leaf=True))
+        self.update_root_offset(self.root_offset)
 
-            with open(self.auxname, 'wb') as f:
-                f.write(struct.pack('Q', 0))
+    def _rebuild_from_heap(self):
+        from storage.HeapFile import HeapFile
 
-            self.root_offset = self.save_node(root)
-            self.update_root_offset(self.root_offset)
+        table_path = self.filename[: -len('.dat')]
+        key_field = self.auxname[len(table_path) + 1 : -len('.btree.idx')]
+        print(f"Índice B+ Tree '{self.auxname}' en formato anterior: se reconstruye desde el heap.")
+        self._create_empty()
+        entries = HeapFile(table_path).extract_index(key_field)
+        entries.sort(key=lambda x: x[0])
+        for key, offset in entries:
+            self.insert(IndexRecord(self.index_format, key, offset))
 
     def load_node(self, node_offset):
         with open(self.auxname, 'rb') as f:
@@ -136,9 +165,15 @@ class BPlusTreeIndex:
             padding = b'\x00' * (self.node_size_internal - len(buffer))
             buffer += padding
 
-        with open(self.auxname, 'ab') as f:
-            pos = f.tell()
+        # append en el fin lógico: lo que sigue es espacio ya reservado
+        with wal_open(self.auxname, 'r+b') as f:
+            f.seek(END_AT)
+            pos = struct.unpack('<Q', f.read(8))[0]
+            get_extents().reserve(self.auxname, pos + len(buffer))
+            f.seek(pos)
             f.write(buffer)
+            f.seek(END_AT)
+            f.write(struct.pack('<Q', pos + len(buffer)))
             return pos
 
     def save_node_at(self, offset, node):
@@ -176,14 +211,14 @@ class BPlusTreeIndex:
             padding = b'\x00' * (self.node_size_internal - len(buffer))
             buffer += padding
 
-        with open(self.auxname, 'r+b') as f:
+        with wal_open(self.auxname, 'r+b') as f:
             f.seek(offset)
             f.write(buffer)
         
     def update_root_offset(self, offset):
-        with open(self.auxname, 'r+b') as f:
-            f.seek(0)
-            f.write(struct.pack('Q', offset))
+        with wal_open(self.auxname, 'r+b') as f:
+            f.seek(ROOT_AT)
+            f.write(struct.pack('<Q', offset))
         self.root_offset = offset
 
     def insert(self, record):
@@ -515,9 +550,7 @@ class BPlusTreeIndex:
             key_field: Campo sobre el cual se indexará
             order: Orden del árbol B+ (máx claves por nodo)
         """
-        schema_path = f"{table_path}.schema.json"
-        with open(schema_path, "r") as f:
-            schema = json.load(f)
+        schema = utils.load_schema(table_path)
 
         field_format = None
         for field in schema["fields"]:
@@ -554,9 +587,7 @@ class BPlusTreeIndexWrapper:
         self.table_path = table_path
         self.field_name = field_name
 
-        schema_file = f"{table_path}.schema.json"
-        with open(schema_file, "r") as f:
-            schema = json.load(f)
+        schema = utils.load_schema(table_path)
         for field in schema["fields"]:
             if field["name"] == field_name:
                 self.index_format = field["type"]
@@ -574,6 +605,11 @@ class BPlusTreeIndexWrapper:
     def insert_record(self, index_record: IndexRecord):
         self.tree.insert(index_record)
 
+    def insert_many(self, index_records):
+        # en orden de clave se recorren caminos contiguos del árbol
+        for index_record in sorted(index_records, key=lambda r: r.key):
+            self.tree.insert(index_record)
+
     def search(self, key):
         return self.tree.search(key)
 
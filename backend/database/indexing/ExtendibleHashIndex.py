@@ -14,6 +14,8 @@ import os, struct, pickle, hashlib
 from typing import List, Union
 from .IndexRecord import IndexRecord
 from . import utils  # utils para schema y formatos
+from storage.WriteAheadLog import wal_open, wal_replace
+from storage.ExtentAllocator import get_extents
 
 # --------------------
 # Configuraciones globales
@@ -137,6 +139,7 @@ class _Storage:
         self.filename = filename
         self.cap = capacity
         if not os.path.exists(filename):
+            get_extents().discard(filename)
             with open(filename, "wb") as f:
                 f.write(struct.pack(self.HEADER_FORMAT, 0, self.cap, b"\x00"*8))
             self.next_pid = 0
@@ -158,18 +161,19 @@ class _Storage:
 
     def _write(self, pid, blob):
         blob = blob.ljust(self._page_size(), b"\x00")
-        with open(self.filename, "r+b") as f:
+        with wal_open(self.filename, "r+b") as f:
             f.seek(self._pos(pid))
             f.write(blob)
 
     def _write_header(self):
-        with open(self.filename, "r+b") as f:
+        with wal_open(self.filename, "r+b") as f:
             f.seek(0)
             f.write(struct.pack(self.HEADER_FORMAT, self.next_pid, self.cap, b"\x00"*8))
 
     def new_page(self):
         pid = self.next_pid
         self.next_pid += 1
+        get_extents().reserve(self.filename, self._pos(self.next_pid))  # next_pid = fin lógico
         self._write_header()
         page = _Page(pid, self.cap, self)
         page.save()
@@ -216,8 +220,11 @@ class _HashTree:
             self._save()
 
     def _save(self):
-        with open(self.tree_path, "wb") as f:
+        # archivo nuevo + rename en el log: el árbol viejo no se copia al WAL
+        tmp = self.tree_path + ".tmp"
+        with open(tmp, "wb") as f:
             pickle.dump(self.root, f)
+        wal_replace(tmp, self.tree_path)
 
     def _hash_bits(self, key: Union[int, str]) -> str:
         if isinstance(key, str):
@@ -313,6 +320,14 @@ class ExtendibleHashIndex:
             return
         self.tree.insert(idx_rec.key, idx_rec.offset)
 
+    def insert_many(self, idx_recs: List[IndexRecord]):
+        for idx_rec in idx_recs:
+            if idx_rec.format != self.kfmt:
+                raise TypeError("Formato de clave no coincide.")
+        for idx_rec in idx_recs:
+            if not self._is_sentinel(idx_rec.key):
+                self.tree.insert(idx_rec.key, idx_rec.offset)
+
     def delete_record(self, key: Union[int, str], offset: int) -> bool:
         self._check_type(key)
         self.tree.delete(key)
@@ -125,7 +125,15 @@ class RTreeIndex:
         if not all(isinstance(v, (int, float)) for v in point):
             raise TypeError(f"Componentes de {point!r} deben ser int o float")
 
+    def close(self):
+        # libspatialindex baja sus buffers a disco al cerrar
+        self.idx.close()
+
     def insert_record(self, record: IndexRecord):
+        self._insert(record)
+        self.idx.flush()  # el índice puede seguir abierto en el catálogo
+
+    def _insert(self, record: IndexRecord):
         if not isinstance(record, IndexRecord):
             raise TypeError("Se esperaba un objeto IndexRecord")
 
@@ -141,6 +149,11 @@ class RTreeIndex:
         bounds = self.to_mbr(record.key)
         self.idx.insert(record.offset, bounds)
     
+    def insert_many(self, records: List[IndexRecord]):
+        for record in records:
+            self._insert(record)
+        self.idx.flush()
+
     def search_record(self, point: Tuple[Union[int, float], ...]) -> List[IndexRecord]:
         if not self.validate_type(point, self.key_format):
             raise TypeError(f"La clave debe ser tupla de números con formato {self.key_format}")
@@ -159,15 +172,12 @@ class RTreeIndex:
         offsets = list(self.idx.intersection(bounds))
 
         heap_file = HeapFile(self.table_path)
-        field_names = [name for name, _ in heap_file.schema]
-        key_pos = field_names.index(self.indexed_field)
-
         results: List[IndexRecord] = []
         isbox = self.dims in (4, 6)
 
-        for offset in offsets:
-            record = heap_file.fetch_record_by_offset(offset)
-            key_val = record.values[key_pos]
+        records = heap_file.fetch_many(offsets, [self.indexed_field])
+        for offset, record in zip(offsets, records):
+            key_val = record.values[0]
             dist = 0.0
             if isbox:
                 dist = RTreeIndex.point_mbr_mindist(point, key_val)
@@ -190,14 +200,11 @@ class RTreeIndex:
         offsets = list(self.idx.intersection(bounds))
 
         heap_file = HeapFile(self.table_path)
-        field_names = [name for name, _ in heap_file.schema]
-        key_pos = field_names.index(self.indexed_field)
-
         results: List[IndexRecord] = []
 
-        for offset in offsets:
-            record = heap_file.fetch_record_by_offset(offset)
-            key_val = record.values[key_pos]
+        records = heap_file.fetch_many(offsets, [self.indexed_field])
+        for offset, record in zip(offsets, records):
+            key_val = record.values[0]
             results.append(IndexRecord(self.key_format, key_val, offset))
 
         return results
@@ -205,17 +212,14 @@ class RTreeIndex:
     def search_knn(self, point: Tuple[Union[int, float], ...], k: int) -> List[IndexRecord]:
         self.validate_point(point)
         point = self.to_mbr(point)
-        offsets = self.idx.nearest(point, num_results = k)
+        offsets = list(self.idx.nearest(point, num_results = k))
 
         heap_file = HeapFile(self.table_path)
-        field_names = [name for name, _ in heap_file.schema]
-        key_pos = field_names.index(self.indexed_field)
-
         results: List[IndexRecord] = []
 
-        for offset in offsets:
-            record = heap_file.fetch_record_by_offset(offset)
-            key_val = record.values[key_pos]
+        records = heap_file.fetch_many(offsets, [self.indexed_field])
+        for offset, record in zip(offsets, records):
+            key_val = record.values[0]
             results.append(IndexRecord(self.key_format, key_val, offset))
 
         return results
@@ -230,20 +234,18 @@ class RTreeIndex:
 
         try:
             self.idx.delete(id = offset, coordinates = bounds)
+            self.idx.flush()
             return True
         except Exception as e:
             return False
         
     def print_all(self):
-        offsets = self.idx.intersection(tuple((float('-inf'),) * self.dims + (float('inf'),) * self.dims))
+        offsets = list(self.idx.intersection(tuple((float('-inf'),) * self.dims + (float('inf'),) * self.dims)))
         heap_file = HeapFile(self.table_path)
-        field_names = [name for name, _ in heap_file.schema]
-        key_pos = field_names.index(self.indexed_field)
-
         results: List[IndexRecord] = []
-        for offset in offsets:
-            record = heap_file.fetch_record_by_offset(offset)
-            key_val = record.values[key_pos]
+        records = heap_file.fetch_many(offsets, [self.indexed_field])
+        for offset, record in zip(offsets, records):
+            key_val = record.values[0]
             results.append(IndexRecord(self.key_format, key_val, offset))
         
         for rec in results:
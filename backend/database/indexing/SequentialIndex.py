@@ -5,6 +5,7 @@ import json
 from typing import Union, List, Optional, BinaryIO
 from .IndexRecord import IndexRecord
 from . import utils
+from storage.WriteAheadLog import wal_open, wal_replace
 
 class SequentialIndex:
     METADATA_FORMAT = "iii"  # main_size, aux_size, max_aux_size
@@ -36,9 +37,7 @@ class SequentialIndex:
         Construye un nuevo índice secuencial para el campo especificado.
         """
         # Cargar schema para validación
-        schema_file = heap_filename + ".schema.json"
-        with open(schema_file, "r") as f:
-            schema = json.load(f)
+        schema = utils.load_schema(heap_filename)
         
         # Obtener formato del campo
         key_format = next(f["type"] for f in schema["fields"] if f["name"] == key_field)
@@ -100,7 +99,7 @@ class SequentialIndex:
             file_handle.seek(0)
             file_handle.write(struct.pack(self.METADATA_FORMAT, self.main_size, self.aux_size, self.max_aux_size))
         else:
-            with open(self.filename, "r+b") as f:
+            with wal_open(self.filename, "r+b") as f:
                 f.seek(0)
                 f.write(struct.pack(self.METADATA_FORMAT, self.main_size, self.aux_size, self.max_aux_size))
 
@@ -109,7 +108,7 @@ class SequentialIndex:
         if record.format != self.key_format:
             raise TypeError(f"El registro tiene formato {record.format}, se esperaba {self.key_format}")
 
-        with open(self.filename, "r+b") as f:
+        with wal_open(self.filename, "r+b") as f:
             # Posicionarse al final del área auxiliar
             pos = self.METADATA_SIZE + (self.main_size + self.aux_size) * self.record_size
             f.seek(pos)
@@ -125,8 +124,30 @@ class SequentialIndex:
             #print("Indice Secuencial: Area Auxiliar llena, reconstruyendo...")
             self.rebuild_file()
 
-    def rebuild_file(self):
-        """Reconstruye el archivo fusionando áreas principal y auxiliar."""
+    def insert_many(self, records: List[IndexRecord]):
+        """Inserta un lote en el área auxiliar con una escritura y reconstruye a lo sumo una vez."""
+        if not records:
+            return
+        for record in records:
+            if record.format != self.key_format:
+                raise TypeError(f"El registro tiene formato {record.format}, se esperaba {self.key_format}")
+
+        with wal_open(self.filename, "r+b") as f:
+            pos = self.METADATA_SIZE + (self.main_size + self.aux_size) * self.record_size
+            f.seek(pos)
+            f.write(b"".join(record.pack() for record in records))
+            self.aux_size += len(records)
+            self.update_metadata(file_handle=f)
+
+        if self.aux_size > self.max_aux_size:
+            self.rebuild_file()
+
+    def rebuild_file(self, offset_map: Optional[dict] = None):
+        """Reconstruye el archivo fusionando áreas principal y auxiliar.
+
+        Con `offset_map` (offset viejo -> nuevo, p. ej. tras un VACUUM) también
+        reescribe los offsets y descarta las entradas que ya no existen.
+        """
         all_recs = []
         
         # Leer todos los registros válidos
@@ -151,6 +172,13 @@ class SequentialIndex:
                 if not self._is_deleted(rec):
                     all_recs.append(rec)
 
+        if offset_map is not None:
+            all_recs = [
+                IndexRecord(self.key_format, rec.key, offset_map[rec.offset])
+                for rec in all_recs
+                if rec.offset in offset_map
+            ]
+
         # Ordenar registros
         all_recs.sort(key=lambda r: r.key)
 
@@ -174,7 +202,7 @@ class SequentialIndex:
                 f.write(empty_rec.pack())
 
         # Reemplazar archivo original
-        os.replace(tmp_file, self.filename)
+        wal_replace(tmp_file, self.filename)
         
         # Actualizar estado
         self.main_size = new_main
@@ -259,7 +287,7 @@ class SequentialIndex:
         empty = utils.get_empty_record(self.key_format)
         found = False
 
-        with open(self.filename, "r+b") as f:
+        with wal_open(self.filename, "r+b") as f:
             # --- área principal ---
             f.seek(self.METADATA_SIZE)
             for _ in range(self.main_size):
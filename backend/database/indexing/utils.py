@@ -1,4 +1,5 @@
 from .IndexRecord import IndexRecord
+from storage.Catalog import get_catalog
 import os
 import json
 from typing import Dict, Any, Union
@@ -15,14 +16,8 @@ def load_schema(base_filename: str) -> Dict[str, Any]:
     Raises:
         FileNotFoundError: Si no existe el archivo de schema
     """
-    # Asegurarnos de que tenemos el nombre base sin extensión
-    schema_file = f"{base_filename}.schema.json"
-    
-    if not os.path.exists(schema_file):
-        raise FileNotFoundError(f"Archivo de schema no encontrado: {schema_file}")
-    
-    with open(schema_file, "r") as f:
-        return json.load(f)
+    # El catálogo lo lee del .schema.json una sola vez por proceso
+    return get_catalog().schema_json(base_filename)
     
 
 def get_key_format_from_schema(schema: Dict[str, Any], key_field: str) -> str:
@@ -3,6 +3,7 @@ import heapq
 from storage.HeapFile import HeapFile
 from storage.Sound import Sound
 from storage.HistogramFile import HistogramFile
+from storage.HistogramMatrix import HistogramMatrix
 from multimedia.histogram import build_histogram, load_codebook
 from multimedia.feature_extraction import extract_features
 
@@ -16,6 +17,18 @@ def tf_idf(tftd, dft, N):
     idf = np.log10(N / dft) if dft > 0 else 0
     return tf * idf
 
+def tf_idf_matrix(counts, doc_freq, N):
+    """
+    Versión vectorizada de tf_idf: pesos de todas las filas de `counts` a la vez.
+    """
+    counts = np.asarray(counts, dtype=np.float64)
+    doc_freq = np.asarray(doc_freq, dtype=np.float64)
+    idf = np.zeros_like(doc_freq)
+    np.log10(N / doc_freq, out=idf, where=doc_freq > 0)
+    tf = np.zeros_like(counts)
+    np.log10(counts, out=tf, where=counts > 0)
+    return np.where(counts > 0, (1 + tf) * idf, 0.0)
+
 def cosine_similarity(vec1, vec2):
     """
     Calcula la similitud de coseno entre dos vectores.
@@ -46,6 +59,10 @@ def knn_sequential_search(query_audio_path: str, heap_file: HeapFile, field_name
         if count > 0:
             query_tfidf[i] = tf_idf(count, codebook["doc_freq"][i], N)
 
+    if HistogramMatrix.exists(heap_file.table_path, field_name):
+        return knn_matrix_search(query_tfidf, heap_file, field_name, codebook, k, N)
+
+    # Sin matriz (modelo construido con HistogramFile): un histograma a la vez
     # Usar una cola de prioridad para mantener los k mejores resultados
     priority_queue = []
 
@@ -84,3 +101,29 @@ def knn_sequential_search(query_audio_path: str, heap_file: HeapFile, field_name
         final_results.append((similarity, heap_file.search_by_field("id", record_id)[0]))
 
     return final_results
+
+def knn_matrix_search(query_tfidf, heap_file: HeapFile, field_name: str, codebook, k: int, N: int):
+    """
+    k-NN sobre la HistogramMatrix del campo: todas las similitudes en una
+    sola operación matricial y los k mejores con argpartition.
+    """
+    counts, has_histogram = HistogramMatrix(heap_file.table_path, field_name).load()
+    rows = min(len(has_histogram), heap_file.heap_size)
+    live = has_histogram[:rows] & heap_file.validity.mask(0, rows)
+    positions = np.flatnonzero(live)
+    if len(positions) == 0 or k <= 0:
+        return []
+
+    doc_tfidf = tf_idf_matrix(counts[positions], codebook["doc_freq"], N)
+    norms = np.linalg.norm(doc_tfidf, axis=1) * np.linalg.norm(query_tfidf)
+    similarity = np.divide(
+        doc_tfidf @ query_tfidf, norms, out=np.zeros(len(positions)), where=norms != 0
+    )
+
+    k = min(k, len(positions))
+    best = np.argpartition(-similarity, k - 1)[:k]
+    best = best[np.argsort(-similarity[best], kind="stable")]
+    return [
+        (float(similarity[i]), heap_file.fetch_record_by_offset(int(positions[i])))
+        for i in best
+    ]
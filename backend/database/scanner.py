@@ -32,12 +32,17 @@ class TokenType(Enum):
     NOT = auto()
     ASC = auto()
     DESC = auto()
+    VACUUM = auto()
 
     BPLUSTREE = auto()
     EXTENDIBLEHASH = auto()
     RTREE = auto()
     SEQUENTIAL = auto()
 
+    COLUMNAR = auto()  # table storage
+    SLOTTED = auto()  # table storage
+    DICTIONARY = auto()  # column encoding
+
     # types
     INT = auto()
     FLOAT = auto()
@@ -109,10 +114,14 @@ class Token:
         TokenType.NOT: "NOT",
         TokenType.ASC: "ASC",
         TokenType.DESC: "DESC",
+        TokenType.VACUUM: "VACUUM",
         TokenType.BPLUSTREE: "BPLUSTREE",
         TokenType.EXTENDIBLEHASH: "HASHFILE",
         TokenType.RTREE: "RTREE",
         TokenType.SEQUENTIAL: "SEQUENTIAL",
+        TokenType.COLUMNAR: "COLUMNAR",
+        TokenType.SLOTTED: "SLOTTED",
+        TokenType.DICTIONARY: "DICTIONARY",
         TokenType.INT: "INT",
         TokenType.FLOAT: "FLOAT",
         TokenType.VARCHAR: "VARCHAR",
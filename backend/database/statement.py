@@ -149,6 +149,7 @@ class CreateColumnDefinition:
         column_type: ColumnType = None,
         varchar_length: int = None,
         is_pk: bool = False,
+        encoding: str = None,
     ):
         self.column_name = column_name
         self.column_type = column_type
@@ -156,12 +157,19 @@ class CreateColumnDefinition:
             varchar_length if column_type == ColumnType.VARCHAR else None
         )
         self.is_pk = is_pk
+        self.encoding = encoding  # "dict" for USING DICTIONARY
 
 
 class CreateTableStatement(Statement):
-    def __init__(self, table_name: str, columns: list[CreateColumnDefinition]):
+    def __init__(
+        self,
+        table_name: str,
+        columns: list[CreateColumnDefinition],
+        storage: str = "heap",
+    ):
         self.table_name = table_name
         self.columns = columns
+        self.storage = storage  # "heap", "columnar" or "slotted"
 
 
 class DropTableStatement(Statement):
@@ -169,6 +177,11 @@ class DropTableStatement(Statement):
         self.table_name = table_name
 
 
+class VacuumStatement(Statement):
+    def __init__(self, table_name: str):
+        self.table_name = table_name
+
+
 class CreateIndexStatement(Statement):
     def __init__(
         self, index_name: str, table_name: str, column_name: str, index_type: IndexType
@@ -0,0 +1,340 @@
+import atexit
+import os
+from collections import OrderedDict
+from typing import Dict, Iterator, Optional, Set, Tuple
+
+from .WriteAheadLog import get_wal
+
+# --------------------------------------------------------
+#  Configuración por defecto
+# --------------------------------------------------------
+DEFAULT_CAPACITY_BYTES = 8 * 1024 * 1024  # 8 MB de páginas en memoria
+DEFAULT_SLOTS_PER_PAGE = 64  # slots por página (bloque)
+
+
+class _Frame:
+    """Página en memoria: bloque de `slots_per_page` slots contiguos."""
+
+    __slots__ = ("data", "length", "dirty")
+
+    def __init__(self, data: bytearray, length: int):
+        self.data = data
+        self.length = length  # bytes válidos (el último bloque puede estar incompleto)
+        self.dirty = False
+
+
+class BufferPool:
+    """Buffer manager compartido para archivos de slots de tamaño fijo.
+
+    • Cada archivo se registra con (base, slot_size): los slots empiezan en
+      `base` y la página `p` cubre los slots [p*spp, (p+1)*spp).
+    • Las páginas se desalojan en orden LRU cuando se supera `capacity_bytes`;
+      si están sucias se escriben antes de salir del pool.
+    • La cabecera de cada archivo se cachea aparte y se escribe siempre
+      después de sus páginas en `flush`.
+    • Toda modificación se registra antes en el WAL, y el log se sincroniza
+      antes de que una página sucia baje a disco.
+    """
+
+    def __init__(
+        self,
+        capacity_bytes: int = DEFAULT_CAPACITY_BYTES,
+        slots_per_page: int = DEFAULT_SLOTS_PER_PAGE,
+    ):
+        if capacity_bytes <= 0 or slots_per_page <= 0:
+            raise ValueError("capacity_bytes y slots_per_page deben ser positivos.")
+        self.capacity_bytes = capacity_bytes
+        self.slots_per_page = slots_per_page
+        self.used_bytes = 0
+
+        self._frames: "OrderedDict[Tuple[str, int], _Frame]" = OrderedDict()
+        self._layouts: Dict[str, Tuple[int, int]] = {}  # filename -> (base, slot_size)
+        self._headers: Dict[str, list] = {}  # filename -> [bytearray, dirty]
+        self._handles: Dict[str, object] = {}
+        self._dirty: Set[str] = set()  # archivos con páginas o cabecera sin bajar
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.writebacks = 0
+
+    # ------------------------------------------------------------------
+    # Configuración -----------------------------------------------------
+    # ------------------------------------------------------------------
+    def configure(
+        self,
+        capacity_bytes: Optional[int] = None,
+        slots_per_page: Optional[int] = None,
+    ) -> None:
+        """Cambia el límite de memoria y/o el tamaño de página."""
+        if slots_per_page is not None and slots_per_page != self.slots_per_page:
+            if slots_per_page <= 0:
+                raise ValueError("slots_per_page debe ser positivo.")
+            # las páginas existentes dejan de estar alineadas: vaciar el pool
+            self.flush()
+            self._frames.clear()
+            self.used_bytes = 0
+            self.slots_per_page = slots_per_page
+        if capacity_bytes is not None:
+            if capacity_bytes <= 0:
+                raise ValueError("capacity_bytes debe ser positivo.")
+            self.capacity_bytes = capacity_bytes
+            self._evict_until(0)
+
+    def register(self, filename: str, base: int, slot_size: int) -> None:
+        layout = (base, slot_size)
+        if self._layouts.get(filename) not in (None, layout):
+            self.discard(filename)
+        self._layouts[filename] = layout
+
+    def page_size(self, filename: str) -> int:
+        return self.slots_per_page * self._layouts[filename][1]
+
+    # ------------------------------------------------------------------
+    # Manejo de archivos ------------------------------------------------
+    # ------------------------------------------------------------------
+    def _handle(self, filename: str):
+        fh = self._handles.get(filename)
+        if fh is None:
+            fh = open(filename, "r+b")
+            self._handles[filename] = fh
+        return fh
+
+    def _page_offset(self, filename: str, page_no: int) -> int:
+        base, slot_size = self._layouts[filename]
+        return base + page_no * self.slots_per_page * slot_size
+
+    def _write_frame(self, filename: str, page_no: int, frame: _Frame) -> None:
+        fh = self._handle(filename)
+        fh.seek(self._page_offset(filename, page_no))
+        fh.write(frame.data[: frame.length])
+        frame.dirty = False
+        self.writebacks += 1
+
+    def _evict_until(self, needed: int) -> None:
+        while self._frames and self.used_bytes + needed > self.capacity_bytes:
+            (filename, page_no), frame = self._frames.popitem(last=False)
+            if frame.dirty:
+                get_wal().sync()  # el log siempre antes que los datos
+                self._write_frame(filename, page_no, frame)
+            self.used_bytes -= len(frame.data)
+            self.evictions += 1
+
+    def _frame(self, filename: str, page_no: int) -> _Frame:
+        key = (filename, page_no)
+        frame = self._frames.get(key)
+        if frame is not None:
+            self.hits += 1
+            self._frames.move_to_end(key)
+            return frame
+
+        self.misses += 1
+        size = self.page_size(filename)
+        self._evict_until(size)
+        fh = self._handle(filename)
+        fh.seek(self._page_offset(filename, page_no))
+        raw = fh.read(size)
+        data = bytearray(size)
+        data[: len(raw)] = raw
+        frame = _Frame(data, len(raw))
+        self._frames[key] = frame
+        self.used_bytes += size
+        return frame
+
+    # ------------------------------------------------------------------
+    # Cabecera ----------------------------------------------------------
+    # ------------------------------------------------------------------
+    def read_header(self, filename: str, size: int) -> bytes:
+        entry = self._headers.get(filename)
+        if entry is None:
+            fh = self._handle(filename)
+            fh.seek(0)
+            entry = [bytearray(fh.read(size)), False]
+            self._headers[filename] = entry
+        return bytes(entry[0])
+
+    def write_header(self, filename: str, data: bytes) -> None:
+        get_wal().log_write(filename, 0, data, self.read_header(filename, len(data)))
+        self._headers[filename] = [bytearray(data), True]
+        self._dirty.add(filename)
+
+    # ------------------------------------------------------------------
+    # Acceso a slots ----------------------------------------------------
+    # ------------------------------------------------------------------
+    def read_slot(self, filename: str, pos: int) -> memoryview:
+        slot_size = self._layouts[filename][1]
+        page_no, idx = divmod(pos, self.slots_per_page)
+        frame = self._frame(filename, page_no)
+        start = idx * slot_size
+        return memoryview(frame.data)[start : start + slot_size]
+
+    def write_slot(self, filename: str, pos: int, data: bytes, at: int = 0) -> None:
+        """Escribe `data` dentro del slot `pos` a partir del byte `at`."""
+        slot_size = self._layouts[filename][1]
+        if at + len(data) > slot_size:
+            raise ValueError("Escritura fuera de los límites del slot.")
+        page_no, idx = divmod(pos, self.slots_per_page)
+        frame = self._frame(filename, page_no)
+        start = idx * slot_size + at
+        get_wal().log_write(
+            filename,
+            self._page_offset(filename, page_no) + start,
+            data,
+            frame.data[start : start + len(data)],
+        )
+        frame.data[start : start + len(data)] = data
+        frame.length = max(frame.length, start + len(data))
+        frame.dirty = True
+        self._dirty.add(filename)
+
+    def write_slots(self, filename: str, start: int, data: bytes) -> None:
+        """Escribe slots contiguos desde `start` con un solo write al archivo.
+
+        Las páginas cacheadas que se solapan se parchean para que el pool
+        siga siendo coherente con el disco.
+        """
+        base, slot_size = self._layouts[filename]
+        page_size = self.page_size(filename)
+        first = base + start * slot_size
+        end = first + len(data)
+        # sólo se usa para agregar después del último slot: deshacerlo es
+        # reponer la cabecera, no hace falta guardar los bytes anteriores
+        get_wal().log_write(filename, first, data)
+        for page_no in range(start // self.slots_per_page, (end - base - 1) // page_size + 1):
+            frame = self._frames.get((filename, page_no))
+            if frame is None:
+                continue
+            page_start = base + page_no * page_size
+            lo, hi = max(first, page_start), min(end, page_start + page_size)
+            frame.data[lo - page_start : hi - page_start] = data[lo - first : hi - first]
+            frame.length = max(frame.length, hi - page_start)
+        fh = self._handle(filename)
+        fh.seek(first)
+        fh.write(data)
+        fh.flush()  # no queda página sucia que haga el flush después (p. ej. para un mmap)
+
+    def iter_pages(
+        self, filename: str, start: int, stop: int
+    ) -> Iterator[Tuple[int, memoryview]]:
+        """Recorre [start, stop) como bloques contiguos (primer_slot, bytes de los slots)."""
+        slot_size = self._layouts[filename][1]
+        pos = start
+        while pos < stop:
+            page_no, idx = divmod(pos, self.slots_per_page)
+            view = memoryview(self._frame(filename, page_no).data)
+            last = min(stop, (page_no + 1) * self.slots_per_page)
+            yield pos, view[idx * slot_size : (idx + last - pos) * slot_size]
+            pos = last
+
+    def iter_slots(
+        self, filename: str, start: int, stop: int
+    ) -> Iterator[Tuple[int, memoryview]]:
+        """Recorre los slots [start, stop) página por página."""
+        slot_size = self._layouts[filename][1]
+        for first, block in self.iter_pages(filename, start, stop):
+            for i in range(len(block) // slot_size):
+                yield first + i, block[i * slot_size : (i + 1) * slot_size]
+
+    # ------------------------------------------------------------------
+    # Persistencia ------------------------------------------------------
+    # ------------------------------------------------------------------
+    def dirty(self, filename: str) -> bool:
+        """¿Quedan páginas o cabecera de `filename` sin escribir al archivo?"""
+        return filename in self._dirty
+
+    def flush(self, filename: Optional[str] = None) -> None:
+        """Escribe páginas sucias (y luego la cabecera) de uno o todos los archivos."""
+        get_wal().sync()  # el log siempre antes que los datos
+        touched = set()
+        for (fname, page_no), frame in sorted(self._frames.items()):
+            if frame.dirty and (filename is None or fname == filename):
+                self._write_frame(fname, page_no, frame)
+                touched.add(fname)
+        for fname, entry in self._headers.items():
+            if entry[1] and (filename is None or fname == filename):
+                fh = self._handle(fname)
+                fh.seek(0)
+                fh.write(entry[0])
+                entry[1] = False
+                touched.add(fname)
+        for fname in touched:
+            self._handles[fname].flush()
+        if filename is None:
+            self._dirty.clear()
+        else:
+            self._dirty.discard(filename)
+
+    def discard(self, filename: str) -> None:
+        """Olvida todo lo cacheado de `filename` SIN escribirlo (archivo recreado/borrado)."""
+        for key in [k for k in self._frames if k[0] == filename]:
+            self.used_bytes -= len(self._frames.pop(key).data)
+        self._headers.pop(filename, None)
+        self._dirty.discard(filename)
+        self._layouts.pop(filename, None)
+        fh = self._handles.pop(filename, None)
+        if fh is not None:
+            fh.close()
+
+    def flush_paths(self, paths: Set[str]) -> None:
+        """`flush` de los archivos sucios cuya ruta absoluta está en `paths`."""
+        for fname in [fname for fname in self._dirty if os.path.abspath(fname) in paths]:
+            self.flush(fname)
+
+    def invalidate(self, paths: Set[str]) -> None:
+        """Olvida páginas y cabecera de los archivos (rutas absolutas) SIN escribirlas;
+        siguen registrados y se vuelven a leer del disco (tras un rollback del WAL)."""
+        for fname in {fname for fname, _ in self._frames} | set(self._headers) | set(self._handles):
+            if os.path.abspath(fname) in paths:
+                layout = self._layouts.get(fname)
+                self.discard(fname)
+                if layout is not None:
+                    self._layouts[fname] = layout
+
+    def discard_prefix(self, prefix: str) -> None:
+        """`discard` de todos los archivos cuyo nombre empieza con `prefix`."""
+        names = set(self._layouts) | set(self._headers) | set(self._handles)
+        for fname in names:
+            if fname.startswith(prefix):
+                self.discard(fname)
+
+    def reset(self) -> None:
+        """Olvida todos los archivos SIN escribir nada (p. ej. en un proceso hijo tras fork)."""
+        names = set(self._layouts) | set(self._headers) | set(self._handles)
+        names |= {fname for fname, _ in self._frames}
+        for fname in names:
+            self.discard(fname)
+
+    def close(self, filename: Optional[str] = None) -> None:
+        """flush + liberar páginas y handle de uno o todos los archivos."""
+        self.flush(filename)
+        names = [filename] if filename is not None else list(self._layouts)
+        for fname in names:
+            self.discard(fname)
+
+    # ------------------------------------------------------------------
+    # Métricas ----------------------------------------------------------
+    # ------------------------------------------------------------------
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / total if total else 0.0,
+            "evictions": self.evictions,
+            "writebacks": self.writebacks,
+            "pages": len(self._frames),
+            "used_bytes": self.used_bytes,
+            "capacity_bytes": self.capacity_bytes,
+        }
+
+    def reset_stats(self) -> None:
+        self.hits = self.misses = self.evictions = self.writebacks = 0
+
+
+# Pool compartido por todas las instancias de HeapFile del proceso
+_buffer_pool = BufferPool()
+atexit.register(_buffer_pool.flush)
+
+
+def get_buffer_pool() -> BufferPool:
+    return _buffer_pool
@@ -0,0 +1,146 @@
+import atexit
+import glob
+import json
+import os
+from typing import Callable, Dict, List, Optional, Tuple
+
+Schema = List[Tuple[str, str]]
+
+
+class _TableEntry:
+    """Lo que el catálogo sabe de una tabla, leído una sola vez del disco."""
+
+    __slots__ = ("version", "raw", "schema", "primary_key", "storage", "encodings", "indexes")
+
+    def __init__(self, version: int, raw: dict):
+        self.version = version
+        self.raw = raw  # contenido de <tabla>.schema.json
+        self.schema: Schema = [(fld["name"], fld["type"]) for fld in raw["fields"]]
+        self.primary_key: Optional[str] = next(
+            (fld["name"] for fld in raw["fields"] if fld.get("is_primary_key")), None
+        )
+        self.storage: str = raw.get("storage", "heap")  # heap / columnar / slotted
+        self.encodings: Dict[str, str] = {  # campo -> "dict" / "zlib" / "lzma"
+            fld["name"]: fld["encoding"] for fld in raw["fields"] if fld.get("encoding")
+        }
+        self.indexes: Optional[List[Tuple[str, str]]] = None  # (campo, tipo_idx)
+
+
+class Catalog:
+    """Esquemas, índices y objetos índice abiertos de todas las tablas del proceso.
+
+    • El esquema de cada tabla se lee del .schema.json la primera vez que
+      se pide; los índices existentes se descubren con un solo glob.
+    • Los objetos índice (B+ Tree, hash, secuencial, R-Tree) se construyen
+      una vez y se reutilizan entre sentencias.
+    • Todo DDL llama a `invalidate`: sube `version`, olvida lo cacheado de
+      la tabla y cierra sus índices abiertos; lo siguiente se vuelve a leer.
+    • Lo devuelto es compartido: no modificar los esquemas ni las listas.
+    """
+
+    def __init__(self):
+        self.version = 0  # sube con cada DDL
+        self._tables: Dict[str, _TableEntry] = {}
+        self._objects: Dict[Tuple[str, str, str], Tuple[int, object]] = {}
+
+    # ------------------------------------------------------------------
+    # Esquemas ---------------------------------------------------------
+    # ------------------------------------------------------------------
+    def _entry(self, table_path: str) -> _TableEntry:
+        table_path = os.path.abspath(table_path)
+        entry = self._tables.get(table_path)
+        if entry is None:
+            schema_file = f"{table_path}.schema.json"
+            if not os.path.exists(schema_file):
+                raise FileNotFoundError(f"Archivo de schema no encontrado: {schema_file}")
+            with open(schema_file, encoding="utf-8") as jf:
+                entry = _TableEntry(self.version, json.load(jf))
+            self._tables[table_path] = entry
+        return entry
+
+    def schema(self, table_path: str) -> Tuple[Schema, Optional[str]]:
+        """(esquema, clave primaria) de la tabla."""
+        entry = self._entry(table_path)
+        return entry.schema, entry.primary_key
+
+    def storage(self, table_path: str) -> str:
+        """Formato de almacenamiento de la tabla: "heap", "columnar" o "slotted"."""
+        return self._entry(table_path).storage
+
+    def encodings(self, table_path: str) -> Dict[str, str]:
+        """Campos codificados de la tabla: campo -> "dict"."""
+        return self._entry(table_path).encodings
+
+    def schema_json(self, table_path: str) -> dict:
+        """El .schema.json tal como está en disco (para los índices)."""
+        return self._entry(table_path).raw
+
+    # ------------------------------------------------------------------
+    # Índices ----------------------------------------------------------
+    # ------------------------------------------------------------------
+    def indexes(self, table_path: str) -> List[Tuple[str, str]]:
+        """Índices de la tabla como (campo, tipo_idx): seq / btree / hash / rtree."""
+        entry = self._entry(table_path)
+        if entry.indexes is None:
+            names = {n for n, _ in entry.schema}
+            found = []
+            for idx_file in sorted(glob.glob(f"{os.path.abspath(table_path)}.*.*.idx")):
+                parts = os.path.basename(idx_file).split(".")
+                if len(parts) >= 4 and parts[1] in names:
+                    found.append((parts[1], parts[2]))
+            entry.indexes = found
+        return entry.indexes
+
+    def index(self, table_path: str, field_name: str, idx_type: str, factory: Callable):
+        """Objeto índice abierto; `factory(table_path, field_name)` lo crea la primera vez."""
+        key = (os.path.abspath(table_path), field_name, idx_type)
+        cached = self._objects.get(key)
+        if cached is not None and cached[0] == self.version:
+            return cached[1]
+        if cached is not None:
+            _close(cached[1])
+        obj = factory(table_path, field_name)
+        self._objects[key] = (self.version, obj)
+        return obj
+
+    # ------------------------------------------------------------------
+    # Invalidación ------------------------------------------------------
+    # ------------------------------------------------------------------
+    def invalidate(self, table_path: Optional[str] = None) -> None:
+        """Olvida una tabla (o todas) y cierra sus índices abiertos."""
+        self.version += 1
+        if table_path is None:
+            self._tables.clear()
+            targets = list(self._objects)
+        else:
+            table_path = os.path.abspath(table_path)
+            self._tables.pop(table_path, None)
+            targets = [key for key in self._objects if key[0] == table_path]
+        for key in targets:
+            _close(self._objects.pop(key)[1])
+
+    def reset(self) -> None:
+        """Olvida todo SIN cerrar nada (p. ej. en un proceso hijo tras fork)."""
+        self.version += 1
+        self._tables.clear()
+        self._objects.clear()
+
+    def close(self) -> None:
+        for _, obj in self._objects.values():
+            _close(obj)
+        self._objects.clear()
+
+
+def _close(obj) -> None:
+    close = getattr(obj, "close", None)
+    if close is not None:
+        close()  # p. ej. el R-Tree baja sus buffers a disco
+
+
+# Catálogo compartido por todas las tablas del proceso
+_catalog = Catalog()
+atexit.register(_catalog.close)
+
+
+def get_catalog() -> Catalog:
+    return _catalog
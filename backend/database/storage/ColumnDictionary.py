@@ -0,0 +1,137 @@
+import glob
+import os
+import struct
+from typing import Dict, Iterable, List, Optional
+
+from .Record import Record
+from .WriteAheadLog import wal_open
+
+# --------------------------------------------------------
+#  Constantes internas
+# --------------------------------------------------------
+DICT_SUFFIX = ".dict"  # <tabla>.<campo>.dict
+LEN_FORMAT = "i"  # prefijo de largo de cada entrada
+LEN_SIZE = struct.calcsize(LEN_FORMAT)
+
+
+class ColumnDictionary:
+    """Diccionario de una columna VARCHAR codificada (`USING DICTIONARY`).
+
+    • En el slot del heap va un código int32 en vez de la cadena de n
+      bytes; el archivo <tabla>.<campo>.dict es la lista de valores
+      distintos en orden de código, cada uno como [largo][utf-8].
+    • Los valores se guardan recortados a n bytes igual que un VARCHAR(n)
+      en el heap, así las comparaciones dan lo mismo que sin codificar.
+    • Sólo crece por append (vía WAL) y los códigos nunca cambian: los
+      slots, índices y zone maps no se tocan al agregar valores.
+    • Una instancia por archivo y proceso; si otro proceso agregó
+      entradas, se vuelven a leer al abrir.
+    """
+
+    _open_dicts: Dict[str, "ColumnDictionary"] = {}
+
+    def __init__(self, filename: str, max_bytes: int):
+        self.filename = filename
+        self.max_bytes = max_bytes
+        self.values: List[str] = []  # código -> valor
+        self._codes: Dict[str, int] = {}  # valor -> código
+        self._size = 0  # bytes del archivo que conoce esta instancia
+
+    # ------------------------------------------------------------------
+    # Apertura (una instancia por archivo y proceso) --------------------
+    # ------------------------------------------------------------------
+    @staticmethod
+    def filename_for(table_path: str, field_name: str) -> str:
+        return f"{table_path}.{field_name}{DICT_SUFFIX}"
+
+    @staticmethod
+    def build_file(table_path: str, field_name: str) -> None:
+        filename = ColumnDictionary.filename_for(table_path, field_name)
+        ColumnDictionary.discard(filename)
+        open(filename, "wb").close()
+
+    @classmethod
+    def open(cls, filename: str, fmt: str) -> "ColumnDictionary":
+        if not os.path.exists(filename):
+            raise FileNotFoundError(f"Archivo de diccionario no encontrado: {filename}")
+        dic = cls._open_dicts.get(filename)
+        if dic is None:
+            dic = cls(filename, cls.max_bytes_for(fmt))
+            cls._open_dicts[filename] = dic
+            dic._load()
+        elif os.path.getsize(filename) != dic._size:
+            dic._load()  # otro proceso agregó valores
+        return dic
+
+    @classmethod
+    def discard(cls, filename: str, remove_file: bool = False) -> None:
+        cls._open_dicts.pop(filename, None)
+        if remove_file and os.path.exists(filename):
+            os.remove(filename)
+
+    @classmethod
+    def remove_files(cls, table_path: str) -> None:
+        """Borra los diccionarios de la tabla (no hace nada si no tiene columnas codificadas)."""
+        for filename in glob.glob(cls.filename_for(glob.escape(table_path), "*")):
+            cls.discard(filename, remove_file=True)
+
+    @classmethod
+    def reset(cls) -> None:
+        cls._open_dicts.clear()
+
+    @staticmethod
+    def max_bytes_for(fmt: str) -> int:
+        """n de un VARCHAR(n) / "ns"; ValueError si el tipo no es una cadena fija."""
+        char = Record.get_format_char_static(fmt)
+        if not (char.endswith("s") and char[:-1].isdigit()):
+            raise ValueError(f"Sólo columnas VARCHAR pueden codificarse con diccionario (tipo '{fmt}').")
+        return int(char[:-1])
+
+    def _load(self) -> None:
+        with open(self.filename, "rb") as f:
+            raw = f.read()
+        self.values.clear()
+        self._codes.clear()
+        pos = 0
+        while pos + LEN_SIZE <= len(raw):
+            (n,) = struct.unpack_from(LEN_FORMAT, raw, pos)
+            if pos + LEN_SIZE + n > len(raw):
+                break  # entrada truncada
+            self._add(raw[pos + LEN_SIZE : pos + LEN_SIZE + n].decode("utf-8"))
+            pos += LEN_SIZE + n
+        self._size = len(raw)
+
+    def _add(self, value: str) -> None:
+        self._codes[value] = len(self.values)
+        self.values.append(value)
+
+    # ------------------------------------------------------------------
+    # Codificación ------------------------------------------------------
+    # ------------------------------------------------------------------
+    def code(self, value: str) -> int:
+        """Código de `value`; si es nuevo se agrega al final del diccionario."""
+        raw = value.encode("utf-8")[: self.max_bytes]
+        value = raw.rstrip(b"\x00").decode("utf-8", errors="replace")
+        code = self._codes.get(value)
+        if code is None:
+            code = len(self.values)
+            data = value.encode("utf-8")
+            with wal_open(self.filename, "ab") as f:
+                f.write(struct.pack(LEN_FORMAT, len(data)) + data)
+            self._size += LEN_SIZE + len(data)
+            self._add(value)
+        return code
+
+    def lookup(self, value) -> Optional[int]:
+        """Código de `value` sin agregarlo, o None si ninguna fila puede tenerlo."""
+        return self._codes.get(value) if isinstance(value, str) else None
+
+    def value(self, code: int) -> str:
+        return self.values[code]
+
+    def decode(self, codes: Iterable[int]) -> List[str]:
+        values = self.values
+        return [values[code] for code in codes]
+
+    def __len__(self) -> int:
+        return len(self.values)
@@ -0,0 +1,280 @@
+import glob
+import mmap
+import os
+import struct
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from .BufferPool import get_buffer_pool
+from .ExtentAllocator import get_extents
+from .HeapFile import HeapFile, METADATA_FORMAT, METADATA_SIZE, PTR_SIZE
+from .Record import Record
+from .ScanEngine import ScanEngine, _close_map
+from .WriteAheadLog import wal_replace
+
+# --------------------------------------------------------
+#  Constantes internas
+# --------------------------------------------------------
+COLUMN_SUFFIX = ".col"  # <tabla>.<columna>.col
+ROWS_PER_BATCH = 1024  # filas que se arman juntas al decodificar desde las columnas
+
+
+class _Columns:
+    """Lo que ScanEngine espera de `array`, pero columna por columna.
+
+    `cols[nombre]` es la columna (mapeada recién la primera vez que se pide)
+    y `cols[lo:hi]` otra vista de los mismos archivos sobre esos slots.
+    """
+
+    def __init__(self, load: Callable[[str], np.ndarray], lo: int, hi: int):
+        self._load = load
+        self.lo = lo
+        self.hi = hi
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            lo, hi, _ = key.indices(len(self))
+            return _Columns(self._load, self.lo + lo, self.lo + max(lo, hi))
+        return self._load(key)[self.lo : self.hi]
+
+    def __len__(self) -> int:
+        return self.hi - self.lo
+
+
+class ColumnarScanEngine(ScanEngine):
+    """ScanEngine sobre un ColumnarFile: un mmap por columna, abierto al usarla."""
+
+    def __init__(self, heap: "ColumnarFile"):
+        heap.flush_pages()  # los mmap deben ver lo que está en el buffer pool
+        self.heap = heap
+        self.size = heap.heap_size
+        self.dtype, self.kinds = self.build_dtype(heap.schema, heap.slot_size, heap.dictionaries)
+        self.start = 0
+        self._rows = self.size  # las ventanas achican `size`; los mmap cubren toda la tabla
+        self._mm = None  # no hay mmap de la tabla entera
+        self._maps: Dict[str, Tuple[object, np.ndarray, np.ndarray]] = {}
+        self._views: List[ScanEngine] = []
+        self.array = _Columns(self._typed, 0, self.size)
+
+    def _load(self, name: str) -> Tuple[object, np.ndarray, np.ndarray]:
+        """(mmap, columna tipada, bytes crudos por fila) de la columna `name`."""
+        cached = self._maps.get(name)
+        if cached is None:
+            (_, filename, _, width), = self.heap.column_files([name])
+            fmt = dict(self.heap.schema)[name]
+            dtype, _ = self.build_dtype([(name, fmt)], width, self.heap.dictionaries)
+            mm = None
+            if self._rows == 0:
+                typed = np.zeros(0, dtype=dtype)[name]
+                raw = np.zeros((0, width), dtype=np.uint8)
+            else:
+                with open(filename, "rb") as f:
+                    mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                typed = np.frombuffer(mm, dtype=dtype, count=self._rows)[name]
+                raw = np.frombuffer(mm, dtype=np.uint8, count=self._rows * width)
+                raw = raw.reshape(self._rows, width)
+            cached = (mm, typed, raw)
+            self._maps[name] = cached
+        return cached
+
+    def _typed(self, name: str) -> np.ndarray:
+        return self._load(name)[1]
+
+    def iter_records(self, positions, columns=None) -> Iterator[Record]:
+        codec = self.heap.codec.projection(columns)
+        wanted = self.heap.column_files(columns)
+        rec_size = self.heap.rec_data_size
+        positions = np.asarray(positions, dtype=np.int64)
+        for lo in range(0, len(positions), ROWS_PER_BATCH):
+            batch = positions[lo : lo + ROWS_PER_BATCH]
+            rows = np.zeros((len(batch), rec_size), dtype=np.uint8)
+            for name, _, offset, width in wanted:
+                rows[:, offset : offset + width] = self._load(name)[2][batch]
+            yield from codec.iter_unpack(rows.reshape(-1), rec_size)
+
+    def close(self) -> None:
+        maps = [mm for mm, _, _ in self._maps.values()]
+        self._maps.clear()
+        super().close()
+        for mm in maps:
+            _close_map(mm)
+
+
+class ColumnarFile(HeapFile):
+    """Tabla guardada por columnas (`CREATE TABLE ... USING COLUMNAR`).
+
+    • Cada columna vive en su propio archivo de ancho fijo
+      (<tabla>.<columna>.col): el valor del slot `pos` está en
+      `pos * ancho`, así que el archivo se puede mapear directo con NumPy.
+    • El .dat conserva la cabecera (heap_size, free_head) y, por slot,
+      sólo el puntero next_free; el bitmap de validez, el PKLocator, el
+      Bloom y el zone map son los mismos que en HeapFile.
+    • Los slots tienen las mismas posiciones que en un heap (se reciclan
+      por la free-list), por eso los índices y `database.py` no cambian.
+    • Un scan que sólo toca algunas columnas sólo lee esos archivos.
+    """
+
+    scan_engine = ColumnarScanEngine
+
+    # ------------------------------------------------------------------
+    # Creación del archivo ---------------------------------------------
+    # ------------------------------------------------------------------
+    @staticmethod
+    def build_file(
+        table_name: str,
+        schema: List[Tuple[str, str]],
+        primary_key: Optional[str] = None,
+        encodings: Optional[dict] = None,
+    ) -> None:
+        """Crea <table_name>.dat, el .schema.json y un .col vacío por columna."""
+        ColumnarFile.remove_files(table_name)  # columnas de una tabla anterior
+        HeapFile.build_file(table_name, schema, primary_key, "columnar", encodings)
+        for name, _ in schema:
+            open(ColumnarFile.column_filename(table_name, name), "wb").close()
+
+    @staticmethod
+    def column_filename(table_path: str, field_name: str) -> str:
+        return f"{table_path}.{field_name}{COLUMN_SUFFIX}"
+
+    @staticmethod
+    def remove_files(table_path: str) -> None:
+        """Borra los archivos de columnas de la tabla (no hace nada si es un heap)."""
+        pool = get_buffer_pool()
+        for filename in glob.glob(ColumnarFile.column_filename(glob.escape(table_path), "*")):
+            pool.discard(filename)
+            get_extents().discard(filename)
+            os.remove(filename)
+
+    # ------------------------------------------------------------------
+    # Inicialización ----------------------------------------------------
+    # ------------------------------------------------------------------
+    def __init__(self, table_name: str):
+        super().__init__(table_name)
+        for _, filename, _, _ in self._columns:
+            if not os.path.exists(filename):
+                raise FileNotFoundError(f"{filename} no existe. Cree la tabla primero.")
+
+    def _register(self) -> None:
+        # (campo, archivo, offset dentro del registro empaquetado, ancho)
+        self._columns: List[Tuple[str, str, int, int]] = []
+        prefix = ""
+        for name, fmt in self.schema:
+            # mismo layout que el RecordCodec: las columnas codificadas guardan un int32
+            char = "i" if name in self.dictionaries else Record.get_format_char_static(fmt)
+            width = struct.calcsize(char)
+            offset = struct.calcsize(prefix + char) - width
+            prefix += char
+            self._columns.append((name, self.column_filename(self.table_path, name), offset, width))
+        self.pool.register(self.filename, METADATA_SIZE, PTR_SIZE)
+        for _, filename, _, width in self._columns:
+            self.pool.register(filename, 0, width)
+
+    def column_files(self, columns=None) -> List[Tuple[str, str, int, int]]:
+        """(campo, archivo, offset, ancho) de `columns` (todas si es None), en orden del esquema."""
+        if columns is None:
+            return self._columns
+        wanted = set(columns)
+        return [col for col in self._columns if col[0] in wanted]
+
+    # ------------------------------------------------------------------
+    # Acceso a slots (vía BufferPool) ----------------------------------
+    # ------------------------------------------------------------------
+    def _reserve(self, heap_size: int) -> None:
+        extents = get_extents()
+        extents.reserve(self.filename, METADATA_SIZE + heap_size * PTR_SIZE)
+        for _, filename, _, width in self._columns:
+            extents.reserve(filename, heap_size * width)
+
+    def _read_slot(self, pos: int) -> memoryview:
+        """Registro empaquetado del slot `pos`, armado desde todas las columnas."""
+        row = bytearray(self.rec_data_size)
+        for _, filename, offset, width in self._columns:
+            row[offset : offset + width] = self.pool.read_slot(filename, pos)
+        return memoryview(row)
+
+    def _read_next_free(self, pos: int) -> int:
+        return struct.unpack("i", self.pool.read_slot(self.filename, pos))[0]
+
+    def _write_slot(self, pos: int, data: bytes, next_free: Optional[int] = None):
+        for _, filename, offset, width in self._columns:
+            self.pool.write_slot(filename, pos, data[offset : offset + width])
+        if next_free is not None:
+            self.pool.write_slot(self.filename, pos, struct.pack("i", next_free))
+
+    def _append_slots(self, start: int, rows: List[bytes]) -> None:
+        for _, filename, offset, width in self._columns:
+            self.pool.write_slots(
+                filename, start, b"".join(data[offset : offset + width] for data in rows)
+            )
+        self.pool.write_slots(self.filename, start, bytes(PTR_SIZE * len(rows)))
+
+    def _gather(self, columns, lo: int, hi: int) -> np.ndarray:
+        """Registros empaquetados de los slots [lo, hi) (misma página) con sólo `columns` llenas."""
+        rows = np.zeros((hi - lo, self.rec_data_size), dtype=np.uint8)
+        for _, filename, offset, width in columns:
+            _, block = next(self.pool.iter_pages(filename, lo, hi))
+            rows[:, offset : offset + width] = np.frombuffer(block, dtype=np.uint8).reshape(
+                hi - lo, width
+            )
+        return rows.reshape(-1)
+
+    def _iter_slots(self) -> Iterator[Tuple[int, memoryview]]:
+        for pos in range(self.heap_size):
+            yield pos, self._read_slot(pos)
+
+    def _iter_records(
+        self, columns=None, live_only: bool = False, start: int = 0, stop: int = None
+    ) -> Iterator[Tuple[int, Record]]:
+        """Como en HeapFile, pero sólo se leen los archivos de `columns`."""
+        codec = self.codec.projection(columns)
+        wanted = self.column_files(columns)
+        stop = self.heap_size if stop is None else min(stop, self.heap_size)
+        spp = self.pool.slots_per_page
+        validity = self.validity if live_only else None
+        pos = start
+        while pos < stop:
+            if live_only:
+                pos = validity.next_live(pos)
+                if pos is None or pos >= stop:
+                    return
+            last = min(stop, (pos // spp + 1) * spp)  # todas las columnas paginan igual
+            block = self._gather(wanted, pos, last)
+            if live_only:
+                for i in np.flatnonzero(validity.mask(pos, last)).tolist():
+                    yield pos + i, codec.unpack_from(block, i * self.rec_data_size)
+            else:
+                for i, rec in enumerate(codec.iter_unpack(block, self.rec_data_size)):
+                    yield pos + i, rec
+            pos = last
+
+    def flush(self) -> None:
+        for _, filename, _, _ in self._columns:
+            self.pool.flush(filename)
+        super().flush()
+
+    def flush_pages(self) -> None:
+        for _, filename, _, _ in self._columns:
+            if self.pool.dirty(filename):
+                self.pool.flush(filename)
+        super().flush_pages()
+
+    # ------------------------------------------------------------------
+    # Compactación (VACUUM) --------------------------------------------
+    # ------------------------------------------------------------------
+    def _rewrite(self, rows: List[list]) -> List[int]:
+        packed = [self.codec.pack(row) for row in rows]
+        replaced = [(self.filename, self.filename + ".vacuum")]
+        with open(replaced[0][1], "wb") as f:
+            f.write(struct.pack(METADATA_FORMAT, len(rows), -1))
+            f.write(bytes(PTR_SIZE * len(rows)))
+        for _, filename, offset, width in self._columns:
+            replaced.append((filename, filename + ".vacuum"))
+            with open(replaced[-1][1], "wb") as f:
+                f.write(b"".join(data[offset : offset + width] for data in packed))
+        for filename, tmp in replaced:
+            self.pool.discard(filename)  # las páginas cacheadas son del archivo viejo
+            get_extents().discard(filename)
+            wal_replace(tmp, filename)
+        self._register()
+        return list(range(len(rows)))
@@ -0,0 +1,114 @@
+import atexit
+import os
+from typing import Dict, Optional
+
+# --------------------------------------------------------
+#  Configuración por defecto
+# --------------------------------------------------------
+DEFAULT_EXTENT_BYTES = 1024 * 1024  # los archivos crecen de a 1 MB
+
+
+class ExtentAllocator:
+    """Reserva espacio en disco por extents para heaps e índices.
+
+    • Los archivos que crecen por append (heap, B+ Tree, páginas del hash,
+      índice secuencial) piden `reserve(archivo, fin_lógico)` antes de
+      escribir; si el fin cae fuera de lo reservado el archivo se agranda
+      hasta el siguiente múltiplo de `extent_bytes` con `posix_fallocate`
+      (o `ftruncate` si el sistema no lo soporta).
+    • El fin lógico lo lleva cada archivo en su cabecera (heap_size,
+      next_pid, ...); la cola reservada son ceros que nadie lee.
+    • `trim` recorta la cola sin usar: al cerrar la sesión, en VACUUM y al
+      salir del proceso.
+    """
+
+    def __init__(self, extent_bytes: int = DEFAULT_EXTENT_BYTES, enabled: bool = True):
+        if extent_bytes <= 0:
+            raise ValueError("extent_bytes debe ser positivo.")
+        self.extent_bytes = extent_bytes
+        self.enabled = enabled
+        self._sizes: Dict[str, int] = {}  # archivo -> tamaño físico
+        self._ends: Dict[str, int] = {}  # archivo -> fin lógico
+
+        self.extents = 0
+        self.reserved_bytes = 0
+        self.trims = 0
+        self.trimmed_bytes = 0
+
+    def configure(self, extent_bytes: Optional[int] = None, enabled: Optional[bool] = None) -> None:
+        if extent_bytes is not None:
+            if extent_bytes <= 0:
+                raise ValueError("extent_bytes debe ser positivo.")
+            self.extent_bytes = extent_bytes
+        if enabled is not None:
+            self.enabled = enabled
+
+    # ------------------------------------------------------------------
+    # Reserva ----------------------------------------------------------
+    # ------------------------------------------------------------------
+    def reserve(self, filename: str, end: int) -> None:
+        """Asegura que `filename` tenga al menos `end` bytes en disco; `end` es su fin lógico."""
+        self._ends[filename] = end
+        if not self.enabled:
+            return
+        size = self._sizes.get(filename)
+        if size is None:
+            size = os.path.getsize(filename)
+        if end > size:
+            new_size = -(-end // self.extent_bytes) * self.extent_bytes
+            fd = os.open(filename, os.O_RDWR)
+            try:
+                try:
+                    os.posix_fallocate(fd, size, new_size - size)
+                except (AttributeError, OSError):
+                    os.ftruncate(fd, new_size)  # sin fallocate: al menos un solo cambio de tamaño
+            finally:
+                os.close(fd)
+            self.extents += 1
+            self.reserved_bytes += new_size - size
+            size = new_size
+        self._sizes[filename] = size
+
+    def discard(self, filename: str) -> None:
+        """Olvida lo sabido de `filename` (archivo recreado, reemplazado o borrado)."""
+        self._sizes.pop(filename, None)
+        self._ends.pop(filename, None)
+
+    # ------------------------------------------------------------------
+    # Recorte ----------------------------------------------------------
+    # ------------------------------------------------------------------
+    def trim(self, prefix: Optional[str] = None) -> None:
+        """Recorta la cola reservada de todos los archivos, o sólo de los que empiezan con `prefix`."""
+        for filename in list(self._ends):
+            if prefix is not None and not filename.startswith(prefix):
+                continue
+            end = self._ends.pop(filename)
+            self._sizes.pop(filename, None)
+            if not os.path.exists(filename):
+                continue
+            size = os.path.getsize(filename)
+            if size > end:
+                os.truncate(filename, end)
+                self.trims += 1
+                self.trimmed_bytes += size - end
+
+    # ------------------------------------------------------------------
+    # Métricas ----------------------------------------------------------
+    # ------------------------------------------------------------------
+    def stats(self) -> dict:
+        return {
+            "extents": self.extents,
+            "reserved_bytes": self.reserved_bytes,
+            "trims": self.trims,
+            "trimmed_bytes": self.trimmed_bytes,
+            "extent_bytes": self.extent_bytes,
+        }
+
+
+# Reservas compartidas por todos los archivos del proceso
+_extents = ExtentAllocator()
+atexit.register(_extents.trim)
+
+
+def get_extents() -> ExtentAllocator:
+    return _extents
@@ -2,11 +2,29 @@ import struct
 import json
 import os
 from typing import Iterator, Optional, Tuple, List
+import numpy as np
 import pandas as pd
 
-from .Record import Record
-from .TextFile import TextFile
+from functools import partial
+from itertools import islice
+
+from .Record import LazyValues, Record, RecordCodec
+from .TextFile import COMPRESSIONS, LENGTH_MASK, TextFile
 from .Sound import Sound
+from .HistogramMatrix import HistogramMatrix
+from .BufferPool import get_buffer_pool
+from .SideFileCache import get_side_files
+from .PKLocator import PKLocator
+from .PKBloomFilter import PKBloomFilter
+from .ScanEngine import open_scan
+from .ZoneMap import ZoneMap
+from .Catalog import get_catalog
+from .ExtentAllocator import get_extents
+from .RowCache import get_row_cache
+from .ValidityBitmap import ValidityBitmap
+from .ColumnDictionary import ColumnDictionary
+from .ParallelScan import get_parallel_scan
+from .WriteAheadLog import wal_replace
 
 # --------------------------------------------------------
 #  Valores centinela para marcar registros eliminados
@@ -23,15 +41,46 @@ METADATA_FORMAT = "ii"  # [heap_size, free_head]
 METADATA_SIZE = struct.calcsize(METADATA_FORMAT)
 
 
+class _FieldEquals:
+    """Predicado picklable `field == value` para el scan paralelo."""
+
+    def __init__(self, field: str, value):
+        self.field = field
+        self.value = value
+
+    def __call__(self, heap: "HeapFile", ranges, columns, limit) -> List[Record]:
+        return list(islice(heap._eq_records(self.field, self.value, ranges), limit))
+
+
 class HeapFile:
     """Archivo heap con clave primaria opcional y free‑list interna.
 
     • Cada *slot* = datos de Record + 4 bytes (next_free).
     • Cuando un slot está libre: PK = centinela y next_free apunta al
       siguiente hueco (o -1 si es el último).
+    • Qué slots están vivos lo dice el bitmap de validez (<tabla>.valid),
+      no la PK: sirve igual para tablas sin clave primaria.
     • Offsets lógicos nunca cambian, así los índices externos se mantienen.
+    • Toda lectura/escritura de slots y cabecera pasa por el BufferPool
+      compartido; `flush()` baja a disco las páginas sucias.
+    • Si el esquema dice `"storage": "columnar"`, `HeapFile(tabla)` devuelve
+      un ColumnarFile (misma interfaz, un archivo por columna); con
+      `"slotted"`, un SlottedFile (páginas con registros de largo variable).
     """
 
+    def __new__(cls, table_name: str):
+        if cls is HeapFile:
+            storage = get_catalog().storage(table_name)
+            if storage == "columnar":
+                from .ColumnarFile import ColumnarFile
+
+                return super().__new__(ColumnarFile)
+            if storage == "slotted":
+                from .SlottedFile import SlottedFile
+
+                return super().__new__(SlottedFile)
+        return super().__new__(cls)
+
     # ------------------------------------------------------------------
     # Creación del archivo ---------------------------------------------
     # ------------------------------------------------------------------
@@ -40,23 +89,52 @@ class HeapFile:
         table_name: str,
         schema: List[Tuple[str, str]],
         primary_key: Optional[str] = None,
+        storage: Optional[str] = None,
+        encodings: Optional[dict] = None,
     ) -> None:
-        """Crea archivo <table_name>.dat y <table_name>.schema.json."""
+        """Crea archivo <table_name>.dat y <table_name>.schema.json.
+
+        `encodings` (campo -> "dict") marca columnas VARCHAR que se guardan
+        como código de diccionario (<table_name>.<campo>.dict); campo ->
+        "zlib" / "lzma" comprime los blobs de una columna TEXT.
+        """
+        encodings = encodings or {}
+        for field_name, encoding in encodings.items():
+            fmt = dict(schema).get(field_name)
+            if fmt is None:
+                raise KeyError(f"Campo '{field_name}' no existe en el esquema.")
+            if encoding in COMPRESSIONS:
+                if fmt.upper() != "TEXT":
+                    raise ValueError(f"La compresión '{encoding}' es sólo para campos TEXT.")
+                continue
+            if encoding != "dict":
+                raise ValueError(f"Codificación '{encoding}' no soportada.")
+            ColumnDictionary.max_bytes_for(fmt)  # sólo VARCHAR
         filename = table_name + ".dat"
+        get_buffer_pool().discard(filename)  # olvidar páginas de una tabla anterior
+        PKLocator.discard(table_name + ".pk.loc", remove_file=True)
+        PKBloomFilter.discard(table_name + ".pk.bloom", remove_file=True)
+        ZoneMap.discard(table_name + ".zonemap", remove_file=True)
+        ValidityBitmap.discard(table_name + ".valid", remove_file=True)
+        get_extents().discard(filename)
+        get_row_cache().invalidate_table(table_name)
         with open(filename, "wb") as f:
             f.write(struct.pack(METADATA_FORMAT, 0, -1))  # heap_size=0, free_head=-1
 
+        get_catalog().invalidate(table_name)  # esquema nuevo
         schema_file = table_name + ".schema.json"
         fields = [
             {"name": n, "type": fmt, "is_primary_key": (n == primary_key)}
             for n, fmt in schema
         ]
+        for fld in fields:
+            if fld["name"] in encodings:
+                fld["encoding"] = encodings[fld["name"]]
+        meta = {"table_name": os.path.basename(table_name), "fields": fields}
+        if storage is not None:
+            meta["storage"] = storage
         with open(schema_file, "w", encoding="utf-8") as jf:
-            json.dump(
-                {"table_name": os.path.basename(table_name), "fields": fields},
-                jf,
-                indent=4,
-            )
+            json.dump(meta, jf, indent=4)
 
         # Crear archivo .text por cada campo tipo "text"
         for field_name, fmt in schema:
@@ -64,6 +142,8 @@ class HeapFile:
                 TextFile.build_file(table_name, field_name)
             elif fmt.upper() == "SOUND":
                 Sound.build_file(table_name, field_name)
+            if encodings.get(field_name) == "dict":
+                ColumnDictionary.build_file(table_name, field_name)
 
     # ------------------------------------------------------------------
     # Inicialización ----------------------------------------------------
@@ -72,32 +152,70 @@ class HeapFile:
         self.table_name = table_name.split("/")[
             -1
         ]  # saves table name for stuff in parser
+        self.table_path = table_name
         self.filename = table_name + ".dat"
         self.schema, self.primary_key = self._load_schema(self.filename)
-        self.rec_data_size = Record.get_size(self.schema)
-        self.slot_size = self.rec_data_size + PTR_SIZE
 
         if not os.path.exists(self.filename):
             raise FileNotFoundError(
                 f"{self.filename} no existe. Cree la tabla primero."
             )
 
-        with open(self.filename, "rb") as f:
-            self.heap_size, self.free_head = struct.unpack(
-                METADATA_FORMAT, f.read(METADATA_SIZE)
+        # columnas VARCHAR codificadas: en el slot va el código, no la cadena
+        self.dictionaries = {
+            name: ColumnDictionary.open(
+                ColumnDictionary.filename_for(table_name, name), dict(self.schema)[name]
             )
+            for name, encoding in get_catalog().encodings(table_name).items()
+            if encoding == "dict"
+        }
+        if self.dictionaries:
+            self.codec = RecordCodec(self.schema, dictionaries=self.dictionaries)
+        else:
+            self.codec = RecordCodec.for_schema(self.schema)
+        self.rec_data_size = self.codec.size
+        self.slot_size = self.rec_data_size + PTR_SIZE
+
+        self.pool = get_buffer_pool()
+        self._register()
+        self._side_files = {}  # campo -> TextFile / Sound ya abierto
+        self._histogram_files = {}  # campo SOUND -> HistogramMatrix (None si no hay modelo)
+        self._pk_locator = None  # PKLocator ya validado contra el disco
+
+    def _register(self) -> None:
+        """Registra en el BufferPool los archivos de slots de la tabla."""
+        self.pool.register(self.filename, METADATA_SIZE, self.slot_size)
+
+    # ------------------------------------------------------------------
+    # Cabecera (compartida vía BufferPool) -----------------------------
+    # ------------------------------------------------------------------
+    def _read_header(self) -> Tuple[int, int]:
+        return struct.unpack(
+            METADATA_FORMAT, self.pool.read_header(self.filename, METADATA_SIZE)
+        )
+
+    @property
+    def heap_size(self) -> int:
+        return self._read_header()[0]
+
+    @heap_size.setter
+    def heap_size(self, value: int) -> None:
+        self._write_header(value, self.free_head)
+
+    @property
+    def free_head(self) -> int:
+        return self._read_header()[1]
+
+    @free_head.setter
+    def free_head(self, value: int) -> None:
+        self._write_header(self.heap_size, value)
 
     # ------------------------------------------------------------------
     # Utilidades internas ----------------------------------------------
     # ------------------------------------------------------------------
     def _load_schema(self, fname) -> Tuple[List[Tuple[str, str]], Optional[str]]:
-        with open(fname.replace(".dat", ".schema.json"), encoding="utf-8") as jf:
-            js = json.load(jf)
-        schema = [(fld["name"], fld["type"]) for fld in js["fields"]]
-        pk = next(
-            (fld["name"] for fld in js["fields"] if fld.get("is_primary_key")), None
-        )
-        return schema, pk
+        """(esquema, PK) desde el catálogo: el JSON se lee una vez por proceso."""
+        return get_catalog().schema(fname[: -len(".dat")])
 
     def _pk_idx_fmt(self) -> Tuple[int, str]:
         if self.primary_key is None:
@@ -107,17 +225,300 @@ class HeapFile:
                 return i, fmt
         raise RuntimeError("Inconsistencia en schema: PK no encontrada.")
 
+    @property
+    def pk_locator(self) -> PKLocator:
+        """Hash PK → slot persistente (se reconstruye desde el heap si falta).
+
+        Sólo el primer acceso de este HeapFile (uno por sentencia) mira el
+        archivo por si otro proceso lo cambió; los siguientes reusan el
+        locator mientras siga siendo el registrado.
+        """
+        filename = self.table_path + ".pk.loc"
+        loc = self._pk_locator
+        if loc is not None and PKLocator.cached(filename) is loc:
+            return loc
+        _, pk_fmt = self._pk_idx_fmt()
+        self._pk_locator = PKLocator.open(
+            filename,
+            pk_fmt,
+            lambda: self.extract_index(self.primary_key),
+            self.heap_size,
+        )
+        return self._pk_locator
+
+    @property
+    def pk_bloom(self) -> PKBloomFilter:
+        """Filtro de Bloom de la PK (se construye desde el heap si falta)."""
+        _, pk_fmt = self._pk_idx_fmt()
+        return PKBloomFilter.open(
+            self.table_path + ".pk.bloom",
+            pk_fmt,
+            lambda: (key for key, _ in self.extract_index(self.primary_key)),
+        )
+
+    @property
+    def validity(self) -> ValidityBitmap:
+        """Bitmap de slots vivos (se reconstruye desde la free-list si falta)."""
+        return ValidityBitmap.open(
+            self.table_path + ".valid", self.heap_size, self._free_slots
+        )
+
+    @property
+    def live_count(self) -> int:
+        """Cantidad de registros vivos, en O(1)."""
+        return self.validity.count
+
+    def next_live(self, pos: int) -> Optional[int]:
+        """Primer slot vivo desde `pos` (inclusive), o None."""
+        return self.validity.next_live(pos)
+
+    def _free_slots(self) -> Iterator[int]:
+        """Recorre la free-list: exactamente los huecos del heap."""
+        pos, steps = self.free_head, self.heap_size
+        while pos != -1 and steps > 0:  # `steps` corta una lista corrupta con ciclo
+            yield pos
+            pos = self._read_next_free(pos)
+            steps -= 1
+
+    def _locate_pk(self, key) -> Optional[int]:
+        """Slot del registro vivo con PK = key, o None (O(1) vía PKLocator)."""
+        pk_idx, _ = self._pk_idx_fmt()
+        locator = self.pk_locator
+        pos = locator.get(key)
+        if pos is None:
+            return None
+        if pos < self.heap_size:
+            rec = self.codec.unpack(self._read_slot(pos))
+            if rec.values[pk_idx] == locator.normalize(key):
+                return pos
+        # bitácora desactualizada respecto al heap: reconstruir y reintentar
+        locator.rebuild(self.extract_index(self.primary_key))
+        return locator.get(key)
+
     @staticmethod
     def _sentinel(fmt: str):
         if "s" in fmt:
             return SENTINEL_STR
-        if fmt[-1] in "fd":
-            return SENTINEL_FLOAT
-        return SENTINEL_INT
+        value = SENTINEL_FLOAT if fmt[-1] in "fd" else SENTINEL_INT
+        if fmt[:-1].isdigit():  # punto (2f, 3i...): una coordenada centinela por eje
+            return (value,) * int(fmt[:-1])
+        return value
+
+    def _write_header(self, heap_size: int, free_head: int) -> None:
+        self.pool.write_header(
+            self.filename, struct.pack(METADATA_FORMAT, heap_size, free_head)
+        )
 
-    def _write_header(self, fh):
-        fh.seek(0)
-        fh.write(struct.pack(METADATA_FORMAT, self.heap_size, self.free_head))
+    # ------------------------------------------------------------------
+    # Acceso a slots (vía BufferPool) ----------------------------------
+    # ------------------------------------------------------------------
+    def _reserve(self, heap_size: int) -> None:
+        """Antes de crecer: el archivo se agranda de a extents, no slot por slot."""
+        get_extents().reserve(self.filename, METADATA_SIZE + heap_size * self.slot_size)
+
+    def _read_slot(self, pos: int) -> memoryview:
+        """Bytes de datos del slot `pos` (sin el puntero next_free)."""
+        return self.pool.read_slot(self.filename, pos)[: self.rec_data_size]
+
+    def _read_next_free(self, pos: int) -> int:
+        slot = self.pool.read_slot(self.filename, pos)
+        return struct.unpack("i", slot[self.rec_data_size :])[0]
+
+    def _write_slot(self, pos: int, data: bytes, next_free: Optional[int] = None):
+        """Escribe los datos del slot; si `next_free` es None conserva el puntero."""
+        if next_free is not None:
+            data = data + struct.pack("i", next_free)
+        self.pool.write_slot(self.filename, pos, data)
+
+    def _append_slots(self, start: int, rows: List[bytes]) -> None:
+        """Escribe registros empaquetados desde el slot `start` (next_free = 0) en un solo bloque."""
+        tail = struct.pack("i", 0)
+        self.pool.write_slots(self.filename, start, b"".join(data + tail for data in rows))
+
+    # ------------------------------------------------------------------
+    # Campos TEXT / SOUND (archivos laterales) -------------------------
+    # ------------------------------------------------------------------
+    def _side_file(self, field_name: str, fmt: str):
+        side = self._side_files.get(field_name)
+        if side is None:
+            if fmt.upper() == "TEXT":
+                compression = get_catalog().encodings(self.table_path).get(field_name)
+                side = TextFile(self.table_name, field_name, compression)
+            else:
+                side = Sound(self.filename.replace(".dat", ""), field_name)
+            self._side_files[field_name] = side
+        return side
+
+    def _histograms(self, field_name: str) -> Optional[HistogramMatrix]:
+        """Matriz de histogramas del campo SOUND, si ya se construyó el modelo acústico."""
+        if field_name not in self._histogram_files:
+            matrix = None
+            if HistogramMatrix.exists(self.table_path, field_name):
+                matrix = HistogramMatrix(self.table_path, field_name)
+            self._histogram_files[field_name] = matrix
+        return self._histogram_files[field_name]
+
+    def invalidate_histograms(self, field_name: Optional[str] = None) -> None:
+        """Olvida la matriz abierta de un campo (o de todos): se vuelve a leer al usarse."""
+        if field_name is None:
+            self._histogram_files.clear()
+        else:
+            self._histogram_files.pop(field_name, None)
+
+    def store_histograms(self, field_name: str, positions: List[int], histograms) -> None:
+        """Guarda los histogramas del campo SOUND de esos RIDs en su HistogramMatrix.
+
+        En el registro el offset de histograma pasa a 0: ya no apunta a un
+        HistogramFile, sólo indica que la fila de la matriz está cargada.
+        """
+        self._histograms(field_name).set_many(positions, histograms)
+        idx = self.schema.index((field_name, dict(self.schema)[field_name]))
+        for pos in positions:
+            values = self.codec.unpack(self._read_slot(pos)).values
+            values[idx] = (values[idx][0], 0)
+            self._write_slot(pos, self.codec.pack(values))
+        get_row_cache().invalidate_table(self.table_path)
+
+    def _lazy_values(self, values, schema=None, crude_data=False) -> LazyValues:
+        """Valores con TEXT/SOUND resueltos recién cuando se acceden."""
+        pending = {}
+        for i, (fname, fmt) in enumerate(schema or self.schema):
+            if fmt.upper() == "TEXT":
+                pending[i] = partial(self._side_file(fname, fmt).read, values[i])
+            elif fmt.upper() == "SOUND" and not crude_data:
+                pending[i] = partial(self._side_file(fname, fmt).read, values[i][0])
+        return LazyValues(values, pending)
+
+    def _iter_slots(self) -> Iterator[Tuple[int, memoryview]]:
+        """Recorre (pos, datos) de todos los slots, incluidos los huecos."""
+        for pos, slot in self.pool.iter_slots(self.filename, 0, self.heap_size):
+            yield pos, slot[: self.rec_data_size]
+
+    def _iter_records(
+        self, columns=None, live_only: bool = False, start: int = 0, stop: int = None
+    ) -> Iterator[Tuple[int, Record]]:
+        """Recorre (pos, Record) de los slots [start, stop) decodificando página a página.
+
+        • `columns`: sólo se decodifican esos campos (Record proyectado).
+        • `live_only`: salta los huecos según el bitmap de validez, sin
+          decodificarlos; las páginas sin ningún slot vivo ni se leen.
+        """
+        codec = self.codec.projection(columns)
+        stop = self.heap_size if stop is None else min(stop, self.heap_size)
+        if not live_only:
+            for first, block in self.pool.iter_pages(self.filename, start, stop):
+                for i, rec in enumerate(codec.iter_unpack(block, self.slot_size)):
+                    yield first + i, rec
+            return
+        validity = self.validity
+        pos = validity.next_live(start)
+        while pos is not None and pos < stop:
+            # una página desde el próximo vivo: los tramos de huecos ni se leen
+            first, block = next(self.pool.iter_pages(self.filename, pos, stop))
+            end = first + len(block) // self.slot_size
+            for i in np.flatnonzero(validity.mask(first, end)).tolist():
+                yield first + i, codec.unpack_from(block, i * self.slot_size)
+            pos = validity.next_live(end)
+
+    def _place(self, data: bytes) -> int:
+        """Ubica un registro empaquetado: recicla hueco o hace append."""
+        heap_size, free_head = self._read_header()
+        if free_head == -1:  # sin huecos → append
+            slot_off = heap_size
+            heap_size += 1
+            self._reserve(heap_size)
+        else:  # reciclar hueco
+            slot_off = free_head
+            free_head = self._read_next_free(slot_off)  # siguiente libre
+        self._write_slot(slot_off, data, 0)  # next_free = 0
+        self.validity.set(slot_off)  # antes de la cabecera: el bitmap sigue al día
+        self._write_header(heap_size, free_head)  # actualizar cabecera
+        return slot_off
+
+    def _place_many(self, rows: List[bytes]) -> List[int]:
+        """Como `_place` para un lote: huecos primero y el resto en un solo append."""
+        heap_size, free_head = self._read_header()
+        offsets = []
+        appended = []
+        for data in rows:
+            if free_head != -1:  # reciclar hueco
+                slot_off = free_head
+                free_head = self._read_next_free(slot_off)
+                self._write_slot(slot_off, data, 0)
+            else:  # acumular para un solo append
+                slot_off = heap_size + len(appended)
+                appended.append(data)
+            offsets.append(slot_off)
+
+        if appended:
+            self._reserve(heap_size + len(appended))
+            self._append_slots(heap_size, appended)
+            heap_size += len(appended)
+        self.validity.set_many(offsets)
+        self._write_header(heap_size, free_head)
+        return offsets
+
+    def _free(self, pos: int, values) -> None:
+        """Encadena el slot `pos` a la free-list dejando `values` (PK centinela)."""
+        self._write_slot(pos, self.codec.pack(values), self.free_head)
+        self.free_head = pos
+
+    def flush(self) -> None:
+        """Escribe a disco las páginas sucias, la cabecera, el zone map, el bitmap,
+        lo pendiente del PKLocator y el filtro de Bloom de esta tabla."""
+        self.pool.flush(self.filename)
+        ZoneMap.save_open(self.table_path + ".zonemap")
+        ValidityBitmap.save_open(self.table_path + ".valid")
+        PKLocator.save_open(self.table_path + ".pk.loc")
+        PKBloomFilter.save_open(self.table_path + ".pk.bloom")
+
+    def flush_pages(self) -> None:
+        """Baja sólo las páginas sucias de la tabla (lo que un mmap necesita ver);
+        sin cambios en el pool no hace nada."""
+        if self.pool.dirty(self.filename):
+            self.pool.flush(self.filename)
+
+    # ------------------------------------------------------------------
+    # Zone map (min/max por bloque) ------------------------------------
+    # ------------------------------------------------------------------
+    def zones(self, engine=None) -> Optional[ZoneMap]:
+        """Zone map al día con el heap, o None si la tabla no tiene columnas mapeables."""
+        zones = ZoneMap.open(self)
+        if zones is not None and not zones.up_to_date(self.heap_size):
+            if engine is not None:
+                zones.refresh(engine)
+                return zones
+            engine = open_scan(self)
+            if engine is None:
+                return None
+            with engine:
+                zones.refresh(engine)
+        return zones
+
+    def _eq_records(self, field: str, value, ranges=None, engine=None) -> Iterator[Record]:
+        """Registros vivos con `field == value` en `ranges`, ventana por ventana."""
+        if engine is None:
+            with open_scan(self) as engine:
+                yield from self._eq_records(field, value, ranges, engine)
+            return
+        for window in engine.windows(ranges=ranges):
+            yield from window.iter_records(
+                window.positions(window.live_mask() & window.eq_mask(field, value))
+            )
+
+    def _zone_ranges(self, engine, field: str, value):
+        """Tramos de slots donde `field == value` puede darse (None = todo el heap)."""
+        if not isinstance(value, (int, float)):
+            return None
+        zones = self.zones(engine)
+        if zones is None or not zones.has_column(field):
+            return None
+        return zones.ranges(zones.overlaps(field, value, value))
+
+    def _zone_widen(self, pos: int, values) -> None:
+        zones = ZoneMap.open(self)
+        if zones is not None:
+            zones.widen(pos, {name: v for (name, _), v in zip(self.schema, values)})
 
     # ------------------------------------------------------------------
     # Inserción ---------------------------------------------------------
@@ -127,8 +528,7 @@ class HeapFile:
         for idx, (field_name, fmt) in enumerate(record.schema):
             if fmt == "text":
                 text_value = record.values[idx]
-                text_file = TextFile(self.table_name, field_name)
-                offset = text_file.insert(text_value)
+                offset = self._side_file(field_name, fmt).insert(text_value)
                 record.values[idx] = offset  # reemplazar texto por offset
 
     def _process_sound_fields(self, record: Record) -> None:
@@ -136,53 +536,94 @@ class HeapFile:
             if fmt.upper() == "SOUND":
                 sound_path = record.values[idx]
                 if isinstance(sound_path, str):
-                    sound_file = Sound(self.filename.replace(".dat", ""), field_name)
-                    sound_offset = sound_file.insert(sound_path)
+                    sound_offset = self._side_file(field_name, fmt).insert(sound_path)
                     record.values[idx] = (sound_offset, -1)
 
     def insert_record(self, record: Record) -> int:
         if record.schema != self.schema:
             raise ValueError("Esquema del registro no coincide.")
 
-        # ── 1. Verificar unicidad de PK en una SOLA pasada ─────────────
+        # ── 1. Verificar unicidad de PK con el PKLocator (O(1)) ────────
         if self.primary_key:
             pk_idx, pk_fmt = self._pk_idx_fmt()
             pk_val = record.values[pk_idx]
             if pk_val == self._sentinel(pk_fmt):
                 raise ValueError("Valor centinela no permitido en PK.")
 
-            with open(self.filename, "rb") as fh:  # una sola apertura
-                fh.seek(METADATA_SIZE)
-                for _ in range(self.heap_size):
-                    buf = fh.read(self.rec_data_size)
-                    if len(buf) < self.rec_data_size:
-                        break
-                    if Record.unpack(buf, self.schema).values[pk_idx] == pk_val:
-                        raise ValueError(f"PK duplicada: {pk_val}")
-                    fh.seek(PTR_SIZE, os.SEEK_CUR)  # saltar next_free
+            if self._locate_pk(pk_val) is not None:
+                raise ValueError(f"PK duplicada: {pk_val}")
 
         self._process_text_fields(record)
         self._process_sound_fields(record)
 
         # ── 2. Insertar (reciclar hueco o append) ─────────────────────
-        with open(self.filename, "r+b") as fh:
-            if self.free_head == -1:  # sin huecos → append
-                slot_off = self.heap_size
-                fh.seek(0, os.SEEK_END)
-                fh.write(record.pack())
-                fh.write(struct.pack("i", 0))  # next_free = 0
-                self.heap_size += 1
-            else:  # reciclar hueco
-                slot_off = self.free_head
-                byte_off = METADATA_SIZE + slot_off * self.slot_size
-                fh.seek(byte_off + self.rec_data_size)
-                self.free_head = struct.unpack("i", fh.read(4))[0]  # siguiente libre
-                fh.seek(byte_off)
-                fh.write(record.pack())
-                fh.write(struct.pack("i", 0))
-            self._write_header(fh)  # actualizar cabecera
-            print("Registro:", record, " insertado correctamente")
-            return slot_off
+        slot_off = self._place(self.codec.pack(record.values))
+        self._zone_widen(slot_off, record.values)
+        if self.primary_key:
+            self.pk_locator.add(pk_val, slot_off)
+            self.pk_bloom.add(pk_val)
+            get_row_cache().invalidate(self.table_path, pk_val)
+        print("Registro:", record, " insertado correctamente")
+        return slot_off
+
+    def _process_blob_fields_many(self, records: List[Record]) -> None:
+        """Como _process_text/sound_fields pero una apertura por columna."""
+        for idx, (field_name, fmt) in enumerate(self.schema):
+            if fmt == "text":
+                offsets = self._side_file(field_name, fmt).insert_many(
+                    [rec.values[idx] for rec in records]
+                )
+                for rec, offset in zip(records, offsets):
+                    rec.values[idx] = offset
+            elif fmt.upper() == "SOUND":
+                pending = [rec for rec in records if isinstance(rec.values[idx], str)]
+                if not pending:
+                    continue
+                offsets = self._side_file(field_name, fmt).insert_many([rec.values[idx] for rec in pending])
+                for rec, offset in zip(pending, offsets):
+                    rec.values[idx] = (offset, -1)
+
+    def insert_many(self, records: List[Record]) -> List[int]:
+        """Inserta un lote de registros y devuelve sus offsets (en el mismo orden).
+
+        • Verifica la PK contra el PKLocator y dentro del propio lote.
+        • Reutiliza primero los huecos de la free-list y escribe el resto
+          como un único bloque al final del archivo.
+        • La cabecera y la bitácora de PK se actualizan una sola vez.
+        """
+        records = list(records)
+        for record in records:
+            if record.schema != self.schema:
+                raise ValueError("Esquema del registro no coincide.")
+
+        if self.primary_key:
+            pk_idx, pk_fmt = self._pk_idx_fmt()
+            sentinel = self._sentinel(pk_fmt)
+            seen = set()
+            for record in records:
+                pk_val = record.values[pk_idx]
+                if pk_val == sentinel:
+                    raise ValueError("Valor centinela no permitido en PK.")
+                norm = self.pk_locator.normalize(pk_val)
+                if norm in seen or self._locate_pk(pk_val) is not None:
+                    raise ValueError(f"PK duplicada: {pk_val}")
+                seen.add(norm)
+
+        self._process_blob_fields_many(records)
+
+        offsets = self._place_many([self.codec.pack(record.values) for record in records])
+        for record, off in zip(records, offsets):
+            self._zone_widen(off, record.values)
+
+        if self.primary_key:
+            self.pk_locator.add_many(
+                (record.values[pk_idx], off) for record, off in zip(records, offsets)
+            )
+            self.pk_bloom.add_many(record.values[pk_idx] for record in records)
+            for record in records:
+                get_row_cache().invalidate(self.table_path, record.values[pk_idx])
+        print(f"{len(records)} registros insertados en '{self.table_name}'")
+        return offsets
 
     def insert_record_free(self, record: Record) -> int:
         """Inserta un registro sin verificar unicidad de PK. Usa free-list si hay huecos."""
@@ -192,73 +633,89 @@ class HeapFile:
         self._process_text_fields(record)
         self._process_sound_fields(record)
 
-        with open(self.filename, "r+b") as fh:
-            if self.free_head == -1:  # sin huecos → append
-                slot_off = self.heap_size
-                fh.seek(0, os.SEEK_END)
-                fh.write(record.pack())
-                fh.write(struct.pack("i", 0))  # next_free = 0
-                self.heap_size += 1
-            else:  # reciclar hueco
-                slot_off = self.free_head
-                byte_off = METADATA_SIZE + slot_off * self.slot_size
-                fh.seek(byte_off + self.rec_data_size)
-                self.free_head = struct.unpack("i", fh.read(4))[0]  # siguiente libre
-                fh.seek(byte_off)
-                fh.write(record.pack())
-                fh.write(struct.pack("i", 0))
-
-            self._write_header(fh)
-            print(
-                "Registro (sin restricción PK):",
-                record,
-                "insertado en offset",
-                slot_off,
-            )
-            return slot_off
+        slot_off = self._place(self.codec.pack(record.values))
+        self._zone_widen(slot_off, record.values)
+        if self.primary_key:
+            pk_idx, _ = self._pk_idx_fmt()
+            self.pk_locator.add(record.values[pk_idx], slot_off)
+            self.pk_bloom.add(record.values[pk_idx])
+            get_row_cache().invalidate(self.table_path, record.values[pk_idx])
+        print(
+            "Registro (sin restricción PK):",
+            record,
+            "insertado en offset",
+            slot_off,
+        )
+        return slot_off
 
     # ------------------------------------------------------------------
     # Borrado -----------------------------------------------------------
     # ------------------------------------------------------------------
+    def _release_slot(self, pos: int) -> Record:
+        """Convierte el slot `pos` en hueco y devuelve el registro que tenía."""
+        old_rec = self.codec.unpack(self._read_slot(pos))
+        values = list(old_rec.values)  # copia para el hueco; old_rec se devuelve intacto
+        # Borrar campos tipo text
+        for i, (field_name, fmt) in enumerate(self.schema):
+            if fmt == "text":
+                offset = old_rec.values[i]
+                self._side_file(field_name, fmt).delete(offset)
+            elif fmt.upper() == "SOUND":
+                sound_offset, _ = old_rec.values[i]
+                self._side_file(field_name, fmt).delete(sound_offset)
+                histograms = self._histograms(field_name)
+                if histograms is not None:
+                    histograms.delete(pos)
+        # marcar hueco: PK = sentinel (compatibilidad), next_free = free_head y bit en 0
+        if self.primary_key is not None:
+            pk_idx, pk_fmt = self._pk_idx_fmt()
+            get_row_cache().invalidate(self.table_path, old_rec.values[pk_idx])
+            values[pk_idx] = self._sentinel(pk_fmt)
+        self._free(pos, values)
+        self.validity.clear(pos)
+        zones = ZoneMap.open(self)
+        if zones is not None:
+            zones.invalidate(pos)
+        return old_rec
+
     def delete_by_pk(self, key) -> Tuple[bool, int, Optional[Record]]:
         if self.primary_key is None:
             raise ValueError("Tabla sin clave primaria.")
-        pk_idx, pk_fmt = self._pk_idx_fmt()
-        sentinel = self._sentinel(pk_fmt)
-
-        with open(self.filename, "r+b") as fh:
-            for pos in range(self.heap_size):
-                byte_off = METADATA_SIZE + pos * self.slot_size
-                fh.seek(byte_off)
-                buf = fh.read(self.rec_data_size)
-                rec = Record.unpack(buf, self.schema)
-                old_rec = Record.unpack(buf, self.schema)
-                if rec.values[pk_idx] != key:
-                    continue
-                # Borrar campos tipo text
-                for i, (field_name, fmt) in enumerate(self.schema):
-                    if fmt == "text":
-                        offset = old_rec.values[i]
-                        TextFile(self.table_name, field_name).delete(offset)
-                    elif fmt.upper() == "SOUND":
-                        sound_offset, _ = old_rec.values[i]
-                        Sound(self.filename.replace(".dat", ""), field_name).delete(sound_offset)
-                # marcar hueco: set PK = sentinel y next_free = free_head
-                rec.values[pk_idx] = sentinel
-                fh.seek(byte_off)
-                fh.write(rec.pack())
-                fh.write(struct.pack("i", self.free_head))
-                self.free_head = pos
-                self._write_header(fh)
-                print(
-                    "Registro con PK:",
-                    key,
-                    "con contenido:",
-                    old_rec,
-                    "borrado correctamente",
-                )
-                return True, pos, old_rec
-        return False, -1, None
+
+        pos = self._locate_pk(key)
+        if pos is None:
+            return False, -1, None
+
+        old_rec = self._release_slot(pos)
+        self.pk_locator.remove(key)
+        print(
+            "Registro con PK:",
+            key,
+            "con contenido:",
+            old_rec,
+            "borrado correctamente",
+        )
+        return True, pos, old_rec
+
+    def delete_by_offset(self, pos: int) -> Tuple[bool, Optional[Record]]:
+        """Borra el registro del slot `pos` (sirve también para tablas sin PK)."""
+        if pos < 0 or pos >= self.heap_size:
+            raise IndexError("Offset fuera de rango")
+        if not self.validity.is_live(pos):
+            return False, None
+
+        old_rec = self._release_slot(pos)
+        if self.primary_key is not None:
+            pk_idx, _ = self._pk_idx_fmt()
+            self.pk_locator.remove(old_rec.values[pk_idx])
+        print(
+            "Registro en offset",
+            pos,
+            "con contenido:",
+            old_rec,
+            "borrado correctamente",
+        )
+        return True, old_rec
 
     # ------------------------------------------------------------------
     #  Búsqueda secuencial por cualquier campo --------------------------
@@ -272,57 +729,74 @@ class HeapFile:
 
         Si el campo no existe, lanza KeyError.
         """
-        # --- validar campo -------------------------------------------------
+        return list(self.iter_search_by_field(field, value, crude_data))
+
+    def iter_search_by_field(
+        self, field: str, value, crude_data=False
+    ) -> Iterator[Record]:
+        """Igual que search_by_field pero entrega las coincidencias de a una."""
+        # los errores de campo deben saltar al llamar, no al primer next()
         names = [n for n, _ in self.schema]
         if field not in names:
             raise KeyError(f"Campo '{field}' no existe en el esquema.")
-        fld_idx = names.index(field)
-
-        # --- info de PK/tombstone -----------------------------------------
-        pk_idx, pk_sentinel = None, None
-        stop_early = False
-        if self.primary_key is not None:
-            pk_idx, pk_fmt = self._pk_idx_fmt()
-            pk_sentinel = self._sentinel(pk_fmt)
-            stop_early = field == self.primary_key
-
-        resultados = []
-
-        with open(self.filename, "rb") as fh:
-            fh.seek(METADATA_SIZE)
-            for _ in range(self.heap_size):
-                buf = fh.read(self.rec_data_size)
-                if len(buf) < self.rec_data_size:
-                    break
-                rec = Record.unpack(buf, self.schema)
-
-                # ignorar huecos
-                if pk_idx is not None and rec.values[pk_idx] == pk_sentinel:
-                    fh.seek(PTR_SIZE, os.SEEK_CUR)
-                    continue
-
+        return self._search_cursor(field, names.index(field), value, crude_data)
+
+    def _search_cursor(self, field: str, fld_idx: int, value, crude_data) -> Iterator[Record]:
+        # --- búsqueda por PK: se corta en la primera coincidencia ---------
+        stop_early = self.primary_key is not None and field == self.primary_key
+
+        cache_rows = stop_early and not crude_data
+        if cache_rows:  # fila caliente: sin índice, heap ni archivos laterales
+            cached = self.cached_rows(field, value)
+            if cached is not None:
+                yield from cached
+                return
+
+        engine = None if stop_early else open_scan(self)
+        if stop_early:  # búsqueda por PK: ir directo al slot
+            pos = self._locate_pk(value)
+            slots = [] if pos is None else [self.codec.unpack(self._read_slot(pos))]
+        elif engine is not None:  # filtro vectorizado, en paralelo si la tabla es grande
+            ranges = self._zone_ranges(engine, field, value)
+            slots = get_parallel_scan().scan(
+                self, _FieldEquals(field, value), ranges=ranges
+            ) or self._eq_records(field, value, ranges, engine)
+        else:  # los huecos los descarta el bitmap de validez
+            slots = (rec for _, rec in self._iter_records(live_only=True))
+
+        try:
+            for rec in slots:
                 if rec.values[fld_idx] == value:
-                    # --- Reemplazar offsets por contenido real para campos 'text' ---
-                    updated_values = list(rec.values)
-                    for i, (fname, fmt) in enumerate(self.schema):
-                        if fmt.upper() == "TEXT":
-                            offset = updated_values[i]
-                            updated_values[i] = TextFile(self.table_name, fname).read(offset)
-                        elif fmt.upper() == "SOUND":
-                            if not crude_data:
-                                sound_offset, _ = updated_values[i]
-                                updated_values[i] = Sound(self.filename.replace(".dat", ""), fname).read(sound_offset)
-
-                    resultados.append(Record(self.schema, updated_values))
+                    # --- offsets de 'text'/'sound' se resuelven al accederlos ---
+                    found = Record(self.schema, self._lazy_values(rec.values, crude_data=crude_data))
+                    if cache_rows:
+                        self.cache_rows(field, value, [found])
+                    yield found
 
                     if stop_early:
                         break
+        finally:
+            if engine is not None:
+                engine.close()
 
-                fh.seek(PTR_SIZE, os.SEEK_CUR)
-
-        # devolver un solo registro si sólo hay uno, si prefieres:
-        # return resultados[0] if len(resultados) == 1 else resultados
-        return resultados
+    # ------------------------------------------------------------------
+    # Caché de filas por PK --------------------------------------------
+    # ------------------------------------------------------------------
+    def cached_rows(self, field: str, value) -> Optional[List[Record]]:
+        """Filas cacheadas de `field = value` si `field` es la PK; None si no están."""
+        if self.primary_key is None or field != self.primary_key:
+            return None
+        values = get_row_cache().get(self.table_path, value)
+        return None if values is None else [Record(self.schema, values)]
+
+    def cache_rows(self, field: str, value, records: List[Record]) -> List[Record]:
+        """Guarda en la caché el resultado de una búsqueda por PK y lo devuelve."""
+        if self.primary_key is None or field != self.primary_key or len(records) != 1:
+            return records
+        values = records[0].values
+        if values[self._pk_idx_fmt()[0]] == value:  # no cachear un slot ya borrado
+            get_row_cache().put(self.table_path, value, values)
+        return records
 
     # ------------------------------------------------------------------
     # Extracción de índice (ignora huecos) -----------------------------
@@ -331,30 +805,17 @@ class HeapFile:
         names = [n for n, _ in self.schema]
         if field not in names:
             raise KeyError(f"Campo '{field}' no existe.")
-        fld_idx = names.index(field)
 
-        pk_idx, pk_sentinel = None, None
-        if self.primary_key is not None:
-            pk_idx, pk_fmt = self._pk_idx_fmt()
-            pk_sentinel = self._sentinel(pk_fmt)
-
-        out, pos = [], 0
-        with open(self.filename, "rb") as fh:
-            fh.seek(METADATA_SIZE)
-            while pos < self.heap_size:
-                buf = fh.read(self.rec_data_size)
-                if len(buf) < self.rec_data_size:
-                    break
-                rec = Record.unpack(buf, self.schema)
-                # saltar huecos
-                if pk_idx is not None and rec.values[pk_idx] == pk_sentinel:
-                    fh.seek(PTR_SIZE, os.SEEK_CUR)
-                    pos += 1
-                    continue
-                out.append((rec.values[fld_idx], pos))
-                fh.seek(PTR_SIZE, os.SEEK_CUR)
-                pos += 1
-        return out
+        engine = open_scan(self)
+        if engine is not None:
+            with engine:
+                positions = engine.positions(engine.live_mask())
+                return list(zip(engine.values(field, positions), positions.tolist()))
+
+        return [
+            (rec.values[0], pos)
+            for pos, rec in self._iter_records([field], live_only=True)
+        ]
 
     # ------------------------------------------------------------------
     # Fetch por offset --------------------------------------------------
@@ -363,22 +824,56 @@ class HeapFile:
         if pos < 0 or pos >= self.heap_size:
             raise IndexError("Offset fuera de rango")
         
-        with open(self.filename, "rb") as fh:
-            fh.seek(METADATA_SIZE + pos * self.slot_size)
-            buf = fh.read(self.rec_data_size)
-            record = Record.unpack(buf, self.schema)
-            
-            # Procesar campos de texto
-            updated_values = list(record.values)
-            for i, (fname, fmt) in enumerate(self.schema):
-                if fmt.upper() == "TEXT":
-                    offset = updated_values[i]
-                    updated_values[i] = TextFile(self.table_name, fname).read(offset)
-                elif fmt.upper() == "SOUND":
-                    sound_offset, _ = updated_values[i]
-                    updated_values[i] = Sound(self.filename.replace(".dat", ""), fname).read(sound_offset)
-            
-            return Record(self.schema, updated_values)
+        record = self.codec.unpack(self._read_slot(pos))
+
+        # Campos de texto/sonido: se leen recién cuando se acceden
+        return Record(self.schema, self._lazy_values(record.values))
+
+    def fetch_many(self, offsets, columns=None) -> List[Record]:
+        """Versión por lotes de fetch_record_by_offset (mismo orden que `offsets`).
+
+        • Los offsets se ordenan y deduplican; los slots contiguos se leen
+          juntos, página por página, desde el buffer pool.
+        • Los campos TEXT/SOUND se resuelven con una lectura ordenada por
+          columna (un solo open por archivo lateral).
+        • Con `columns` sólo se decodifican esos campos.
+        """
+        offsets = [int(pos) for pos in offsets]
+        if not offsets:
+            return []
+        heap_size = self.heap_size
+        for pos in offsets:
+            if pos < 0 or pos >= heap_size:
+                raise IndexError("Offset fuera de rango")
+
+        codec = self.codec.projection(columns)
+        decoded = {}
+        wanted = sorted(set(offsets))
+        run_start = prev = wanted[0]
+        for pos in wanted[1:] + [None]:
+            if pos is not None and pos == prev + 1:
+                prev = pos
+                continue
+            # corrida [run_start, prev] de slots contiguos
+            for i, rec in self._iter_records(columns, False, run_start, prev + 1):
+                decoded[i] = rec.values
+            if pos is not None:
+                run_start = prev = pos
+
+        # resolver TEXT/SOUND por columna, en orden de offset del archivo lateral
+        for i, (fname, fmt) in enumerate(codec.schema):
+            if fmt.upper() == "TEXT":
+                side = self._side_file(fname, fmt)
+                blob_offsets = [decoded[pos][i] for pos in wanted]
+            elif fmt.upper() == "SOUND":
+                side = self._side_file(fname, fmt)
+                blob_offsets = [decoded[pos][i][0] for pos in wanted]
+            else:
+                continue
+            for pos, value in zip(wanted, side.read_many(blob_offsets)):
+                decoded[pos][i] = value
+
+        return [Record(codec.schema, list(decoded[pos])) for pos in offsets]
 
     # ------------------------------------------------------------------
     # Utilidades de depuración -----------------------------------------
@@ -388,94 +883,77 @@ class HeapFile:
         names = [n for n, _ in self.schema]
         print(" | ".join(names))
         print("-" * 10 * len(names))
-        with open(self.filename, "rb") as fh:
-            fh.seek(METADATA_SIZE)
-            for i in range(self.heap_size):
-                buf = fh.read(self.rec_data_size)
-                rec = Record.unpack(buf, self.schema)
-
-                # Reemplazar offsets por texto real
-                for idx, (name, fmt) in enumerate(self.schema):
-                    if fmt.upper() == "TEXT":
-                        offset = rec.values[idx]
-                        text_file = TextFile(self.table_name, name)
-                        text_content = text_file.read(offset)
-                        rec.values[idx] = text_content
-                    elif fmt.upper() == "SOUND":
-                        sound_offset, _ = rec.values[idx]
-                        sound_file = Sound(self.filename.replace(".dat", ""), name)
-                        sound_path = sound_file.read(sound_offset)
-                        rec.values[idx] = sound_path
-
-                print(rec)
-                fh.seek(PTR_SIZE, os.SEEK_CUR)
+        for _, rec in self._iter_records():
+
+            # Reemplazar offsets por texto real
+            rec.values = self._lazy_values(rec.values)
+            print(rec)
 
     # ------------------------------------------------------------------
     # Utilidades de parser ---------------------------------------------
     # ------------------------------------------------------------------
 
-    def get_all_records(self) -> List[Record]:
-        """Devuelve todos los registros no eliminados en una lista."""
-        records = []
-        with open(self.filename, "rb") as f:
-            f.seek(METADATA_SIZE)
-            pk_idx, pk_sentinel = None, None
-
-            # get pk for deleted files
-            if self.primary_key is not None:
-                pk_idx, pk_fmt = self._pk_idx_fmt()
-                pk_sentinel = self._sentinel(pk_fmt)
+    def get_all_records(self, columns=None) -> List[Record]:
+        """Devuelve todos los registros no eliminados en una lista.
 
-            for _ in range(self.heap_size):
-                buf = f.read(self.rec_data_size)
-                if len(buf) < self.rec_data_size:
-                    break
+        Con `columns` los Record sólo traen esos campos (en orden del esquema)
+        y el resto de bytes del slot ni se decodifica.
+        """
+        return list(self.scan(columns))
 
-                rec = Record.unpack(buf, self.schema)
+    def scan(self, columns=None, ranges=None) -> Iterator[Record]:
+        """Cursor sobre los registros vivos: decodifica a medida que se consume.
 
-                # skips del records
-                if pk_idx is not None and rec.values[pk_idx] == pk_sentinel:
-                    f.seek(PTR_SIZE, os.SEEK_CUR)
-                    continue
-                records.append(rec)
-                f.seek(PTR_SIZE, os.SEEK_CUR)
-        return records
+        Se puede cortar en cualquier momento (LIMIT) sin haber leído el resto
+        de la tabla; la memoria usada no depende del tamaño del heap.
+        Con `ranges` (slots [lo, hi), p. ej. de `ZoneMap.ranges`) sólo se
+        recorren esos tramos.
+        """
+        self._check_columns(columns)
+        return self._scan_cursor(columns, ranges)
+
+    def _scan_cursor(self, columns, ranges=None) -> Iterator[Record]:
+        engine = open_scan(self)
+        if engine is None:
+            for lo, hi in [(0, None)] if ranges is None else ranges:
+                for _, rec in self._iter_records(columns, True, lo, hi):
+                    yield rec
+            return
+        with engine:
+            for window in engine.windows(ranges=ranges):
+                yield from window.iter_records(window.positions(window.live_mask()), columns)
+
+    def _check_columns(self, columns) -> None:
+        if columns is None:
+            return
+        names = {n for n, _ in self.schema}
+        for column in columns:
+            if column not in names:
+                raise KeyError(f"Campo '{column}' no existe en el esquema.")
 
     @staticmethod
     def to_dataframe(heapfile: "HeapFile", alias=None) -> pd.DataFrame:
-        with open(heapfile.filename, "rb") as f:
-            f.seek(METADATA_SIZE)
-            headers = [
-                (heapfile.table_name if alias is None else alias) + "." + column_name
-                for column_name, _ in heapfile.schema
-            ]
-            rows = []
-
-            # get pk for deleted files
-            pk_idx, pk_sentinel = None, None
-            if heapfile.primary_key is not None:
-                pk_idx, pk_fmt = heapfile._pk_idx_fmt()
-                pk_sentinel = heapfile._sentinel(pk_fmt)
-
-            for _ in range(heapfile.heap_size):
-                buf = f.read(heapfile.rec_data_size)
-                if len(buf) < heapfile.rec_data_size:
-                    break
-
-                rec = Record.unpack(buf, heapfile.schema)
-
-                # skips del records
-                if pk_idx is not None and rec.values[pk_idx] == pk_sentinel:
-                    f.seek(PTR_SIZE, os.SEEK_CUR)  # skips ptr
-                    continue
+        headers = [
+            (heapfile.table_name if alias is None else alias) + "." + column_name
+            for column_name, _ in heapfile.schema
+        ]
+        engine = open_scan(heapfile)
+        if engine is not None:  # DataFrame directo desde las columnas
+            with engine:
+                columns = engine.frame_columns(engine.positions(engine.live_mask()))
+            return pd.DataFrame(
+                {header: columns[name] for header, (name, _) in zip(headers, heapfile.schema)},
+                columns=headers,
+            )
 
-                row = {name: value for name, value in zip(headers, rec.values)}
-                rows.append(row)
+        rows = []
 
-                # skips next_free
-                f.seek(PTR_SIZE, os.SEEK_CUR)
+        # el bitmap de validez salta los registros borrados
+        for _, rec in heapfile._iter_records(live_only=True):
+            row = {name: value for name, value in zip(headers, rec.values)}
+            rows.append(row)
 
-            df = pd.DataFrame(rows, columns=headers)
+        df = pd.DataFrame(rows, columns=headers)
         return df
 
     # esto es para el spimi, se supone (segun gpt) yield hace que retornes los elementos
@@ -484,28 +962,33 @@ class HeapFile:
         """
         Devuelve (id, texto) de todos los registros válidos,
         concatenando todos los campos 'text' en un solo string.
+
+        Primero se leen sólo las PK y offsets (campos fijos) y luego los
+        textos en orden de offset, así el .text se recorre secuencialmente
+        con un único handle. El orden de salida sigue al del archivo de
+        texto, no al de los slots.
         """
-        text_fields = [i for i, (_, fmt) in enumerate(self.schema) if fmt == "text"]
-        pk_idx, _ = self._pk_idx_fmt()
-        sentinel = self._sentinel(self.schema[pk_idx][1])
-
-        with open(self.filename, "rb") as fh:
-            fh.seek(METADATA_SIZE)
-            for i in range(self.heap_size):
-                buf = fh.read(self.rec_data_size)
-                if len(buf) < self.rec_data_size:
-                    break
-                rec = Record.unpack(buf, self.schema)
-                if rec.values[pk_idx] == sentinel:
-                    fh.seek(PTR_SIZE, os.SEEK_CUR)
-                    continue
-                text = " ".join(
-                    TextFile(self.table_name, self.schema[idx][0]).read(offset)
-                    for idx in text_fields
-                    for offset in [rec.values[idx]]
-                )
-                fh.seek(PTR_SIZE, os.SEEK_CUR)
-                yield rec.values[pk_idx], text
+        text_fields = [name for name, fmt in self.schema if fmt == "text"]
+        pk_name = self.schema[self._pk_idx_fmt()[0]][0]
+
+        docs = [
+            rec.values
+            for _, rec in self._iter_records([pk_name] + text_fields, live_only=True)
+        ]
+        # el Record proyectado respeta el orden del esquema
+        proj = [name for name, _ in self.codec.projection([pk_name] + text_fields).schema]
+        pk_pos = proj.index(pk_name)
+        text_pos = [proj.index(name) for name in text_fields]
+        if text_pos:
+            docs.sort(key=lambda values: values[text_pos[0]])
+
+        # un lector por campo: descomprime a medida que avanza por el archivo
+        readers = [
+            self._side_file(name, "text").iter_read(values[pos] for values in docs)
+            for name, pos in zip(text_fields, text_pos)
+        ]
+        for values, *texts in zip(docs, *readers):
+            yield values[pk_pos], " ".join(texts)
 
     def update_record(self, record: Record):
         if record.schema != self.schema:
@@ -514,18 +997,189 @@ class HeapFile:
         pk_idx, _ = self._pk_idx_fmt()
         pk_value = record.values[pk_idx]
 
-        with open(self.filename, "r+b") as fh:
-            for pos in range(self.heap_size):
-                byte_off = METADATA_SIZE + pos * self.slot_size
-                fh.seek(byte_off)
-                buf = fh.read(self.rec_data_size)
-                rec = Record.unpack(buf, self.schema)
-                if rec.values[pk_idx] == pk_value:
-                    # Decode string values before packing
-                    for i, (fname, fmt) in enumerate(self.schema):
-                        if 's' in Record.get_format_char_static(fmt) and isinstance(record.values[i], bytes):
-                            record.values[i] = record.values[i].decode('utf-8').strip('\x00')
-                    fh.seek(byte_off)
-                    fh.write(record.pack())
-                    return True
-        return False
+        pos = self._locate_pk(pk_value)
+        if pos is None:
+            return False
+        # un TEXT / SOUND sin leer (perezoso) conserva su offset sin tocar el archivo
+        values = record.values
+        lazy = values._pending if isinstance(values, LazyValues) else {}
+        row = [list.__getitem__(values, i) if i in lazy else values[i] for i in range(len(values))]
+        # un TEXT / SOUND nuevo va al final de su archivo y el anterior se borra
+        # (compact_side_files recupera después esos bytes); si no cambió, se conserva
+        old = None
+        for i, (fname, fmt) in enumerate(self.schema):
+            if fmt.upper() in ("TEXT", "SOUND") and isinstance(row[i], str):
+                if old is None:
+                    old = self.codec.unpack(self._read_slot(pos)).values
+                side = self._side_file(fname, fmt)
+                old_offset = old[i] if fmt.upper() == "TEXT" else old[i][0]
+                if side.read(old_offset) == row[i]:
+                    row[i] = old[i]  # mismo contenido: mismo blob (y mismo histograma)
+                elif fmt.upper() == "TEXT":
+                    side.delete(old_offset)
+                    row[i] = side.insert(row[i])
+                else:
+                    side.delete(old_offset)
+                    row[i] = (side.insert(row[i]), -1)
+                    histograms = self._histograms(fname)
+                    if histograms is not None:
+                        histograms.delete(pos)
+        # Decode string values before packing
+        for i, (fname, fmt) in enumerate(self.schema):
+            if 's' in Record.get_format_char_static(fmt) and isinstance(row[i], bytes):
+                row[i] = row[i].decode('utf-8').strip('\x00')
+        self._write_slot(pos, self.codec.pack(row))
+        self._zone_widen(pos, row)
+        get_row_cache().invalidate(self.table_path, pk_value)
+        return True
+
+    # ------------------------------------------------------------------
+    # Compactación (VACUUM) --------------------------------------------
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _compact_side_file(filename: str, offsets: List[int]) -> Tuple[dict, int]:
+        """Copia sólo los blobs referenciados a un archivo nuevo.
+
+        Devuelve (offset viejo -> nuevo, bytes recuperados). Un offset que ya
+        no apunta a un blob válido queda como una entrada borrada (centinela).
+        """
+        get_side_files().close(filename)  # el handle compartido vería el archivo viejo
+        remap = {}
+        tmp = filename + ".vacuum"
+        old_bytes = os.path.getsize(filename)
+        with open(filename, "rb") as src, open(tmp, "wb") as dst:
+            for old in sorted(set(offsets)):
+                remap[old] = dst.tell()
+                n = -1
+                if 0 <= old <= old_bytes - TextFile.INT_SIZE:
+                    src.seek(old)
+                    (n,) = struct.unpack("i", src.read(TextFile.INT_SIZE))
+                size = n & LENGTH_MASK  # un blob comprimido lleva banderas en n
+                if n < 0 or old + TextFile.INT_SIZE + size > old_bytes:
+                    dst.write(struct.pack("i", TextFile.SENTINEL))
+                    continue
+                dst.write(struct.pack("i", n))
+                dst.write(src.read(size))
+            new_bytes = dst.tell()
+        wal_replace(tmp, filename)
+        return remap, old_bytes - new_bytes
+
+    def _side_columns(self, columns: Optional[List[str]] = None) -> List[Tuple[int, str, str]]:
+        """(posición, campo, formato) de las columnas TEXT / SOUND (o sólo de `columns`)."""
+        fields = [
+            (i, name, fmt)
+            for i, (name, fmt) in enumerate(self.schema)
+            if fmt.upper() in ("TEXT", "SOUND")
+        ]
+        if columns is None:
+            return fields
+        known = {name for _, name, _ in fields}
+        for name in columns:
+            if name not in known:
+                raise KeyError(f"Campo '{name}' no es TEXT ni SOUND.")
+        return [field for field in fields if field[1] in columns]
+
+    def _compact_side_columns(
+        self, rows: List[list], columns: Optional[List[str]] = None
+    ) -> dict:
+        """Compacta los archivos laterales y remapea los offsets en `rows`.
+
+        Devuelve campo -> bytes recuperados.
+        """
+        reclaimed = {}
+        for i, fname, fmt in self._side_columns(columns):
+            is_sound = fmt.upper() == "SOUND"
+            side = self._side_file(fname, fmt)
+            olds = [row[i][0] if is_sound else row[i] for row in rows]
+            remap, reclaimed[fname] = self._compact_side_file(side.filename, olds)
+            for row, old in zip(rows, olds):
+                # SOUND conserva su offset de histograma
+                row[i] = (remap[old], row[i][1]) if is_sound else remap[old]
+        return reclaimed
+
+    def compact_side_files(self, columns: Optional[List[str]] = None) -> dict:
+        """Saca de los archivos TEXT / SOUND los blobs borrados o reemplazados.
+
+        • Sólo las columnas de `columns` (por defecto todas las TEXT / SOUND).
+        • Los registros no se mueven: en una sola pasada se reescriben los
+          offsets de cada slot vivo, así índices y RIDs siguen valiendo.
+        • Devuelve campo -> bytes recuperados.
+        """
+        fields = self._side_columns(columns)
+        if not fields:
+            return {}
+        self.flush()
+        live = list(self._iter_records(live_only=True))
+        rows = [list(rec.values) for _, rec in live]
+        reclaimed = self._compact_side_columns(rows, [name for _, name, _ in fields])
+        for (pos, rec), row in zip(live, rows):
+            if row != list(rec.values):
+                self._write_slot(pos, self.codec.pack(row))
+        # los offsets cambiaron: filas cacheadas y rangos del zone map ya no valen
+        get_row_cache().invalidate_table(self.table_path)
+        ZoneMap.discard(self.table_path + ".zonemap", remove_file=True)
+        self.flush()
+        return reclaimed
+
+    def _heap_bytes(self) -> int:
+        """Bytes de slots que ocupa la tabla (sin la cola reservada)."""
+        return self.heap_size * self.slot_size
+
+    def _rewrite(self, rows: List[list]) -> List[int]:
+        """Reemplaza el archivo por `rows` contiguas desde el slot 0 y free-list vacía.
+
+        Devuelve el slot nuevo de cada fila.
+        """
+        tmp = self.filename + ".vacuum"
+        tail = struct.pack("i", 0)
+        with open(tmp, "wb") as f:
+            f.write(struct.pack(METADATA_FORMAT, len(rows), -1))
+            for row in rows:
+                f.write(self.codec.pack(row) + tail)
+        self.pool.discard(self.filename)  # las páginas cacheadas son del archivo viejo
+        get_extents().discard(self.filename)  # el archivo nuevo no tiene cola reservada
+        wal_replace(tmp, self.filename)
+        self._register()
+        return list(range(len(rows)))
+
+    def vacuum(self) -> Tuple[dict, dict]:
+        """Reescribe el heap y sus archivos TEXT/SOUND sin espacio muerto.
+
+        • Los registros vivos quedan contiguos y en su orden relativo; la
+          free-list queda vacía.
+        • Devuelve (offset_map, stats): offset_map es slot viejo -> slot
+          nuevo y sirve para remapear los índices secundarios.
+        """
+        self.flush()
+        bytes_before = self._heap_bytes()
+        live = list(self._iter_records(live_only=True))
+        rows = [list(rec.values) for _, rec in live]
+        stats = {
+            "slots_before": self.heap_size,
+            "slots_after": 0,
+            "heap_bytes_reclaimed": 0,
+            "side_bytes_reclaimed": 0,
+        }
+
+        # 1. archivos laterales: copiar sólo lo referenciado y remapear
+        stats["side_bytes_reclaimed"] = sum(self._compact_side_columns(rows).values())
+
+        # 2. heap: cabecera nueva + slots vivos contiguos (next_free = 0)
+        new_positions = self._rewrite(rows)
+        offset_map = {pos: new for (pos, _), new in zip(live, new_positions)}
+        for fname, fmt in self.schema:  # las filas de histograma siguen a su RID
+            histograms = self._histograms(fname) if fmt.upper() == "SOUND" else None
+            if histograms is not None:
+                histograms.remap(offset_map)
+        self.invalidate_histograms()
+        stats["slots_after"] = self.heap_size
+        stats["heap_bytes_reclaimed"] = bytes_before - self._heap_bytes()
+        get_row_cache().invalidate_table(self.table_path)  # los SOUND guardan offsets remapeados
+
+        # 3. las posiciones cambiaron: PKLocator y zone map se reconstruyen al usarse;
+        #    el Bloom de PK también, así se olvida de las claves borradas
+        PKLocator.discard(self.table_path + ".pk.loc", remove_file=True)
+        PKBloomFilter.discard(self.table_path + ".pk.bloom", remove_file=True)
+        ZoneMap.discard(self.table_path + ".zonemap", remove_file=True)
+        ValidityBitmap.discard(self.table_path + ".valid", remove_file=True)
+        return offset_map, stats
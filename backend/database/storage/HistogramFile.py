@@ -1,6 +1,8 @@
 import struct
 import os
 
+from .WriteAheadLog import wal_open
+
 class HistogramFile:
     """Manejo de almacenamiento externo de histogramas."""
 
@@ -23,7 +25,7 @@ class HistogramFile:
 
     def insert(self, histogram: list[tuple[int, int]]) -> int:
         num_tuples = len(histogram)
-        with open(self.filename, "ab") as f:
+        with wal_open(self.filename, "ab") as f:
             offset = f.tell()
             f.write(struct.pack("i", num_tuples))
             for centroid_id, count in histogram:
@@ -0,0 +1,137 @@
+import glob
+import os
+import struct
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from .WriteAheadLog import wal_open, wal_replace
+
+HEADER = struct.Struct("<qi4x")  # filas, centroides
+MATRIX_SUFFIX = ".histogram.mat"
+LIVE = 1  # estado de una fila con histograma; 0 = vacía o borrada
+
+
+class HistogramMatrix:
+    """Histogramas de un campo SOUND como matriz densa (<tabla>.<campo>.histogram.mat).
+
+    • Fila = RID del registro en el heap; columna 0 = estado (LIVE o 0 si
+      la fila está vacía o borrada), columnas 1.. = cuentas por centroide
+      (int32).
+    • Densa y no CSR: el codebook tiene pocos centroides, así la fila es
+      corta y se indexa directo por RID.
+    • Crece agregando filas al final; borrar sólo apaga el estado
+      (tombstone). Una fila reusada por otro registro queda apagada hasta
+      que se le calcule el histograma.
+    • `load()` mapea el archivo con NumPy: la colección entera en una sola
+      llamada, para calcular las similitudes vectorizadas.
+    • La instancia puede quedar abierta mientras otra sesión agrega filas:
+      cada escritura y cada `load()` relee las filas de la cabecera.
+    """
+
+    def __init__(self, table_path: str, field_name: str):
+        self.filename = self.filename_for(table_path, field_name)
+        if not os.path.exists(self.filename):
+            raise FileNotFoundError(f"Archivo {self.filename} no existe. Llame a build_file primero.")
+        with open(self.filename, "rb") as f:
+            self._read_header(f)
+
+    def _read_header(self, f) -> None:
+        f.seek(0)
+        self.rows, self.n_clusters = HEADER.unpack(f.read(HEADER.size))
+        self.row_size = (self.n_clusters + 1) * 4
+
+    @staticmethod
+    def filename_for(table_path: str, field_name: str) -> str:
+        return f"{table_path}.{field_name}{MATRIX_SUFFIX}"
+
+    @staticmethod
+    def exists(table_path: str, field_name: str) -> bool:
+        return os.path.exists(HistogramMatrix.filename_for(table_path, field_name))
+
+    @staticmethod
+    def build_file(table_path: str, field_name: str, n_clusters: int) -> None:
+        """Crea la matriz vacía (reemplaza la de un codebook anterior)."""
+        filename = HistogramMatrix.filename_for(table_path, field_name)
+        with open(filename + ".tmp", "wb") as f:
+            f.write(HEADER.pack(0, n_clusters))
+        wal_replace(filename + ".tmp", filename)  # la matriz vieja no pasa por el log
+
+    @staticmethod
+    def remove_files(table_path: str) -> None:
+        """Borra las matrices de la tabla (no hace nada si no tiene)."""
+        for filename in glob.glob(HistogramMatrix.filename_for(glob.escape(table_path), "*")):
+            os.remove(filename)
+
+    # ------------------------------------------------------------------
+    # Escrituras -------------------------------------------------------
+    # ------------------------------------------------------------------
+    def set_many(self, positions: List[int], histograms: np.ndarray) -> None:
+        """Escribe el histograma de cada RID de `positions` (filas de `histograms`)."""
+        if not len(positions):
+            return
+        histograms = np.asarray(histograms)
+        with wal_open(self.filename, "r+b") as f:
+            self._read_header(f)
+            if histograms.shape != (len(positions), self.n_clusters):
+                raise ValueError(
+                    f"Se esperaban {len(positions)} histogramas de {self.n_clusters} centroides."
+                )
+            block = np.empty((len(positions), self.n_clusters + 1), dtype="<i4")
+            block[:, 0] = LIVE
+            block[:, 1:] = histograms
+            rows = max(self.rows, max(positions) + 1)
+            if rows > self.rows:  # filas nuevas vacías al final
+                f.seek(HEADER.size + self.rows * self.row_size)
+                f.write(bytes((rows - self.rows) * self.row_size))
+                f.seek(0)
+                f.write(HEADER.pack(rows, self.n_clusters))
+                self.rows = rows
+            for pos, row in zip(positions, block):
+                f.seek(HEADER.size + pos * self.row_size)
+                f.write(row.tobytes())
+
+    def delete(self, pos: int) -> None:
+        """Apaga la fila del RID (si existe)."""
+        if pos < 0:
+            return
+        with wal_open(self.filename, "r+b") as f:
+            self._read_header(f)
+            if pos < self.rows:
+                f.seek(HEADER.size + pos * self.row_size)
+                f.write(struct.pack("<i", 0))
+
+    def remap(self, offset_map: Dict[int, int]) -> None:
+        """Mueve las filas a los RIDs nuevos de un VACUUM (las demás se pierden)."""
+        counts, live = self.load()
+        moved = [(old, new) for old, new in offset_map.items() if old < self.rows and live[old]]
+        rows = max((new for _, new in offset_map.items()), default=-1) + 1
+        block = np.zeros((rows, self.n_clusters + 1), dtype="<i4")
+        if moved:
+            old, new = np.array(moved).T
+            block[new, 0] = LIVE
+            block[new, 1:] = counts[old]
+        tmp = self.filename + ".vacuum"
+        with open(tmp, "wb") as f:
+            f.write(HEADER.pack(rows, self.n_clusters))
+            f.write(block.tobytes())
+        wal_replace(tmp, self.filename)
+        self.rows = rows
+
+    # ------------------------------------------------------------------
+    # Lectura -----------------------------------------------------------
+    # ------------------------------------------------------------------
+    def load(self) -> Tuple[np.ndarray, np.ndarray]:
+        """(cuentas filas x centroides, máscara de filas con histograma), sobre un mmap."""
+        with open(self.filename, "rb") as f:
+            self._read_header(f)
+        if self.rows == 0:
+            return np.zeros((0, self.n_clusters), dtype="<i4"), np.zeros(0, dtype=bool)
+        matrix = np.memmap(
+            self.filename,
+            dtype="<i4",
+            mode="r",
+            offset=HEADER.size,
+            shape=(self.rows, self.n_clusters + 1),
+        )
+        return matrix[:, 1:], matrix[:, 0] == LIVE
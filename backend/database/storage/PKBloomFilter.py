@@ -0,0 +1,189 @@
+import atexit
+import hashlib
+import math
+import os
+import struct
+from typing import Callable, Dict, Iterable
+
+from .Record import Record
+
+DEFAULT_FPR = 0.01  # tasa de falsos positivos por defecto
+MIN_CAPACITY = 1024  # claves mínimas para dimensionar el filtro
+HEADER = struct.Struct("<qidqq?7x")  # m_bits, k, fpr, capacidad, claves agregadas, clean
+
+
+class PKBloomFilter:
+    """Filtro de Bloom sobre la PK guardado junto a la tabla (<tabla>.pk.bloom).
+
+    • `key in filtro` es False sólo si la clave seguro no está: el chequeo
+      de unicidad puede saltarse el índice en el caso común (PK nueva).
+    • Las inserciones sólo tocan los bits en memoria; el archivo se
+      reescribe en `save()` (flush de la tabla, flush_buffers o al salir).
+      Igual que el bitmap de validez, en disco lleva una marca `clean` que
+      se apaga con el primer cambio: si el proceso cae antes de guardar, el
+      filtro se reconstruye desde el heap al abrirlo.
+    • Los borrados no se pueden quitar de un Bloom: sólo suben la tasa de
+      falsos positivos hasta el próximo rebuild (VACUUM / índice de PK).
+    • Si se agregan más claves que la capacidad, se reconstruye desde el
+      heap con el doble de capacidad.
+    """
+
+    fpr = DEFAULT_FPR
+    _open_filters: Dict[str, "PKBloomFilter"] = {}
+
+    def __init__(self, filename: str, key_fmt: str):
+        self.filename = filename
+        self.key_char = Record.get_format_char_static(key_fmt)
+        self.m_bits = 8
+        self.k = 1
+        self.built_fpr = self.fpr  # tasa con la que se dimensionó este filtro
+        self.capacity = 0
+        self.count = 0
+        self.bits = bytearray(1)
+        self._rebuild_fn = None
+        self._clean = True
+
+    # ------------------------------------------------------------------
+    # Apertura (una instancia por archivo y proceso) --------------------
+    # ------------------------------------------------------------------
+    @classmethod
+    def open(
+        cls, filename: str, key_fmt: str, rebuild_fn: Callable[[], Iterable]
+    ) -> "PKBloomFilter":
+        bf = cls._open_filters.get(filename)
+        if bf is None or bf.key_char != Record.get_format_char_static(key_fmt):
+            bf = cls(filename, key_fmt)
+            cls._open_filters[filename] = bf
+            bf._rebuild_fn = rebuild_fn
+            bf._load()
+        else:
+            bf._rebuild_fn = rebuild_fn  # el heap de esta llamada
+        return bf
+
+    @classmethod
+    def discard(cls, filename: str, remove_file: bool = False) -> None:
+        cls._open_filters.pop(filename, None)
+        if remove_file and os.path.exists(filename):
+            os.remove(filename)
+
+    @classmethod
+    def reset(cls) -> None:
+        """Olvida los filtros abiertos SIN guardarlos (p. ej. en un proceso hijo tras fork)."""
+        cls._open_filters.clear()
+
+    @classmethod
+    def save_open(cls, filename: str) -> None:
+        bf = cls._open_filters.get(filename)
+        if bf is not None:
+            bf.save()
+
+    @classmethod
+    def save_all(cls) -> None:
+        for bf in cls._open_filters.values():
+            bf.save()
+
+    @classmethod
+    def configure(cls, fpr: float) -> None:
+        """Tasa de falsos positivos para los filtros que se construyan desde ahora."""
+        if not 0 < fpr < 1:
+            raise ValueError("La tasa de falsos positivos debe estar entre 0 y 1.")
+        cls.fpr = fpr
+
+    def _load(self) -> None:
+        if os.path.exists(self.filename):
+            with open(self.filename, "rb") as f:
+                raw = f.read()
+            if len(raw) >= HEADER.size:
+                m_bits, k, fpr, capacity, count, clean = HEADER.unpack_from(raw)
+                if clean and len(raw) == HEADER.size + (m_bits + 7) // 8:
+                    self.m_bits, self.k, self.built_fpr = m_bits, k, fpr
+                    self.capacity, self.count = capacity, count
+                    self.bits = bytearray(raw[HEADER.size :])
+                    return
+        self.rebuild(self._rebuild_fn())
+
+    # ------------------------------------------------------------------
+    # Hashing ----------------------------------------------------------
+    # ------------------------------------------------------------------
+    def _key_bytes(self, key) -> bytes:
+        """Bytes de la clave tal como queda en el heap (str truncado, float32)."""
+        if "s" in self.key_char:
+            size = int(self.key_char[:-1])
+            return str(key).encode("utf-8")[:size].rstrip(b"\x00")
+        parts = tuple(key) if isinstance(key, (tuple, list)) else (key,)  # puntos (2f, 3f)
+        fmt = f"{len(parts)}{self.key_char[-1]}"
+        if self.key_char[-1] in ("f", "d"):
+            parts = struct.unpack(fmt, struct.pack(fmt, *parts))
+            return struct.pack(f"<{len(parts)}d", *parts)
+        return struct.pack(f"<{len(parts)}q", *(int(v) for v in parts))
+
+    def _positions(self, key) -> Iterable[int]:
+        digest = hashlib.blake2b(self._key_bytes(key), digest_size=16).digest()
+        h1, h2 = struct.unpack("<QQ", digest)
+        h2 |= 1  # impar: recorre todas las posiciones aunque m sea par
+        return ((h1 + i * h2) % self.m_bits for i in range(self.k))
+
+    def __contains__(self, key) -> bool:
+        return all(self.bits[p >> 3] & (1 << (p & 7)) for p in self._positions(key))
+
+    # ------------------------------------------------------------------
+    # Escrituras -------------------------------------------------------
+    # ------------------------------------------------------------------
+    def add(self, key) -> None:
+        self.add_many([key])
+
+    def add_many(self, keys: Iterable) -> None:
+        """Agrega claves en memoria; quedan en disco con el próximo `save()`."""
+        added = 0
+        for key in keys:
+            if not added:
+                self._touch()
+            added += 1
+            for p in self._positions(key):
+                self.bits[p >> 3] |= 1 << (p & 7)
+        if not added:
+            return
+        self.count += added
+        if self.count > self.capacity and self._rebuild_fn is not None:
+            self.rebuild(self._rebuild_fn())  # ya incluye las claves nuevas
+
+    def rebuild(self, keys: Iterable, fpr: float = None) -> None:
+        """Reescribe el filtro con `keys`, dimensionado para el doble de claves."""
+        keys = list(keys)
+        self.built_fpr = self.fpr if fpr is None else fpr
+        self.capacity = max(MIN_CAPACITY, 2 * len(keys))
+        self.m_bits = max(8, math.ceil(-self.capacity * math.log(self.built_fpr) / math.log(2) ** 2))
+        self.k = max(1, round(self.m_bits / self.capacity * math.log(2)))
+        self.bits = bytearray((self.m_bits + 7) // 8)
+        self.count = len(keys)
+        for key in keys:
+            for p in self._positions(key):
+                self.bits[p >> 3] |= 1 << (p & 7)
+        self._clean = False
+        self.save()
+
+    def save(self) -> None:
+        """Reescribe el archivo si hubo cambios desde la última vez."""
+        if self._clean:
+            return
+        tmp = self.filename + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(self._header(True))
+            f.write(self.bits)
+        os.replace(tmp, self.filename)
+        self._clean = True
+
+    def _touch(self) -> None:
+        """Antes del primer cambio en memoria marca el archivo como no consistente."""
+        if not self._clean:
+            return
+        self._clean = False
+        if os.path.exists(self.filename):
+            with open(self.filename, "r+b") as f:
+                f.write(self._header(False))
+
+    def _header(self, clean: bool) -> bytes:
+        return HEADER.pack(self.m_bits, self.k, self.built_fpr, self.capacity, self.count, clean)
+
+
+atexit.register(PKBloomFilter.save_all)
@@ -0,0 +1,242 @@
+import atexit
+import os
+import struct
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+from .Record import Record
+
+OP_INSERT = b"I"
+OP_DELETE = b"D"
+OP_OPEN = b"U"  # desde acá hay entradas en memoria sin escribir...
+OP_SYNC = b"S"  # ... y desde acá ya no: un OP_OPEN sin OP_SYNC = bitácora incompleta
+COMPACT_MIN_ENTRIES = 1024  # no compactar bitácoras pequeñas
+APPEND_BUFFER_BYTES = 64 * 1024  # entradas que se juntan antes de escribirlas
+
+
+class PKLocator:
+    """Hash persistente PK → slot guardado junto a la tabla (<tabla>.pk.loc).
+
+    • En memoria es un dict; en disco es una bitácora append-only de
+      entradas de tamaño fijo (op, slot, pk).
+    • Las entradas se juntan en memoria y se escriben de a bloques por un
+      handle que queda abierto; `flush` / `close` (y el flush de la tabla)
+      bajan lo pendiente. Mientras hay algo pendiente la bitácora lleva
+      una marca OP_OPEN, así tras una caída se sabe que está incompleta.
+    • Al abrirse se reproduce la bitácora; si no existe, quedó incompleta
+      o apunta fuera del heap se reconstruye desde el heap con `rebuild_fn`.
+      Si ya estaba abierta sólo se mira el tamaño del archivo (cambios de
+      otro proceso); quien la usa lo hace una vez por sentencia y luego
+      la pide con `cached`.
+    • Las PK de tipo punto ("2f", "3i") se guardan campo por campo y en
+      memoria son tuplas, igual que quedan al leerlas del heap.
+    • Cuando la bitácora crece mucho respecto a las claves vivas se compacta.
+    """
+
+    _open_locators: Dict[str, "PKLocator"] = {}
+
+    def __init__(self, filename: str, key_fmt: str):
+        self.filename = filename
+        self.key_char = Record.get_format_char_static(key_fmt)
+        self.entry = struct.Struct("<ci" + self.key_char)
+        # campos de struct que ocupa la clave (>1 sólo en puntos: 2f, 3i...)
+        self.arity = 1 if "s" in self.key_char else len(self.entry.unpack(bytes(self.entry.size))) - 2
+        self._map: Dict = {}
+        self._entries = 0
+        self._size = 0  # bytes de bitácora que conoce esta instancia (ya escritos)
+        self._pending = bytearray()  # entradas todavía sin escribir
+        self._fh = None  # handle de append, abierto al primer write
+
+    # ------------------------------------------------------------------
+    # Apertura (una instancia por archivo y proceso) --------------------
+    # ------------------------------------------------------------------
+    @classmethod
+    def open(
+        cls,
+        filename: str,
+        key_fmt: str,
+        rebuild_fn: Callable[[], Iterable[Tuple[object, int]]],
+        heap_size: int,
+    ) -> "PKLocator":
+        loc = cls._open_locators.get(filename)
+        if loc is None or loc.key_char != Record.get_format_char_static(key_fmt):
+            loc = cls(filename, key_fmt)
+            cls._open_locators[filename] = loc
+            loc._load(rebuild_fn, heap_size)
+        elif not os.path.exists(filename) or os.path.getsize(filename) != loc._size:
+            # otro proceso tocó la bitácora: volver a leerla
+            loc._load(rebuild_fn, heap_size)
+        return loc
+
+    @classmethod
+    def cached(cls, filename: str) -> Optional["PKLocator"]:
+        """El locator ya abierto de `filename`, sin mirar el disco (o None)."""
+        return cls._open_locators.get(filename)
+
+    @classmethod
+    def discard(cls, filename: str, remove_file: bool = False) -> None:
+        """Olvida el locator SIN escribir lo pendiente (queda la marca OP_OPEN)."""
+        loc = cls._open_locators.pop(filename, None)
+        if loc is not None:
+            loc._pending.clear()
+            loc._close_handle()
+        if remove_file and os.path.exists(filename):
+            os.remove(filename)
+
+    @classmethod
+    def reset(cls) -> None:
+        """Olvida los locators abiertos SIN escribir nada (p. ej. en un proceso hijo tras fork)."""
+        cls._open_locators.clear()
+
+    @classmethod
+    def save_open(cls, filename: str) -> None:
+        loc = cls._open_locators.get(filename)
+        if loc is not None:
+            loc.flush()
+
+    @classmethod
+    def save_all(cls) -> None:
+        for loc in cls._open_locators.values():
+            loc.close()
+
+    def _load(self, rebuild_fn, heap_size: int) -> None:
+        self._pending.clear()
+        self._close_handle()
+        if not os.path.exists(self.filename):
+            self.rebuild(rebuild_fn())
+            return
+        self._map.clear()
+        with open(self.filename, "rb") as f:
+            raw = f.read()
+        usable = len(raw) - len(raw) % self.entry.size  # ignorar entrada truncada
+        complete = True
+        for op, slot, *fields in self.entry.iter_unpack(raw[:usable]):
+            key = fields[0] if self.arity == 1 else tuple(fields)
+            if op == OP_INSERT:
+                self._map[self._decode_key(key)] = slot
+            elif op == OP_DELETE:
+                self._map.pop(self._decode_key(key), None)
+            else:
+                complete = op == OP_SYNC
+        self._entries = usable // self.entry.size
+        self._size = len(raw)
+        if not complete or any(slot >= heap_size for slot in self._map.values()):
+            self.rebuild(rebuild_fn())
+
+    # ------------------------------------------------------------------
+    # Normalización de claves (igual a como quedan en el heap) ----------
+    # ------------------------------------------------------------------
+    def normalize(self, key):
+        if "s" in self.key_char:
+            if not isinstance(key, str):
+                return key
+            size = int(self.key_char[:-1])
+            raw = key.encode("utf-8")[:size]
+            return raw.rstrip(b"\x00").decode("utf-8", errors="replace")
+        if self.arity > 1:  # punto: tupla con la precisión del heap
+            return struct.unpack(self.key_char, struct.pack(self.key_char, *key))
+        if self.key_char in ("f", "d"):
+            return struct.unpack(self.key_char, struct.pack(self.key_char, key))[0]
+        return key
+
+    def _encode_key(self, key) -> tuple:
+        """Campos de struct de la clave (se pasan con * a `entry.pack`)."""
+        if "s" in self.key_char:
+            size = int(self.key_char[:-1])
+            return (key.encode("utf-8")[:size].ljust(size, b"\x00"),)
+        return tuple(key) if self.arity > 1 else (key,)
+
+    def _decode_key(self, raw):
+        if isinstance(raw, bytes):
+            return raw.rstrip(b"\x00").decode("utf-8", errors="replace")
+        return raw
+
+    # ------------------------------------------------------------------
+    # Operaciones -------------------------------------------------------
+    # ------------------------------------------------------------------
+    def get(self, key) -> Optional[int]:
+        return self._map.get(self.normalize(key))
+
+    def __contains__(self, key) -> bool:
+        return self.normalize(key) in self._map
+
+    def __len__(self) -> int:
+        return len(self._map)
+
+    def add(self, key, slot: int) -> None:
+        key = self.normalize(key)
+        self._map[key] = slot
+        self._append(OP_INSERT, slot, key)
+
+    def add_many(self, items: Iterable[Tuple[object, int]]) -> None:
+        """Registra varias (pk, slot) con una sola escritura a la bitácora."""
+        chunks = []
+        for key, slot in items:
+            key = self.normalize(key)
+            self._map[key] = slot
+            chunks.append(self.entry.pack(OP_INSERT, slot, *self._encode_key(key)))
+        if chunks:
+            self._buffer(b"".join(chunks), len(chunks))
+
+    def remove(self, key) -> None:
+        key = self.normalize(key)
+        slot = self._map.pop(key, None)
+        if slot is None:
+            return
+        self._append(OP_DELETE, slot, key)
+        if self._entries > max(COMPACT_MIN_ENTRIES, 2 * len(self._map)):
+            self.rebuild(self._map.items())
+
+    def _append(self, op: bytes, slot: int, key) -> None:
+        self._buffer(self.entry.pack(op, slot, *self._encode_key(key)), 1)
+
+    # ------------------------------------------------------------------
+    # Escritura de la bitácora ------------------------------------------
+    # ------------------------------------------------------------------
+    def _marker(self, op: bytes) -> bytes:
+        return self.entry.pack(op, -1, *([b""] if "s" in self.key_char else [0] * self.arity))
+
+    def _buffer(self, data: bytes, entries: int) -> None:
+        if not self._pending:
+            self._write(self._marker(OP_OPEN))
+        self._pending += data
+        self._entries += entries
+        if len(self._pending) >= APPEND_BUFFER_BYTES:
+            self.flush()
+
+    def _write(self, data: bytes) -> None:
+        if self._fh is None:
+            self._fh = open(self.filename, "ab", buffering=0)
+        self._fh.write(data)
+        self._size += len(data)
+
+    def _close_handle(self) -> None:
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
+
+    def flush(self) -> None:
+        """Escribe las entradas pendientes y la marca de que no falta ninguna."""
+        if self._pending:
+            self._write(bytes(self._pending) + self._marker(OP_SYNC))
+            self._pending.clear()
+
+    def close(self) -> None:
+        self.flush()
+        self._close_handle()
+
+    def rebuild(self, entries: Iterable[Tuple[object, int]]) -> None:
+        """Reescribe la bitácora sólo con las claves vivas."""
+        new_map = {self.normalize(key): slot for key, slot in entries}
+        self._pending.clear()  # todo queda en el archivo nuevo
+        self._close_handle()
+        tmp = self.filename + ".tmp"
+        with open(tmp, "wb") as f:
+            for key, slot in new_map.items():
+                f.write(self.entry.pack(OP_INSERT, slot, *self._encode_key(key)))
+        os.replace(tmp, self.filename)
+        self._map = new_map
+        self._entries = len(new_map)
+        self._size = self._entries * self.entry.size
+
+
+atexit.register(PKLocator.save_all)
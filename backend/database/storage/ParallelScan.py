@@ -0,0 +1,164 @@
+import atexit
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Iterator, List, Optional, Tuple
+
+from .BufferPool import get_buffer_pool
+from .Catalog import get_catalog
+from .ColumnDictionary import ColumnDictionary
+from .PKBloomFilter import PKBloomFilter
+from .PKLocator import PKLocator
+from .SideFileCache import get_side_files
+from .WriteAheadLog import get_wal
+from .ValidityBitmap import ValidityBitmap
+from .ZoneMap import ZoneMap
+
+# --------------------------------------------------------
+#  Configuración por defecto
+# --------------------------------------------------------
+DEFAULT_WORKERS = os.cpu_count() or 1  # grado de paralelismo
+DEFAULT_MIN_SLOTS = 500_000  # por debajo de esto arrancar procesos cuesta más que el scan
+PARTITIONS_PER_WORKER = 4  # particiones chicas: LIMIT corta antes
+
+Ranges = List[Tuple[int, int]]
+
+
+class ParallelScan:
+    """Scan de un HeapFile repartido por rangos de slots entre procesos.
+
+    • Los slots son de tamaño fijo, así que el heap se parte en rangos
+      [lo, hi) contiguos sin leer nada; cada proceso abre la tabla y
+      evalúa el predicado sólo sobre sus rangos.
+    • El predicado es un objeto picklable con la firma
+      `predicate(heap, ranges, columns, limit) -> List[Record]`.
+    • Los resultados se entregan en orden de slot: la partición i se
+      consume entera antes que la i+1, así LIMIT da las mismas filas que el
+      scan serial y, al alcanzarlo, se cancelan las particiones pendientes.
+    • Los procesos sólo leen: no recuperan ni escriben el WAL, que es del
+      padre. Así da igual si arrancan con fork, spawn o forkserver.
+    """
+
+    def __init__(
+        self, workers: int = DEFAULT_WORKERS, min_slots: int = DEFAULT_MIN_SLOTS
+    ):
+        self.workers = workers
+        self.min_slots = min_slots
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def configure(
+        self, workers: Optional[int] = None, min_slots: Optional[int] = None
+    ) -> None:
+        if workers is not None:
+            if workers <= 0:
+                raise ValueError("workers debe ser positivo.")
+            if workers != self.workers:
+                self.shutdown()  # el pool actual tiene otro tamaño
+            self.workers = workers
+        if min_slots is not None:
+            if min_slots < 0:
+                raise ValueError("min_slots no puede ser negativo.")
+            self.min_slots = min_slots
+
+    def _pool(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(self.workers, initializer=_init_worker)
+        return self._executor
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
+
+    # ------------------------------------------------------------------
+    # Partición --------------------------------------------------------
+    # ------------------------------------------------------------------
+    def partitions(self, ranges: Ranges) -> List[Ranges]:
+        """Reparte `ranges` en trozos de tamaño parecido, en orden de slot."""
+        total = sum(hi - lo for lo, hi in ranges)
+        size = max(1, -(-total // (self.workers * PARTITIONS_PER_WORKER)))
+        parts, current, room = [], [], size
+        for lo, hi in ranges:
+            while lo < hi:
+                take = min(room, hi - lo)
+                current.append((lo, lo + take))
+                lo += take
+                room -= take
+                if room == 0:
+                    parts.append(current)
+                    current, room = [], size
+        if current:
+            parts.append(current)
+        return parts
+
+    # ------------------------------------------------------------------
+    # Scan -------------------------------------------------------------
+    # ------------------------------------------------------------------
+    def scan(
+        self,
+        heap,
+        predicate: Callable,
+        columns=None,
+        ranges: Optional[Ranges] = None,
+        limit: Optional[int] = None,
+    ) -> Optional[Iterator]:
+        """Cursor con los registros que cumplen `predicate`, o None si conviene el scan serial."""
+        if ranges is None:
+            ranges = [(0, heap.heap_size)]
+        if self.workers <= 1 or sum(hi - lo for lo, hi in ranges) < self.min_slots:
+            return None
+        heap.flush()  # los procesos leen el archivo, no este buffer pool
+        return self._merge(heap.table_path, predicate, columns, ranges, limit)
+
+    def _merge(self, table_path, predicate, columns, ranges, limit) -> Iterator:
+        pool = self._pool()
+        futures = [
+            pool.submit(_scan_partition, table_path, predicate, part, columns, limit)
+            for part in self.partitions(ranges)
+        ]
+        produced = 0
+        try:
+            for future in futures:
+                if limit is not None and produced >= limit:
+                    return
+                for rec in future.result():
+                    if limit is not None and produced >= limit:
+                        return
+                    produced += 1
+                    yield rec
+        finally:
+            for future in futures:
+                future.cancel()
+
+
+def _init_worker() -> None:
+    # tras un fork el hijo hereda páginas (quizá sucias) y handles del padre:
+    # se olvidan sin escribir para no pisar el archivo ni compartir offsets
+    get_wal().reset()  # antes que nada: un Database() del hijo no debe recuperar el log
+    get_buffer_pool().reset()
+    get_side_files().close()
+    ZoneMap.reset()
+    ValidityBitmap.reset()
+    PKLocator.reset()
+    PKBloomFilter.reset()
+    ColumnDictionary.reset()
+    get_catalog().reset()
+
+
+def _scan_partition(table_path: str, predicate, ranges: Ranges, columns, limit):
+    from .HeapFile import HeapFile
+
+    # el padre pudo escribir desde el fork: releer páginas y bitmap de validez
+    get_buffer_pool().discard_prefix(table_path + ".")  # .dat y, si es columnar, sus .col
+    ValidityBitmap.discard(table_path + ".valid")
+    get_catalog().reset()  # y el esquema, por si hubo DDL
+    heap = HeapFile(table_path)
+    return predicate(heap, ranges, columns, limit)
+
+
+# Scan paralelo compartido por todas las tablas del proceso
+_parallel_scan = ParallelScan()
+atexit.register(_parallel_scan.shutdown)
+
+
+def get_parallel_scan() -> ParallelScan:
+    return _parallel_scan
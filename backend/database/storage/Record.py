@@ -1,4 +1,6 @@
+import operator
 import struct
+from typing import Iterator
 
 # Esta clase Record representa un registro binario genérico.
 # A diferencia de versiones más rígidas (como las que usan FORMAT fijo),
@@ -12,13 +14,384 @@ import struct
 # values = [3, "Caramelos", 1.75, 25]
 # registro = Record(schema, values)
 
+class LazyValues(list):
+    """Lista de valores donde algunos campos se resuelven recién al usarlos.
+
+    `pending` mapea índice -> función sin argumentos que trae el valor real
+    (p. ej. el texto de un campo TEXT). Mientras no se acceda a ese índice
+    el archivo lateral no se lee; cualquier uso de la lista completa
+    (iterar, comparar, imprimir, copiar) resuelve todo lo pendiente.
+    """
+
+    __slots__ = ("_pending",)
+
+    def __init__(self, values, pending=None):
+        super().__init__(values)
+        self._pending = dict(pending or {})
+
+    def _resolve(self, idx: int) -> None:
+        loader = self._pending.pop(idx, None)
+        if loader is not None:
+            list.__setitem__(self, idx, loader())
+
+    def resolve(self) -> "LazyValues":
+        for idx in list(self._pending):
+            self._resolve(idx)
+        return self
+
+    def _index(self, idx: int) -> int:
+        return idx + len(self) if idx < 0 else idx
+
+    def __getitem__(self, idx):
+        if not self._pending:
+            return list.__getitem__(self, idx)
+        if isinstance(idx, slice):
+            self.resolve()
+        else:
+            self._resolve(self._index(idx))
+        return list.__getitem__(self, idx)
+
+    def __setitem__(self, idx, value):
+        if isinstance(idx, slice):
+            self.resolve()
+        else:
+            self._pending.pop(self._index(idx), None)
+        list.__setitem__(self, idx, value)
+
+    def __iter__(self):
+        self.resolve()
+        return list.__iter__(self)
+
+    def __eq__(self, other):
+        self.resolve()
+        if isinstance(other, LazyValues):
+            other.resolve()
+        return list.__eq__(self, other)
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        self.resolve()
+        return list.__repr__(self)
+
+    def __contains__(self, value):
+        self.resolve()
+        return list.__contains__(self, value)
+
+    def __add__(self, other):
+        self.resolve()
+        return list(self) + list(other)
+
+    def __reduce_ex__(self, protocol):
+        return (list, (list(self),))
+
+    def copy(self):
+        return list(self)
+
+    def index(self, *args):
+        self.resolve()
+        return list.index(self, *args)
+
+    def count(self, value):
+        self.resolve()
+        return list.count(self, value)
+
+
+class RecordCodec:
+    """Codec precompilado de un esquema (uno por esquema, cacheado).
+
+    Guarda el `struct.Struct` ya compilado y, por campo, cómo convertir
+    la tupla plana de struct en el valor del Record (y viceversa), para
+    que desempaquetar una fila sólo cueste el trabajo de decodificar.
+
+    Con `dictionaries` (campo -> ColumnDictionary) esos VARCHAR se guardan
+    como un código int32 y se traducen al empaquetar / desempaquetar; ese
+    codec es de una tabla, no del esquema, y no pasa por `for_schema`.
+    """
+
+    _cache = {}
+
+    def __init__(self, schema, columns=None, dictionaries=None):
+        full = [tuple(field) for field in schema]
+        wanted = None if columns is None else set(columns)
+        self.dictionaries = dictionaries or {}
+        # con `columns` sólo se leen esos campos; el resto se salta con 'x'
+        self.schema = full if wanted is None else [f for f in full if f[0] in wanted]
+        self.projected = wanted is not None
+        self._strided = {}  # stride -> Struct con relleno al final
+        self._projections = {}  # columnas -> RecordCodec proyectado
+
+        self._decoders = []  # tupla plana -> valor del campo
+        self._encoders = []  # (tipo, n, formato) valor del campo -> parte plana
+        self.format = ""
+        prefix = ""  # formato completo hasta el campo actual (para su offset)
+        pos = 0
+        for name, fmt in full:
+            dictionary = self.dictionaries.get(name)
+            char = "i" if dictionary is not None else Record.get_format_char_static(fmt)
+            offset = struct.calcsize(prefix + char) - struct.calcsize(char)
+            prefix += char
+            if wanted is not None and name not in wanted:
+                continue
+            gap = offset - struct.calcsize(self.format)
+            self.format += (f"{gap}x" if gap else "") + char
+            if dictionary is not None:  # código del diccionario
+                self._decoders.append(self._dict_decoder(pos, dictionary))
+                self._encoders.append(("dict", dictionary, fmt))
+                pos += 1
+            elif "s" in char:  # cadena fija
+                self._decoders.append(self._string_decoder(pos))
+                self._encoders.append(("str", int(char[:-1]), fmt))
+                pos += 1
+            elif fmt.upper() == "SOUND":
+                self._decoders.append(operator.itemgetter(slice(pos, pos + 2)))
+                self._encoders.append(("seq", 2, fmt))
+                pos += 2
+            elif fmt[:-1].isdigit():  # 3i, 4f, etc.
+                n = int(fmt[:-1])
+                self._decoders.append(operator.itemgetter(slice(pos, pos + n)))
+                self._encoders.append(("vec", n, fmt))
+                pos += n
+            else:
+                self._decoders.append(operator.itemgetter(pos))
+                self._encoders.append(("val", 1, fmt))
+                pos += 1
+        self.struct = struct.Struct(self.format)
+        self.size = self.struct.size
+
+    def projection(self, columns) -> "RecordCodec":
+        """Codec que decodifica sólo `columns` (en el orden del esquema)."""
+        if columns is None:
+            return self
+        key = frozenset(columns)
+        if key >= {name for name, _ in self.schema}:
+            return self
+        codec = self._projections.get(key)
+        if codec is None:
+            codec = RecordCodec(self.schema, key, self.dictionaries)
+            self._projections[key] = codec
+        return codec
+
+    @classmethod
+    def for_schema(cls, schema) -> "RecordCodec":
+        key = tuple(tuple(field) for field in schema)
+        codec = cls._cache.get(key)
+        if codec is None:
+            codec = cls(schema)
+            cls._cache[key] = codec
+        return codec
+
+    @staticmethod
+    def _string_decoder(pos):
+        def decode(vals):
+            raw = vals[pos]
+            if isinstance(raw, bytes):
+                return raw.rstrip(b"\x00").decode("utf-8", errors="replace")
+            return str(raw)
+        return decode
+
+    @staticmethod
+    def _dict_decoder(pos, dictionary):
+        values = dictionary.values  # lista viva: ve los valores que se agreguen
+        return lambda vals: values[vals[pos]]
+
+    # ------------------------------------------------------------------
+    # Empaquetado -------------------------------------------------------
+    # ------------------------------------------------------------------
+    def pack(self, values) -> bytes:
+        if self.projected:
+            raise ValueError("No se puede empaquetar con un codec proyectado.")
+        processed = []
+        for (kind, n, fmt), val in zip(self._encoders, values):
+            if kind == "str":
+                processed.append(val.encode("utf-8")[:n].ljust(n, b"\x00"))
+            elif kind == "dict":
+                processed.append(n.code(val))  # n es el ColumnDictionary
+            elif kind == "vec":
+                if not (isinstance(val, (list, tuple)) and len(val) == n):
+                    raise ValueError(f"Se esperaban {n} elementos para '{fmt}'")
+                processed.extend(val)  # aplanar
+            elif kind == "seq":
+                processed.extend(val)
+            else:
+                processed.append(val)
+        return self.struct.pack(*processed)
+
+    # ------------------------------------------------------------------
+    # Desempaquetado ----------------------------------------------------
+    # ------------------------------------------------------------------
+    def decode(self, vals) -> list:
+        """Tupla plana de struct -> lista de valores por campo."""
+        return [decoder(vals) for decoder in self._decoders]
+
+    def _record(self, vals, schema=None) -> "Record":
+        return Record._from_codec(self, self.decode(vals), schema)
+
+    def unpack(self, buf, schema=None) -> "Record":
+        return self._record(self.struct.unpack(buf), schema)
+
+    def unpack_from(self, buf, offset: int = 0) -> "Record":
+        """Desempaqueta sin copiar desde `buf[offset:]` (bytes, bytearray o memoryview)."""
+        return self._record(self.struct.unpack_from(buf, offset))
+
+    def strided(self, stride: int) -> struct.Struct:
+        """Struct que lee un registro y salta hasta `stride` bytes (p. ej. el puntero del slot)."""
+        st = self._strided.get(stride)
+        if st is None:
+            if stride < self.size:
+                raise ValueError("stride menor que el tamaño del registro.")
+            st = struct.Struct(f"{self.format}{stride - self.size}x")
+            self._strided[stride] = st
+        return st
+
+    def iter_unpack(self, buf, stride: int = None) -> Iterator["Record"]:
+        """Recorre un bloque de registros contiguos cada `stride` bytes."""
+        st = self.struct if stride is None else self.strided(stride)
+        for vals in st.iter_unpack(buf):
+            yield self._record(vals)
+
+
+class VarRecordCodec:
+    """Codec de largo variable para las páginas de un SlottedFile.
+
+    • Los campos fijos van igual que en RecordCodec pero sin alineación;
+      cada VARCHAR(n) deja en su lugar un largo uint16 y sus bytes van al
+      final, sin el relleno de ceros hasta n.
+    • Las cadenas se recortan a n bytes igual que en el heap, así un
+      registro se lee con los mismos valores que tendría en un slot fijo.
+    • La tupla plana tiene la misma forma que la de RecordCodec, por eso
+      se reutilizan sus decodificadores.
+    """
+
+    def __init__(self, schema, columns=None, dictionaries=None):
+        self.fixed = RecordCodec(schema, dictionaries=dictionaries)  # esquema completo
+        self.dictionaries = self.fixed.dictionaries
+        wanted = None if columns is None else set(columns)
+        self.projected = wanted is not None
+        self._projections = {}
+
+        self._var = []  # posiciones (en la tupla plana) de las cadenas variables
+        self._fields = []  # (posición, cantidad de valores planos) por campo
+        self._decoders = []
+        self.schema = []
+        self.layout = []  # (campo, formato struct, offset en la parte fija, es variable)
+        chars = []
+        pos = 0
+        for (name, fmt), (kind, _, _), decoder in zip(
+            self.fixed.schema, self.fixed._encoders, self.fixed._decoders
+        ):
+            if kind == "str":
+                char, count = "H", 1
+                self._var.append(pos)
+            elif kind == "dict":
+                char, count = "i", 1
+            else:
+                char = Record.get_format_char_static(fmt)
+                count = len(struct.unpack(char, bytes(struct.calcsize(char))))
+            self.layout.append((name, char, struct.calcsize("<" + "".join(chars)), kind == "str"))
+            chars.append(char)
+            self._fields.append((pos, count))
+            pos += count
+            if wanted is None or name in wanted:
+                self.schema.append((name, fmt))
+                self._decoders.append(decoder)
+        self.struct = struct.Struct("<" + "".join(chars))
+        self.format = self.struct.format
+        self.size = self.struct.size  # mínimo: todas las cadenas vacías
+        self.max_size = self.size + sum(
+            n for kind, n, _ in self.fixed._encoders if kind == "str"
+        )
+
+    def projection(self, columns) -> "VarRecordCodec":
+        """Codec que decodifica sólo `columns` (en el orden del esquema)."""
+        if columns is None:
+            return self
+        key = frozenset(columns)
+        if key >= {name for name, _ in self.schema}:
+            return self
+        codec = self._projections.get(key)
+        if codec is None:
+            codec = VarRecordCodec(self.fixed.schema, key, self.dictionaries)
+            self._projections[key] = codec
+        return codec
+
+    # ------------------------------------------------------------------
+    # Empaquetado -------------------------------------------------------
+    # ------------------------------------------------------------------
+    def pack(self, values) -> bytes:
+        if self.projected:
+            raise ValueError("No se puede empaquetar con un codec proyectado.")
+        flat = list(self.fixed.struct.unpack(self.fixed.pack(values)))
+        tail = []
+        for pos in self._var:
+            raw = flat[pos].rstrip(b"\x00")
+            flat[pos] = len(raw)
+            tail.append(raw)
+        return self.struct.pack(*flat) + b"".join(tail)
+
+    def pack_empty(self) -> bytes:
+        """Registro de un slot sin datos: -1 / -inf / False y cadenas vacías.
+
+        Los campos con diccionario quedan con el código 0: como en un hueco
+        del heap, lo único que se compara es la PK.
+        """
+        flat = []
+        for kind, n, fmt in self.fixed._encoders:
+            if kind in ("str", "dict"):
+                flat.append(0)
+            elif kind == "vec":
+                flat.extend([0] * n)
+            elif kind == "seq":
+                flat.extend([-1] * n)
+            elif fmt[-1] in "fd" or fmt.upper() == "FLOAT":
+                flat.append(float("-inf"))
+            elif Record.get_format_char_static(fmt) == "?":
+                flat.append(False)
+            else:
+                flat.append(-1)
+        return self.struct.pack(*flat)
+
+    # ------------------------------------------------------------------
+    # Desempaquetado ----------------------------------------------------
+    # ------------------------------------------------------------------
+    def flat(self, buf) -> tuple:
+        """Tupla plana como la de RecordCodec (cadenas como bytes sin relleno)."""
+        vals = list(self.struct.unpack_from(buf))
+        pos = self.size
+        for i in self._var:
+            n = vals[i]
+            vals[i] = bytes(buf[pos : pos + n])
+            pos += n
+        return tuple(vals)
+
+    def unpack(self, buf, schema=None) -> "Record":
+        vals = self.flat(buf)
+        return Record._from_codec(self, [decoder(vals) for decoder in self._decoders], schema)
+
+    def unpack_from(self, buf, offset: int = 0) -> "Record":
+        return self.unpack(memoryview(buf)[offset:])
+
+
 class Record:
 
     def __init__(self, schema, values):
         self.schema = schema
         self.values = values
-        self.format = ''.join(self.get_format_char(fmt) for _, fmt in schema)
-        self.size = struct.calcsize(self.format)
+        codec = RecordCodec.for_schema(schema)
+        self.format = codec.format
+        self.size = codec.size
+
+    @classmethod
+    def _from_codec(cls, codec: RecordCodec, values, schema=None) -> "Record":
+        rec = cls.__new__(cls)
+        rec.schema = codec.schema if schema is None else schema
+        rec.values = values
+        rec.format = codec.format
+        rec.size = codec.size
+        return rec
 
     def get_format_char(self, fmt):
         return Record.get_format_char_static(fmt)
@@ -39,44 +412,11 @@ class Record:
             return fmt
 
     def pack(self) -> bytes:
-        processed = []
-        for (_, fmt), val in zip(self.schema, self.values):
-            if fmt.upper() == "SOUND":
-                processed.extend(val)
-            elif 's' in self.get_format_char(fmt): # cadena fija
-                size = int(self.get_format_char(fmt)[:-1])
-                processed.append(val.encode('utf-8')[:size].ljust(size, b'\x00'))
-            elif fmt[:-1].isdigit():               # 3i, 4f, etc.
-                if not (isinstance(val, (list, tuple)) and len(val) == int(fmt[:-1])):
-                    raise ValueError(f"Se esperaban {fmt[:-1]} elementos para '{fmt}'")
-                processed.extend(val)              # aplanar
-            else:
-                processed.append(val)
-        return struct.pack(self.format, *processed)
+        return RecordCodec.for_schema(self.schema).pack(self.values)
 
     @staticmethod
     def unpack(buf, schema):
-        fmt_str = ''.join(Record.get_format_char_static(fmt) for _, fmt in schema)
-        vals = list(struct.unpack(fmt_str, buf))
-        out = []
-        for (_, fmt) in schema:
-            if 's' in fmt:
-                size = int(fmt[:-1])
-                raw = vals.pop(0)
-                if isinstance(raw, bytes):
-                    out.append(raw.rstrip(b'\x00').decode('utf-8', errors='replace'))
-                else:
-                    out.append(str(raw))  
-            elif fmt[:-1].isdigit():
-                n = int(fmt[:-1])
-                out.append(tuple(vals[:n]))
-                del vals[:n]
-            elif fmt.upper() == "SOUND":
-                out.append((vals.pop(0), vals.pop(0)))
-            else:
-                out.append(vals.pop(0))
-        return Record(schema, out)
-
+        return RecordCodec.for_schema(schema).unpack(buf, schema)
     
     @staticmethod
     def get_size(schema) -> int:
@@ -0,0 +1,105 @@
+from collections import OrderedDict
+from typing import Hashable, List, Optional, Tuple
+
+# --------------------------------------------------------
+#  Configuración por defecto
+# --------------------------------------------------------
+DEFAULT_MAX_ROWS = 10_000  # filas decodificadas en memoria
+
+
+class RowCache:
+    """Filas ya decodificadas de las búsquedas puntuales por PK.
+
+    • Clave (tabla, PK) -> valores con los TEXT/SOUND ya leídos, así un
+      acierto no pasa por el índice, el heap ni los archivos laterales.
+    • Acotada a `max_rows` filas; se desaloja la menos usada (LRU).
+    • HeapFile invalida la fila en cada insert / delete / update de esa PK
+      y la tabla entera cuando el archivo se recrea o compacta.
+    • `get` devuelve una copia: quien la reciba puede modificarla.
+    """
+
+    def __init__(self, max_rows: int = DEFAULT_MAX_ROWS):
+        if max_rows < 0:
+            raise ValueError("max_rows no puede ser negativo.")
+        self.max_rows = max_rows
+        self._rows: "OrderedDict[Tuple[str, Hashable], list]" = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def configure(self, max_rows: Optional[int] = None) -> None:
+        """Cambia el límite de filas (0 desactiva la caché)."""
+        if max_rows is not None:
+            if max_rows < 0:
+                raise ValueError("max_rows no puede ser negativo.")
+            self.max_rows = max_rows
+            self._evict()
+
+    def _evict(self) -> None:
+        while len(self._rows) > self.max_rows:
+            self._rows.popitem(last=False)
+            self.evictions += 1
+
+    # ------------------------------------------------------------------
+    # Lectura / escritura ----------------------------------------------
+    # ------------------------------------------------------------------
+    def get(self, table_path: str, pk) -> Optional[List]:
+        key = (table_path, pk)
+        values = self._rows.get(key)
+        if values is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._rows.move_to_end(key)
+        return list(values)
+
+    def put(self, table_path: str, pk, values) -> None:
+        if self.max_rows == 0:
+            return
+        key = (table_path, pk)
+        self._rows[key] = list(values)  # iterar resuelve los LazyValues pendientes
+        self._rows.move_to_end(key)
+        self._evict()
+
+    # ------------------------------------------------------------------
+    # Invalidación ------------------------------------------------------
+    # ------------------------------------------------------------------
+    def invalidate(self, table_path: str, pk) -> None:
+        if self._rows.pop((table_path, pk), None) is not None:
+            self.invalidations += 1
+
+    def invalidate_table(self, table_path: str) -> None:
+        for key in [k for k in self._rows if k[0] == table_path]:
+            del self._rows[key]
+            self.invalidations += 1
+
+    def reset(self) -> None:
+        self._rows.clear()
+
+    # ------------------------------------------------------------------
+    # Métricas ----------------------------------------------------------
+    # ------------------------------------------------------------------
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / total if total else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "rows": len(self._rows),
+            "max_rows": self.max_rows,
+        }
+
+    def reset_stats(self) -> None:
+        self.hits = self.misses = self.evictions = self.invalidations = 0
+
+
+# Caché compartida por todas las tablas del proceso
+_row_cache = RowCache()
+
+
+def get_row_cache() -> RowCache:
+    return _row_cache
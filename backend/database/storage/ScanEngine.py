@@ -0,0 +1,250 @@
+import mmap
+import re
+import struct
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from .Record import Record
+
+# --------------------------------------------------------
+#  Tipos de columna para comparaciones vectorizadas
+# --------------------------------------------------------
+KIND_STR = "str"  # cadena fija (Ns)
+KIND_NUM = "num"  # int / float / bool sueltos
+KIND_VEC = "vec"  # vectores (2f, 3i) y SOUND
+KIND_DICT = "dict"  # VARCHAR codificado: código int32 del ColumnDictionary
+
+SCAN_WINDOW_ROWS = 65536  # filas por ventana en los scans en streaming
+
+_COUNTED = re.compile(r"^(\d+)([a-zA-Z?])$")
+
+
+class ScanEngine:
+    """Vista NumPy sin copia de los slots de un HeapFile.
+
+    • Los slots tienen tamaño fijo, así que el `.dat` después de la
+      cabecera se ve como un arreglo estructurado (mmap + np.frombuffer).
+    • Los huecos se descartan con una máscara vectorizada sobre el
+      centinela de la PK.
+    • Las comparaciones por columna se hacen sobre el arreglo completo y
+      sólo se decodifican (con el RecordCodec) las filas que coinciden.
+    • En columnas con diccionario se comparan códigos, no cadenas.
+    • Sólo baja a disco las páginas de la tabla si el pool tiene alguna
+      sucia; `close` (o salir del `with`) libera el mmap.
+    """
+
+    def __init__(self, heap):
+        heap.flush_pages()  # el mmap debe ver lo que está en el buffer pool
+        self.heap = heap
+        self.size = heap.heap_size
+        self.dtype, self.kinds = self.build_dtype(heap.schema, heap.slot_size, heap.dictionaries)
+        self.start = 0  # primer slot que cubre esta vista
+        self._mm = None
+        self._views: List["ScanEngine"] = []  # ventanas sacadas (comparten el mmap)
+        if self.size == 0:
+            self.array = np.zeros(0, dtype=self.dtype)
+            return
+        from .HeapFile import METADATA_SIZE
+
+        with open(heap.filename, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.base = METADATA_SIZE
+        self.array = np.frombuffer(
+            self._mm, dtype=self.dtype, count=self.size, offset=METADATA_SIZE
+        )
+
+    # ------------------------------------------------------------------
+    # Esquema → dtype estructurado -------------------------------------
+    # ------------------------------------------------------------------
+    @staticmethod
+    def build_dtype(schema, slot_size: int, encoded=()) -> Tuple[np.dtype, Dict[str, str]]:
+        """dtype con los offsets nativos de struct; ValueError si no es representable.
+
+        Los campos de `encoded` (con diccionario) se ven como su código int32.
+        """
+        names, formats, offsets = [], [], []
+        kinds = {}
+        prefix = ""
+        for name, fmt in schema:
+            char = "i" if name in encoded else Record.get_format_char_static(fmt)
+            # offset nativo = tamaño con el campo - tamaño del campo
+            offsets.append(struct.calcsize(prefix + char) - struct.calcsize(char))
+            prefix += char
+            names.append(name)
+            counted = _COUNTED.match(char)
+            if name in encoded:
+                formats.append(np.dtype("i"))
+                kinds[name] = KIND_DICT
+            elif counted and counted.group(2) == "s":
+                formats.append(f"S{counted.group(1)}")
+                kinds[name] = KIND_STR
+            elif counted:
+                formats.append((ScanEngine._scalar(counted.group(2)), (int(counted.group(1)),)))
+                kinds[name] = KIND_VEC
+            elif len(char) == 2 and char[0] == char[1]:  # SOUND -> "ii"
+                formats.append((ScanEngine._scalar(char[0]), (2,)))
+                kinds[name] = KIND_VEC
+            elif len(char) == 1:
+                formats.append(ScanEngine._scalar(char))
+                kinds[name] = KIND_NUM
+            else:
+                raise ValueError(f"Formato '{fmt}' no soportado por el scan vectorizado.")
+        dtype = np.dtype(
+            {"names": names, "formats": formats, "offsets": offsets, "itemsize": slot_size}
+        )
+        return dtype, kinds
+
+    @staticmethod
+    def _scalar(char: str) -> np.dtype:
+        if char not in "bBhHiIlLqQfd?":
+            raise ValueError(f"Formato '{char}' no soportado por el scan vectorizado.")
+        return np.dtype(char)
+
+    # ------------------------------------------------------------------
+    # Columnas y máscaras ----------------------------------------------
+    # ------------------------------------------------------------------
+    def column(self, name: str) -> np.ndarray:
+        """Columna tal como está en disco (vista sin copia)."""
+        return self.array[name]
+
+    def numeric(self, name: str) -> np.ndarray:
+        """Columna numérica promovida a 64 bits (igual que los valores de struct)."""
+        col = self.array[name]
+        if col.dtype.kind == "f":
+            return col.astype(np.float64)
+        if col.dtype.kind in "iu":
+            return col.astype(np.int64)
+        return col
+
+    def live_mask(self) -> np.ndarray:
+        """Slots vivos de la vista según el bitmap de validez (no mira la PK)."""
+        live = self.heap.validity.mask(self.start, self.start + self.size)
+        return np.pad(live, (0, self.size - len(live)))
+
+    def eq_mask(self, name: str, value) -> np.ndarray:
+        """Máscara de `columna == value` con la misma semántica que la comparación en Python."""
+        kind = self.kinds[name]
+        if kind == KIND_DICT:
+            code = self.heap.dictionaries[name].lookup(value)
+            if code is None:  # ninguna fila tiene ese valor
+                return np.zeros(self.size, dtype=bool)
+            return self.array[name] == code
+        if kind == KIND_STR:
+            if not isinstance(value, str):
+                return np.zeros(self.size, dtype=bool)
+            return self.array[name] == value.encode("utf-8")
+        if kind == KIND_VEC:
+            col = self.numeric(name)
+            if not isinstance(value, tuple) or len(value) != col.shape[1]:
+                return np.zeros(self.size, dtype=bool)
+            return (col == np.asarray(value)).all(axis=1)
+        if isinstance(value, (bool, int, float, np.number)):
+            return self.numeric(name) == value
+        return np.zeros(self.size, dtype=bool)
+
+    def in_mask(self, name: str, values) -> np.ndarray:
+        """Máscara de `columna IN values`; con diccionario compara contra los códigos."""
+        if self.kinds[name] == KIND_DICT:
+            dictionary = self.heap.dictionaries[name]
+            codes = [code for code in map(dictionary.lookup, values) if code is not None]
+            return np.isin(self.array[name], codes)
+        mask = np.zeros(self.size, dtype=bool)
+        for value in values:
+            mask |= self.eq_mask(name, value)
+        return mask
+
+    def positions(self, mask: np.ndarray) -> np.ndarray:
+        """Slots (absolutos) donde `mask` es verdadero."""
+        return np.flatnonzero(mask) + self.start
+
+    # ------------------------------------------------------------------
+    # Ventanas para scans en streaming ---------------------------------
+    # ------------------------------------------------------------------
+    def window(self, lo: int, hi: int) -> "ScanEngine":
+        """Vista de los slots [lo, hi) de esta vista (comparte el mmap)."""
+        view = object.__new__(type(self))
+        view.__dict__.update(self.__dict__)
+        view.array = self.array[lo:hi]
+        view.start = self.start + lo
+        view.size = len(view.array)
+        self._views.append(view)
+        return view
+
+    def windows(
+        self, rows: int = SCAN_WINDOW_ROWS, ranges: Optional[List[Tuple[int, int]]] = None
+    ) -> Iterator["ScanEngine"]:
+        """Ventanas de a lo sumo `rows` slots; con `ranges` sólo cubre esos [lo, hi)."""
+        for first, last in [(0, self.size)] if ranges is None else ranges:
+            last = min(last, self.size)
+            for lo in range(first, last, rows):
+                yield self.window(lo, min(lo + rows, last))
+
+    # ------------------------------------------------------------------
+    # Materialización --------------------------------------------------
+    # ------------------------------------------------------------------
+    def values(self, name: str, positions: Optional[np.ndarray] = None) -> list:
+        """Valores Python de una columna (str decodificado, tuplas para vectores)."""
+        col = self.array[name] if positions is None else self.array[name][positions - self.start]
+        kind = self.kinds[name]
+        if kind == KIND_DICT:
+            return self.heap.dictionaries[name].decode(col.tolist())
+        if kind == KIND_STR:
+            return [raw.decode("utf-8", errors="replace") for raw in col.tolist()]
+        if kind == KIND_VEC:
+            return [tuple(v) for v in col.tolist()]
+        return col.tolist()
+
+    def iter_records(self, positions, columns=None) -> Iterator[Record]:
+        """Decodifica las filas `positions` a medida que se piden (sólo `columns`)."""
+        codec = self.heap.codec.projection(columns)
+        slot_size = self.heap.slot_size
+        for pos in positions:
+            yield codec.unpack_from(self._mm, self.base + int(pos) * slot_size)
+
+    def records(self, positions, columns=None) -> List[Record]:
+        return list(self.iter_records(positions, columns))
+
+    def frame_columns(self, positions: np.ndarray) -> Dict[str, object]:
+        """Columnas listas para un DataFrame (numéricas como arreglos de 64 bits)."""
+        out = {}
+        for name, _ in self.heap.schema:
+            if self.kinds[name] == KIND_NUM:
+                out[name] = self.numeric(name)[positions - self.start]
+            else:
+                out[name] = self.values(name, positions)
+        return out
+
+    # ------------------------------------------------------------------
+    # Cierre -----------------------------------------------------------
+    # ------------------------------------------------------------------
+    def close(self) -> None:
+        """Libera el mmap; esta vista y sus ventanas dejan de poder usarse."""
+        for view in self._views:
+            view.array = None
+        self._views.clear()
+        self.array = None
+        mm, self._mm = self._mm, None
+        _close_map(mm)
+
+    def __enter__(self) -> "ScanEngine":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def _close_map(mm) -> None:
+    if mm is not None:
+        try:
+            mm.close()
+        except BufferError:  # quedan arreglos afuera (p. ej. en un DataFrame): se libera con ellos
+            pass
+
+
+def open_scan(heap) -> Optional[ScanEngine]:
+    """ScanEngine para `heap`, o None si el esquema no es representable en NumPy."""
+    try:
+        return getattr(heap, "scan_engine", ScanEngine)(heap)
+    except ValueError:
+        return None
@@ -0,0 +1,62 @@
+import atexit
+import os
+from collections import OrderedDict
+from typing import Optional
+
+DEFAULT_MAX_OPEN = 64  # archivos laterales abiertos a la vez
+
+
+class SideFileCache:
+    """Handles de lectura abiertos a los archivos laterales (.text / sonido).
+
+    • Un handle por archivo, reutilizado entre lecturas; al superar
+      `max_open` se cierra el menos usado (LRU).
+    • Los handles son sin buffer: cada lectura va al archivo, así que ven
+      los appends y los borrados lógicos que hacen otros handles.
+    • Se indexan por ruta absoluta: da igual si quien lee o cierra usa una
+      ruta relativa al directorio actual.
+    """
+
+    def __init__(self, max_open: int = DEFAULT_MAX_OPEN):
+        if max_open <= 0:
+            raise ValueError("max_open debe ser positivo.")
+        self.max_open = max_open
+        self._handles: "OrderedDict[str, object]" = OrderedDict()
+
+    def _handle(self, filename: str):
+        filename = os.path.abspath(filename)
+        fh = self._handles.get(filename)
+        if fh is not None:
+            self._handles.move_to_end(filename)
+            return fh
+        fh = open(filename, "rb", buffering=0)
+        self._handles[filename] = fh
+        while len(self._handles) > self.max_open:
+            _, old = self._handles.popitem(last=False)
+            old.close()
+        return fh
+
+    def read_at(self, filename: str, offset: int, size: int) -> bytes:
+        fh = self._handle(filename)
+        fh.seek(offset)
+        return fh.read(size)
+
+    def file_size(self, filename: str) -> int:
+        return os.fstat(self._handle(filename).fileno()).st_size
+
+    def close(self, prefix: Optional[str] = None) -> None:
+        """Cierra todos los handles, o sólo los de archivos que empiezan con `prefix`."""
+        if prefix is not None:
+            prefix = os.path.join(os.path.abspath(os.path.dirname(prefix)), os.path.basename(prefix))
+        for filename in list(self._handles):
+            if prefix is None or filename.startswith(prefix):
+                self._handles.pop(filename).close()
+
+
+# Caché compartida por todas las tablas del proceso
+_side_files = SideFileCache()
+atexit.register(_side_files.close)
+
+
+def get_side_files() -> SideFileCache:
+    return _side_files
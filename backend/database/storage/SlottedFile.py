@@ -0,0 +1,535 @@
+import struct
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from .ExtentAllocator import get_extents
+from .HeapFile import HeapFile, METADATA_FORMAT, METADATA_SIZE
+from .Record import Record, VarRecordCodec
+from .ScanEngine import ScanEngine
+from .WriteAheadLog import wal_replace
+
+# --------------------------------------------------------
+#  Constantes internas
+# --------------------------------------------------------
+PAGE_BYTES = 8192  # tamaño de cada página del .dat
+SLOTS_PER_PAGE = 256  # entradas de directorio por página: RID = página * 256 + slot
+PAGE_HEADER = struct.Struct("<HH")  # [entradas del directorio, inicio de los datos]
+ENTRY = struct.Struct("<HH")  # [offset del registro (0 = vacía), largo | banderas]
+RID = struct.Struct("<i")  # destino de un registro mudado
+FORWARD = 0x8000  # la entrada sólo guarda el RID adonde se mudó el registro
+MOVED = 0x4000  # registro mudado desde otra página (su RID es el de la entrada FORWARD)
+LENGTH_MASK = 0x3FFF
+PAGE_CAPACITY = PAGE_BYTES - PAGE_HEADER.size
+
+
+def _directory(page) -> List[Tuple[int, int]]:
+    """Entradas (offset, largo | banderas) del directorio de la página."""
+    n = PAGE_HEADER.unpack_from(page)[0]
+    return list(ENTRY.iter_unpack(page[PAGE_HEADER.size : PAGE_HEADER.size + n * ENTRY.size]))
+
+
+def _page_space(entries: List[Tuple[int, int]]) -> int:
+    """Bytes que le quedan a un registro nuevo en una página con este directorio."""
+    used = sum(length & LENGTH_MASK for offset, length in entries if offset)
+    free = PAGE_CAPACITY - len(entries) * ENTRY.size - used
+    if all(offset for offset, _ in entries):  # hace falta una entrada nueva
+        if len(entries) >= SLOTS_PER_PAGE:
+            return 0
+        free -= ENTRY.size
+    return max(free, 0)
+
+
+def _build_page(records: List[Optional[Tuple[bytes, int]]]) -> bytearray:
+    """Página con `records[slot]` = (datos, banderas) o None para una entrada vacía."""
+    page = bytearray(PAGE_BYTES)
+    end = PAGE_BYTES
+    for slot, item in enumerate(records):
+        if item is None:
+            continue
+        data, flags = item
+        end -= len(data)
+        page[end : end + len(data)] = data
+        ENTRY.pack_into(page, PAGE_HEADER.size + slot * ENTRY.size, end, len(data) | flags)
+    PAGE_HEADER.pack_into(page, 0, len(records), end)
+    return page
+
+
+def _pack_pages(rows: List[bytes]) -> Tuple[List[bytearray], List[Tuple[int, int]]]:
+    """Reparte registros en páginas nuevas, llenándolas en orden.
+
+    Devuelve (páginas, (página, slot) de cada registro).
+    """
+    pages, places = [], []
+    current, free = [], PAGE_CAPACITY
+    for data in rows:
+        if len(current) == SLOTS_PER_PAGE or free < len(data) + ENTRY.size:
+            pages.append(_build_page(current))
+            current, free = [], PAGE_CAPACITY
+        places.append((len(pages), len(current)))
+        current.append((data, 0))
+        free -= len(data) + ENTRY.size
+    if current:
+        pages.append(_build_page(current))
+    return pages, places
+
+
+def _pad(data: bytes) -> bytes:
+    """Todo registro ocupa al menos un RID: así un FORWARD siempre entra en su lugar."""
+    return data.ljust(RID.size, b"\x00")
+
+
+class _Window:
+    """Lo que ScanEngine espera de `array` para los RIDs [lo, hi).
+
+    Cada columna se arma recién la primera vez que se pide, y sólo esa:
+    un filtro sobre un INT no copia los VARCHAR. `win[lo:hi]` es otra vista.
+    """
+
+    def __init__(self, engine: "SlottedScanEngine", lo: int, hi: int):
+        self._engine = engine
+        self.lo = lo
+        self.hi = hi
+        self._located = None  # (RIDs vivos, bytes de sus páginas, inicio de cada registro)
+        self._columns: Dict[str, np.ndarray] = {}
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            lo, hi, _ = key.indices(len(self))
+            return _Window(self._engine, self.lo + lo, self.lo + max(lo, hi))
+        col = self._columns.get(key)
+        if col is None:
+            if self._located is None:
+                self._located = self._engine.heap._locate(self.lo, self.hi)
+            col = self._columns[key] = self._engine._column(key, self.lo, self.hi, *self._located)
+        return col
+
+    def __len__(self) -> int:
+        return self.hi - self.lo
+
+
+class SlottedScanEngine(ScanEngine):
+    """ScanEngine sobre un SlottedFile: las columnas de cada ventana se arman con NumPy.
+
+    Cada columna tiene el mismo dtype que en el mmap de un HeapFile (cadenas
+    rellenadas a n), así las máscaras y comparaciones son las mismas; en
+    disco y en el buffer pool los registros siguen siendo variables. Los
+    campos fijos se leen con un gather sobre las páginas y las cadenas con
+    una máscara por largo, sin decodificar fila por fila.
+    """
+
+    def __init__(self, heap: "SlottedFile"):
+        self.heap = heap
+        self.size = heap.heap_size
+        self.dtype, self.kinds = self.build_dtype(heap.schema, heap.slot_size, heap.dictionaries)
+        self.start = 0
+        self._mm = None
+        self._views: List[ScanEngine] = []
+        self._layout = {name: (char, offset, var) for name, char, offset, var in heap.codec.layout}
+        self._fixed = heap.codec.size
+        self.array = _Window(self, 0, self.size)
+
+    def _field(self, name: str, data: np.ndarray, starts: np.ndarray) -> np.ndarray:
+        """Valores de un campo de la parte fija (para una cadena, su largo)."""
+        char, offset, var = self._layout[name]
+        base = np.dtype("<u2") if var else np.dtype(self.dtype[name].base).newbyteorder("<")
+        shape = self.dtype[name].shape
+        width = struct.calcsize("<" + char)
+        raw = data[starts[:, None] + (offset + np.arange(width))]
+        return raw.view(base).reshape((len(starts),) + (() if var else shape))
+
+    def _column(self, name: str, lo: int, hi: int, rids, data, starts) -> np.ndarray:
+        col = np.zeros(hi - lo, dtype=self.dtype[name])
+        if not len(rids):
+            return col
+        char, offset, var = self._layout[name]
+        if not var:
+            col[rids - lo] = self._field(name, data, starts)
+            return col
+        # la cadena va después de la parte fija y de las cadenas anteriores
+        begin = starts + self._fixed
+        for other, (_, other_offset, other_var) in self._layout.items():
+            if other_var and other_offset < offset:
+                begin = begin + self._field(other, data, starts)
+        width = self.dtype[name].itemsize
+        span = np.arange(width)
+        inside = span < self._field(name, data, starts)[:, None]
+        chars = np.zeros((len(rids), width), dtype=np.uint8)
+        chars[inside] = data[(begin[:, None] + span)[inside]]
+        col[rids - lo] = chars.view(self.dtype[name]).reshape(len(rids))
+        return col
+
+    def iter_records(self, positions, columns=None) -> Iterator[Record]:
+        codec = self.heap.codec.projection(columns)
+        heap = self.heap
+        current, page = -1, None
+        for pos in positions:
+            page_no, slot = divmod(int(pos), SLOTS_PER_PAGE)
+            if page_no != current:
+                current, page = page_no, heap._page(page_no)
+            offset, length = ENTRY.unpack_from(page, PAGE_HEADER.size + slot * ENTRY.size)
+            if offset == 0 or length & (FORWARD | MOVED):
+                yield codec.unpack(heap._read_slot(int(pos)))
+            else:
+                yield codec.unpack(page[offset : offset + length])
+
+
+class SlottedFile(HeapFile):
+    """Tabla en páginas con directorio de slots (`CREATE TABLE ... USING SLOTTED`).
+
+    • El .dat es la cabecera (páginas, -1) y páginas de PAGE_BYTES: al
+      principio el directorio [offset, largo] de cada slot y desde el final
+      los registros, empaquetados con VarRecordCodec (un VARCHAR ocupa lo
+      que mide, no n bytes).
+    • El RID de un registro es página * SLOTS_PER_PAGE + slot y no cambia
+      mientras el registro viva: índices, bitmap de validez, PKLocator y
+      zone map lo usan igual que el slot de un heap.
+    • Si un UPDATE agranda el registro y ya no entra en su página, se muda
+      a otra (MOVED) y en su entrada queda el RID nuevo (FORWARD).
+    • Los huecos de los borrados se juntan al compactar la página, sin
+      cambiar los números de slot; VACUUM reescribe todo denso.
+    • Los bytes libres por página se calculan al primer insert del proceso
+      y se mantienen en memoria (`_space`).
+    """
+
+    scan_engine = SlottedScanEngine
+    _space: Dict[str, np.ndarray] = {}  # .dat -> bytes libres por página
+
+    # ------------------------------------------------------------------
+    # Creación del archivo ---------------------------------------------
+    # ------------------------------------------------------------------
+    @staticmethod
+    def build_file(
+        table_name: str,
+        schema: List[Tuple[str, str]],
+        primary_key: Optional[str] = None,
+        encodings: Optional[dict] = None,
+    ) -> None:
+        """Crea <table_name>.dat sin páginas y el .schema.json.
+
+        ValueError si el registro más grande posible no entra en una página.
+        """
+        encoded = encodings or {}
+        layout = [(name, "INT" if encoded.get(name) == "dict" else fmt) for name, fmt in schema]
+        size = max(VarRecordCodec(layout).max_size, RID.size)
+        if size + ENTRY.size > PAGE_CAPACITY:
+            raise ValueError(
+                f"Un registro puede ocupar {size} bytes y no entra en una página de {PAGE_BYTES}."
+            )
+        SlottedFile.discard(table_name + ".dat")
+        HeapFile.build_file(table_name, schema, primary_key, "slotted", encodings)
+
+    # ------------------------------------------------------------------
+    # Inicialización ----------------------------------------------------
+    # ------------------------------------------------------------------
+    def __init__(self, table_name: str):
+        super().__init__(table_name)
+        # en las páginas va el formato variable; `slot_size` sigue siendo el
+        # ancho fijo de las filas que arma el SlottedScanEngine
+        self.codec = VarRecordCodec(self.schema, dictionaries=self.dictionaries)
+        self._empty = self.codec.pack_empty()
+
+    def _register(self) -> None:
+        self.pool.register(self.filename, METADATA_SIZE, PAGE_BYTES)
+
+    @property
+    def n_pages(self) -> int:
+        return self._read_header()[0]
+
+    @property
+    def heap_size(self) -> int:
+        """Cantidad de RIDs posibles (SLOTS_PER_PAGE por página)."""
+        return self.n_pages * SLOTS_PER_PAGE
+
+    def _heap_bytes(self) -> int:
+        return self.n_pages * PAGE_BYTES
+
+    # ------------------------------------------------------------------
+    # Páginas y directorio ---------------------------------------------
+    # ------------------------------------------------------------------
+    def _reserve(self, n_pages: int) -> None:
+        get_extents().reserve(self.filename, METADATA_SIZE + n_pages * PAGE_BYTES)
+
+    def _page(self, page_no: int) -> memoryview:
+        return self.pool.read_slot(self.filename, page_no)
+
+    def _read_entry(self, rid: int) -> Tuple[memoryview, int, int]:
+        """(página, offset, largo | banderas) de la entrada del RID; (página, 0, 0) si no existe."""
+        page_no, slot = divmod(rid, SLOTS_PER_PAGE)
+        page = self._page(page_no)
+        if slot >= PAGE_HEADER.unpack_from(page)[0]:
+            return page, 0, 0
+        offset, length = ENTRY.unpack_from(page, PAGE_HEADER.size + slot * ENTRY.size)
+        return page, offset, length
+
+    def _write_entry(self, page_no: int, slot: int, offset: int, length: int) -> None:
+        self.pool.write_slot(
+            self.filename, page_no, ENTRY.pack(offset, length), PAGE_HEADER.size + slot * ENTRY.size
+        )
+
+    def _add_page(self) -> int:
+        n_pages = self.n_pages
+        self._reserve(n_pages + 1)
+        self.validity.extend((n_pages + 1) * SLOTS_PER_PAGE)  # antes de la cabecera
+        self._write_header(n_pages + 1, -1)
+        return n_pages
+
+    def _compact(self, page_no: int) -> int:
+        """Junta los registros al final de la página (mismos slots); devuelve el nuevo inicio."""
+        page = self._page(page_no)
+        records = [
+            None if offset == 0 else (bytes(page[offset : offset + (length & LENGTH_MASK)]), length & ~LENGTH_MASK)
+            for offset, length in _directory(page)
+        ]
+        new = _build_page(records)
+        self.pool.write_slot(self.filename, page_no, bytes(new))
+        return PAGE_HEADER.unpack_from(new)[1]
+
+    def _insert_into(
+        self, page_no: int, data: bytes, flags: int = 0, slot: Optional[int] = None
+    ) -> Optional[int]:
+        """Guarda `data` en la página (en `slot` o en la primera entrada libre); None si no entra."""
+        page = self._page(page_no)
+        entries = _directory(page)
+        start = PAGE_HEADER.unpack_from(page)[1] or PAGE_BYTES
+        if slot is None:
+            slot = next((i for i, (offset, _) in enumerate(entries) if offset == 0), len(entries))
+            if slot >= SLOTS_PER_PAGE:
+                self._refresh_space(page_no)
+                return None
+        count = max(len(entries), slot + 1)
+        directory_end = PAGE_HEADER.size + count * ENTRY.size
+        if start - directory_end < len(data):
+            used = sum(length & LENGTH_MASK for offset, length in entries if offset)
+            if PAGE_BYTES - directory_end - used < len(data):
+                self._refresh_space(page_no)
+                return None
+            start = self._compact(page_no)
+        offset = start - len(data)
+        self.pool.write_slot(self.filename, page_no, data, offset)
+        self._write_entry(page_no, slot, offset, len(data) | flags)
+        self.pool.write_slot(self.filename, page_no, PAGE_HEADER.pack(count, offset))
+        self._refresh_space(page_no)
+        return slot
+
+    def _remove(self, rid: int, trim: bool = True) -> None:
+        """Vacía la entrada del RID; con `trim` se acortan las entradas vacías del final."""
+        page_no, slot = divmod(rid, SLOTS_PER_PAGE)
+        self._write_entry(page_no, slot, 0, 0)
+        if trim:
+            page = self._page(page_no)
+            entries = _directory(page)
+            count = len(entries)
+            while count and entries[count - 1][0] == 0:
+                count -= 1
+            if count < len(entries):
+                start = PAGE_HEADER.unpack_from(page)[1]
+                self.pool.write_slot(self.filename, page_no, PAGE_HEADER.pack(count, start))
+        self._refresh_space(page_no)
+
+    # ------------------------------------------------------------------
+    # Espacio libre -----------------------------------------------------
+    # ------------------------------------------------------------------
+    def _free_space(self) -> np.ndarray:
+        """Bytes libres por página; las que no conoce se leen del directorio."""
+        n_pages = self.n_pages
+        space = self._space.get(self.filename)
+        if space is None or len(space) != n_pages:
+            known = np.zeros(0, dtype=np.int32) if space is None else space[:n_pages]
+            extra = [_page_space(_directory(self._page(p))) for p in range(len(known), n_pages)]
+            space = np.concatenate([known, np.asarray(extra, dtype=np.int32)])
+            self._space[self.filename] = space
+        return space
+
+    @classmethod
+    def discard(cls, filename: str) -> None:
+        """Olvida los bytes libres de `filename`: se vuelven a calcular al usarse."""
+        cls._space.pop(filename, None)
+
+    def _refresh_space(self, page_no: int) -> None:
+        space = self._space.get(self.filename)
+        if space is not None and page_no < len(space):
+            space[page_no] = _page_space(_directory(self._page(page_no)))
+
+    def _store_existing(self, data: bytes, flags: int = 0, avoid: Optional[int] = None) -> Optional[int]:
+        """RID donde quedó `data` en una página que ya existe, o None si ninguna tiene lugar."""
+        for page_no in np.flatnonzero(self._free_space() >= len(data)).tolist():
+            if page_no == avoid:
+                continue
+            slot = self._insert_into(page_no, data, flags)
+            if slot is not None:
+                return page_no * SLOTS_PER_PAGE + slot
+        return None
+
+    def _store(self, data: bytes, flags: int = 0, avoid: Optional[int] = None) -> int:
+        rid = self._store_existing(data, flags, avoid)
+        if rid is None:
+            page_no = self._add_page()
+            rid = page_no * SLOTS_PER_PAGE + self._insert_into(page_no, data, flags)
+        return rid
+
+    # ------------------------------------------------------------------
+    # Acceso por RID ----------------------------------------------------
+    # ------------------------------------------------------------------
+    def _read_slot(self, pos: int) -> bytes:
+        """Registro del RID `pos` (siguiendo un FORWARD); uno vacío se lee con PK centinela."""
+        page, offset, length = self._read_entry(pos)
+        if offset == 0 or length & MOVED:
+            return self._empty
+        if length & FORWARD:
+            page, offset, length = self._read_entry(RID.unpack_from(page, offset)[0])
+        return bytes(page[offset : offset + (length & LENGTH_MASK)])
+
+    def _write_slot(self, pos: int, data: bytes, next_free: Optional[int] = None):
+        """Reemplaza el registro del RID `pos` sin cambiar su RID (no hay free-list)."""
+        data = _pad(data)
+        page_no, slot = divmod(pos, SLOTS_PER_PAGE)
+        page, offset, length = self._read_entry(pos)
+        if length & FORWARD:  # la copia mudada se descarta y se vuelve a ubicar
+            self._remove(RID.unpack_from(page, offset)[0])
+        elif len(data) <= length & LENGTH_MASK:  # entra en su lugar
+            self.pool.write_slot(self.filename, page_no, data, offset)
+            self._write_entry(page_no, slot, offset, len(data))
+            self._refresh_space(page_no)
+            return
+        self._remove(pos, trim=False)
+        if self._insert_into(page_no, data, slot=slot) is None:
+            moved = self._store(data, MOVED, avoid=page_no)
+            self._insert_into(page_no, RID.pack(moved), FORWARD, slot=slot)
+
+    def _free_slots(self) -> Iterator[int]:
+        """RIDs sin registro propio: entradas vacías, mudadas y las que el directorio no usa."""
+        for page_no in range(self.n_pages):
+            entries = _directory(self._page(page_no))
+            for slot in range(SLOTS_PER_PAGE):
+                if slot >= len(entries) or entries[slot][0] == 0 or entries[slot][1] & MOVED:
+                    yield page_no * SLOTS_PER_PAGE + slot
+
+    def _iter_live(self, start: int = 0, stop: int = None) -> Iterator[Tuple[int, memoryview]]:
+        """(RID, registro empaquetado) de los vivos en [start, stop), una página a la vez."""
+        validity = self.validity
+        stop = self.heap_size if stop is None else min(stop, self.heap_size)
+        rid = validity.next_live(start)
+        while rid is not None and rid < stop:
+            page_no = rid // SLOTS_PER_PAGE
+            first = page_no * SLOTS_PER_PAGE
+            last = min(stop, first + SLOTS_PER_PAGE)
+            page = self._page(page_no)
+            for i in np.flatnonzero(validity.mask(rid, last)).tolist():
+                slot = rid - first + i
+                offset, length = ENTRY.unpack_from(page, PAGE_HEADER.size + slot * ENTRY.size)
+                if length & FORWARD:
+                    yield first + slot, self._read_slot(first + slot)
+                else:
+                    yield first + slot, page[offset : offset + length]
+            rid = validity.next_live(last)
+
+    def _locate(self, start: int, stop: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Para el SlottedScanEngine: (RIDs vivos de [start, stop), bytes de las
+        páginas donde están, índice en esos bytes donde empieza cada registro)."""
+        validity = self.validity
+        stop = min(stop, self.heap_size)
+        blocks: Dict[int, int] = {}  # página -> lugar en `pages`
+        pages, rids, starts = [], [], []
+
+        def base(page_no: int) -> int:
+            if page_no not in blocks:
+                blocks[page_no] = len(pages)
+                pages.append(np.frombuffer(self._page(page_no), dtype=np.uint8))
+            return blocks[page_no] * PAGE_BYTES
+
+        rid = validity.next_live(start)
+        while rid is not None and rid < stop:
+            page_no = rid // SLOTS_PER_PAGE
+            first = page_no * SLOTS_PER_PAGE
+            last = min(stop, first + SLOTS_PER_PAGE)
+            page = self._page(page_no)
+            n = PAGE_HEADER.unpack_from(page)[0]
+            entries = np.frombuffer(page, dtype="<u2", count=2 * n, offset=PAGE_HEADER.size)
+            slots = np.flatnonzero(validity.mask(rid, last)) + (rid - first)
+            offsets = entries[2 * slots].astype(np.int64) + base(page_no)
+            for i in np.flatnonzero(entries[2 * slots + 1] & FORWARD).tolist():
+                moved = RID.unpack_from(page, offsets[i] - base(page_no))[0]
+                _, offset, _ = self._read_entry(moved)
+                offsets[i] = base(moved // SLOTS_PER_PAGE) + offset
+            rids.append(slots + first)
+            starts.append(offsets)
+            rid = validity.next_live(last)
+        if not rids:
+            empty = np.zeros(0, dtype=np.int64)
+            return empty, np.zeros(0, dtype=np.uint8), empty
+        return np.concatenate(rids), np.concatenate(pages), np.concatenate(starts)
+
+    def _iter_slots(self) -> Iterator[Tuple[int, bytes]]:
+        for pos in range(self.heap_size):
+            yield pos, self._read_slot(pos)
+
+    def _iter_records(
+        self, columns=None, live_only: bool = False, start: int = 0, stop: int = None
+    ) -> Iterator[Tuple[int, Record]]:
+        """Como en HeapFile; sin `live_only` los RIDs vacíos salen con PK centinela."""
+        codec = self.codec.projection(columns)
+        if live_only:
+            for rid, data in self._iter_live(start, stop):
+                yield rid, codec.unpack(data)
+            return
+        stop = self.heap_size if stop is None else min(stop, self.heap_size)
+        for rid in range(start, stop):
+            yield rid, codec.unpack(self._read_slot(rid))
+
+    # ------------------------------------------------------------------
+    # Inserción y borrado ----------------------------------------------
+    # ------------------------------------------------------------------
+    def _place(self, data: bytes) -> int:
+        """Ubica un registro en la primera página con lugar (o en una nueva)."""
+        rid = self._store(_pad(data))
+        self.validity.set(rid)
+        return rid
+
+    def _place_many(self, rows: List[bytes]) -> List[int]:
+        """Como `_place` para un lote: lo que no entra en las páginas existentes
+        va a páginas nuevas armadas en memoria y escritas en un solo bloque."""
+        rids: List[Optional[int]] = []
+        pending = []  # (índice en el lote, registro)
+        for i, data in enumerate(rows):
+            data = _pad(data)
+            rid = None if pending else self._store_existing(data)
+            if rid is None:
+                pending.append((i, data))
+            rids.append(rid)
+
+        if pending:
+            pages, places = _pack_pages([data for _, data in pending])
+            n_pages = self.n_pages
+            self._reserve(n_pages + len(pages))
+            self.pool.write_slots(self.filename, n_pages, b"".join(pages))
+            self.validity.extend((n_pages + len(pages)) * SLOTS_PER_PAGE)
+            self._write_header(n_pages + len(pages), -1)
+            for (i, _), (page, slot) in zip(pending, places):
+                rids[i] = (n_pages + page) * SLOTS_PER_PAGE + slot
+        self.validity.set_many(rids)
+        return rids
+
+    def _free(self, pos: int, values) -> None:
+        """Vacía la entrada del RID `pos` (y la copia mudada, si tiene)."""
+        page, offset, length = self._read_entry(pos)
+        if length & FORWARD:
+            self._remove(RID.unpack_from(page, offset)[0])
+        self._remove(pos)
+
+    # ------------------------------------------------------------------
+    # Compactación (VACUUM) --------------------------------------------
+    # ------------------------------------------------------------------
+    def _rewrite(self, rows: List[list]) -> List[int]:
+        pages, places = _pack_pages([_pad(self.codec.pack(row)) for row in rows])
+        tmp = self.filename + ".vacuum"
+        with open(tmp, "wb") as f:
+            f.write(struct.pack(METADATA_FORMAT, len(pages), -1))
+            for page in pages:
+                f.write(page)
+        self.pool.discard(self.filename)  # las páginas cacheadas son del archivo viejo
+        get_extents().discard(self.filename)
+        self._space.pop(self.filename, None)
+        wal_replace(tmp, self.filename)
+        self._register()
+        return [page * SLOTS_PER_PAGE + slot for page, slot in places]
@@ -1,6 +1,9 @@
 import struct
 import os
 
+from .SideFileCache import get_side_files
+from .WriteAheadLog import wal_open
+
 class Sound:
     """Manejo de almacenamiento externo de rutas a archivos de sonido."""
 
@@ -24,15 +27,28 @@ class Sound:
     def insert(self, text: str) -> int:
         encoded = text.encode("utf-8")
         n = len(encoded)
-        with open(self.filename, "ab") as f:
+        with wal_open(self.filename, "ab") as f:
             offset = f.tell()
-            f.write(struct.pack("i", n))  # escribe el prefijo n
-            f.write(encoded)
+            f.write(struct.pack("i", n) + encoded)  # prefijo n + bytes: un solo registro del log
         return offset
 
+    def insert_many(self, paths: list[str]) -> list[int]:
+        """Inserta varias rutas con una sola apertura del archivo."""
+        offsets = []
+        with wal_open(self.filename, "ab") as f:
+            offset = f.tell()
+            chunks = []
+            for path in paths:
+                encoded = path.encode("utf-8")
+                chunks.append(struct.pack("i", len(encoded)) + encoded)
+                offsets.append(offset)
+                offset += self.INT_SIZE + len(encoded)
+            f.write(b"".join(chunks))  # un solo registro (y un fsync del log) por lote
+        return offsets
+
     def delete(self, offset: int) -> bool:
         try:
-            with open(self.filename, "r+b") as f:
+            with wal_open(self.filename, "r+b") as f:
                 f.seek(offset)
                 f.write(struct.pack("i", self.SENTINEL))  # marcar como eliminado
             return True
@@ -41,17 +57,21 @@ class Sound:
 
     def read(self, offset: int) -> str | None:
         try:
-            with open(self.filename, "rb") as f:
-                if offset < 0 or offset >= os.fstat(f.fileno()).st_size:
-                    return None
-                f.seek(offset)
-                n_bytes = f.read(self.INT_SIZE)
-                if len(n_bytes) < self.INT_SIZE:
-                    return None
-                (n,) = struct.unpack("i", n_bytes)
-                if n == self.SENTINEL or n <= 0:
-                    return None
-                content = f.read(n)
-                return content.decode("utf-8", errors="ignore")
+            side_files = get_side_files()  # handle abierto reutilizado
+            if offset < 0 or offset >= side_files.file_size(self.filename):
+                return None
+            n_bytes = side_files.read_at(self.filename, offset, self.INT_SIZE)
+            if len(n_bytes) < self.INT_SIZE:
+                return None
+            (n,) = struct.unpack("i", n_bytes)
+            if n == self.SENTINEL or n <= 0:
+                return None
+            content = side_files.read_at(self.filename, offset + self.INT_SIZE, n)
+            return content.decode("utf-8", errors="ignore")
         except (IOError, struct.error):
             return None
+
+    def read_many(self, offsets: list[int]) -> list[str | None]:
+        """Lee varias rutas con una sola apertura, recorriendo el archivo en orden."""
+        found = {offset: self.read(offset) for offset in sorted(set(offsets))}
+        return [found.get(offset) for offset in offsets]
@@ -1,16 +1,51 @@
+import lzma
 import struct
 import os
+import zlib
+from typing import Iterable, Iterator, Optional
+
+from .SideFileCache import get_side_files
+from .WriteAheadLog import wal_open, wal_replace
+
+# --------------------------------------------------------
+#  Compresión de blobs (opcional, por columna)
+# --------------------------------------------------------
+COMPRESSIONS = ("zlib", "lzma")
+COMPRESSED = 0x40000000  # bandera en el prefijo: el blob está comprimido
+WITH_ZDICT = 0x20000000  # ... con el diccionario de la columna
+LENGTH_MASK = 0x1FFFFFFF  # bytes guardados del blob (sin banderas)
+MIN_COMPRESS = 64  # textos más cortos se guardan tal cual
+ZDICT_SIZE = 32 * 1024  # zlib sólo mira los últimos 32 KB del diccionario
+ZDICT_MIN_SAMPLE = 4 * 1024  # texto mínimo para entrenar el diccionario
+READ_CHUNK = 64 * 1024  # trozo que se lee del disco al descomprimir
+
 
 class TextFile:
-    """Manejo de almacenamiento externo de textos con eliminación lógica."""
+    """Manejo de almacenamiento externo de textos con eliminación lógica.
+
+    • Cada blob es [n][bytes]; n = SENTINEL marca un blob borrado.
+    • Con `compression` ("zlib" o "lzma") los textos se comprimen uno por
+      uno y n lleva la bandera COMPRESSED; los que no achican quedan sin
+      comprimir, así un mismo archivo mezcla ambos.
+    • Con zlib todos los blobs de la columna comparten un diccionario
+      entrenado con los primeros textos (<archivo>.zdict, no cambia más;
+      los blobs que lo usan llevan WITH_ZDICT): los textos cortos y
+      parecidos comprimen mucho mejor que solos.
+    • La lectura descomprime por trozos a medida que lee el archivo.
+    """
 
     INT_SIZE = 4
     SENTINEL = -1  # Valor de n para indicar eliminación lógica
 
-    def __init__(self, table_name: str, field_name: str):
+    def __init__(self, table_name: str, field_name: str, compression: Optional[str] = None):
         self.filename = os.path.join("backend/database/tables", f"{table_name}.{field_name}.text")
         if not os.path.exists(self.filename):
             raise FileNotFoundError(f"Archivo {self.filename} no existe. Llame a build_file primero.")
+        if compression is not None and compression not in COMPRESSIONS:
+            raise ValueError(f"Compresión '{compression}' no soportada.")
+        self.compression = compression
+        self.zdict_filename = self.filename + ".zdict"
+        self._zdict: Optional[bytes] = None
 
     @staticmethod
     def build_file(table_name: str, field_name: str) -> None:
@@ -20,33 +55,177 @@ class TextFile:
             os.makedirs(os.path.dirname(filename), exist_ok=True)
             with open(filename, "wb") as f:
                 pass
+        if os.path.exists(filename + ".zdict"):  # de una tabla anterior con el mismo nombre
+            os.remove(filename + ".zdict")
 
-    def insert(self, text: str) -> int:
+    # ------------------------------------------------------------------
+    # Compresión --------------------------------------------------------
+    # ------------------------------------------------------------------
+    def _dictionary(self, texts: Optional[Iterable[str]] = None) -> Optional[bytes]:
+        """Diccionario zlib de la columna; si todavía no existe se entrena con
+        los textos ya guardados más `texts` (con None sólo se carga)."""
+        if self._zdict is None and self.compression == "zlib":
+            if os.path.exists(self.zdict_filename):
+                with open(self.zdict_filename, "rb") as f:
+                    self._zdict = f.read()
+            elif texts is not None:
+                sample = self._train(texts)
+                if len(sample) >= ZDICT_MIN_SAMPLE:
+                    # en disco (y en el log) antes que el primer blob que lo usa:
+                    # si la sentencia se deshace, el diccionario se va con ella
+                    tmp = self.zdict_filename + ".tmp"
+                    with open(tmp, "wb") as f:
+                        f.write(sample)
+                        f.flush()
+                        os.fsync(f.fileno())
+                    wal_replace(tmp, self.zdict_filename)
+                    self._zdict = sample
+        return self._zdict
+
+    def _train(self, texts: Iterable[str]) -> bytes:
+        """Muestra de hasta ZDICT_SIZE bytes: el comienzo de cada texto (lo que
+        más se repite entre documentos, títulos, encabezados), en orden.
+
+        De lo ya guardado sólo entran los textos anteriores al primer blob
+        borrado (ver `_iter_blobs`); el resto de la muestra sale de `texts`.
+        """
+        per_text = 1024
+        sample = bytearray()
+        stored = (text for _, text in self._iter_blobs())
+        for source in (stored, texts):
+            for text in source:
+                if text:
+                    sample += text.encode("utf-8")[:per_text]
+                if len(sample) >= ZDICT_SIZE:
+                    return bytes(sample[-ZDICT_SIZE:])
+        return bytes(sample)
+
+    def _encode(self, text: str, zdict: Optional[bytes]) -> tuple[int, bytes]:
+        """(n, bytes) a guardar para `text`."""
         encoded = text.encode("utf-8")
-        n = len(encoded)
-        with open(self.filename, "ab") as f:
+        if self.compression is None or len(encoded) < MIN_COMPRESS:
+            return len(encoded), encoded
+        if self.compression == "lzma":
+            packed = lzma.compress(encoded)
+        elif zdict:
+            compressor = zlib.compressobj(9, zdict=zdict)
+            packed = compressor.compress(encoded) + compressor.flush()
+        else:
+            packed = zlib.compress(encoded, 9)
+        if len(packed) >= len(encoded):
+            return len(encoded), encoded
+        flags = COMPRESSED | (WITH_ZDICT if zdict and self.compression == "zlib" else 0)
+        return len(packed) | flags, packed
+
+    def _decompressor(self, n: int):
+        if self.compression == "lzma":
+            return lzma.LZMADecompressor()
+        if n & WITH_ZDICT:
+            return zlib.decompressobj(zdict=self._dictionary(None))
+        return zlib.decompressobj()
+
+    # ------------------------------------------------------------------
+    # Escritura ---------------------------------------------------------
+    # ------------------------------------------------------------------
+    def insert(self, text: str) -> int:
+        return self.insert_many([text])[0]
+
+    def insert_many(self, texts: list[str]) -> list[int]:
+        """Inserta varios textos con una sola apertura del archivo."""
+        zdict = self._dictionary(texts) if self.compression == "zlib" else None
+        offsets = []
+        with wal_open(self.filename, "ab") as f:
             offset = f.tell()
-            f.write(struct.pack("i", n))  # escribe el prefijo n
-            f.write(encoded)
-        return offset
+            chunks = []
+            for text in texts:
+                n, data = self._encode(text, zdict)
+                chunks.append(struct.pack("i", n) + data)  # prefijo n + bytes
+                offsets.append(offset)
+                offset += self.INT_SIZE + len(data)
+            f.write(b"".join(chunks))  # un solo registro (y un fsync del log) por lote
+        return offsets
 
     def delete(self, offset: int) -> bool:
         try:
-            with open(self.filename, "r+b") as f:
+            with wal_open(self.filename, "r+b") as f:
                 f.seek(offset)
                 f.write(struct.pack("i", self.SENTINEL))  # marcar como eliminado
             return True
         except Exception:
             return False
 
+    # ------------------------------------------------------------------
+    # Lectura -----------------------------------------------------------
+    # ------------------------------------------------------------------
+    def _decode(self, n: int, read) -> str:
+        """Texto de un blob con prefijo `n`; `read(size)` entrega sus bytes en orden."""
+        size = n & LENGTH_MASK
+        if not n & COMPRESSED:
+            return read(size).decode("utf-8", errors="replace")
+        decompressor = self._decompressor(n)
+        parts = []
+        while size > 0:
+            chunk = read(min(size, READ_CHUNK))
+            if not chunk:
+                break
+            size -= len(chunk)
+            parts.append(decompressor.decompress(chunk))
+        if hasattr(decompressor, "flush"):
+            parts.append(decompressor.flush())
+        return b"".join(parts).decode("utf-8", errors="replace")
+
     def read(self, offset: int) -> str | None:
-        with open(self.filename, "rb") as f:
-            f.seek(offset)
-            n_bytes = f.read(self.INT_SIZE)
-            if len(n_bytes) < self.INT_SIZE:
-                return None
-            (n,) = struct.unpack("i", n_bytes)
-            if n == self.SENTINEL:
-                return None
-            content = f.read(n)
-            return content.decode("utf-8", errors="replace")
+        side_files = get_side_files()  # handle abierto reutilizado
+        n_bytes = side_files.read_at(self.filename, offset, self.INT_SIZE)
+        if len(n_bytes) < self.INT_SIZE:
+            return None
+        (n,) = struct.unpack("i", n_bytes)
+        if n == self.SENTINEL:
+            return None
+        position = offset + self.INT_SIZE
+
+        def read_bytes(size: int) -> bytes:
+            nonlocal position
+            data = side_files.read_at(self.filename, position, size)
+            position += len(data)
+            return data
+
+        return self._decode(n, read_bytes)
+
+    def read_many(self, offsets: list[int]) -> list[str | None]:
+        """Lee varios textos recorriendo el archivo en orden."""
+        ordered = sorted(set(offsets))
+        found = dict(zip(ordered, self.iter_read(ordered)))
+        return [found[offset] for offset in offsets]
+
+    def iter_read(self, offsets: Iterable[int]) -> Iterator[str | None]:
+        """Textos de `offsets`, en ese orden, con un handle con buffer propio:
+        si los offsets van crecientes el archivo se lee de corrido."""
+        with open(self.filename, "rb", buffering=READ_CHUNK) as f:
+            for offset in offsets:
+                f.seek(offset)
+                n_bytes = f.read(self.INT_SIZE)
+                if len(n_bytes) < self.INT_SIZE:
+                    yield None
+                    continue
+                (n,) = struct.unpack("i", n_bytes)
+                yield None if n == self.SENTINEL else self._decode(n, f.read)
+
+    def _iter_blobs(self) -> Iterator[tuple[int, str]]:
+        """(offset, texto) de los blobs en orden de archivo, hasta el primer borrado.
+
+        Borrar pisa el largo con SENTINEL, así que desde ahí no se puede saber
+        dónde empieza el blob siguiente: lo que sigue no se recorre.
+        """
+        with open(self.filename, "rb", buffering=READ_CHUNK) as f:
+            offset = 0
+            while True:
+                n_bytes = f.read(self.INT_SIZE)
+                if len(n_bytes) < self.INT_SIZE:
+                    return
+                (n,) = struct.unpack("i", n_bytes)
+                if n == self.SENTINEL:  # borrado: el largo ya no está, no se puede seguir
+                    return
+                text = self._decode(n, f.read)
+                yield offset, text
+                offset += self.INT_SIZE + (n & LENGTH_MASK)
@@ -0,0 +1,166 @@
+import atexit
+import os
+import struct
+from typing import Callable, Dict, Iterable, Optional
+
+import numpy as np
+
+HEADER = struct.Struct("<q?")  # slots, clean
+
+
+class ValidityBitmap:
+    """Un bit por slot del heap: 1 = registro vivo, 0 = hueco (<tabla>.valid).
+
+    • En memoria es un arreglo de bool (se consulta sin decodificar nada);
+      en disco va empaquetado a bits.
+    • Lleva la cuenta de vivos, así `count` es O(1) y no depende de que la
+      tabla tenga PK ni de los centinelas.
+    • Igual que el zone map, en disco lleva una marca `clean`; si falta o
+      no coincide con el heap se reconstruye recorriendo la free-list, que
+      tiene exactamente los huecos.
+    """
+
+    _open_bitmaps: Dict[str, "ValidityBitmap"] = {}
+
+    def __init__(self, filename: str):
+        self.filename = filename
+        self.size = 0  # slots cubiertos
+        self.count = 0  # slots vivos
+        self._bits = np.zeros(0, dtype=bool)  # con capacidad extra para crecer
+        self._clean = True
+
+    # ------------------------------------------------------------------
+    # Apertura (una instancia por archivo y proceso) --------------------
+    # ------------------------------------------------------------------
+    @classmethod
+    def open(
+        cls, filename: str, heap_size: int, free_slots_fn: Callable[[], Iterable[int]]
+    ) -> "ValidityBitmap":
+        bm = cls._open_bitmaps.get(filename)
+        if bm is None:
+            bm = cls(filename)
+            cls._open_bitmaps[filename] = bm
+            bm._load(heap_size, free_slots_fn)
+        elif bm.size != heap_size:
+            bm.rebuild(heap_size, free_slots_fn())  # el heap cambió por fuera
+        return bm
+
+    @classmethod
+    def discard(cls, filename: str, remove_file: bool = False) -> None:
+        cls._open_bitmaps.pop(filename, None)
+        if remove_file and os.path.exists(filename):
+            os.remove(filename)
+
+    @classmethod
+    def reset(cls) -> None:
+        """Olvida los bitmaps abiertos SIN guardarlos (p. ej. en un proceso hijo tras fork)."""
+        cls._open_bitmaps.clear()
+
+    @classmethod
+    def save_open(cls, filename: str) -> None:
+        bm = cls._open_bitmaps.get(filename)
+        if bm is not None:
+            bm.save()
+
+    @classmethod
+    def save_all(cls) -> None:
+        for bm in cls._open_bitmaps.values():
+            bm.save()
+
+    def _load(self, heap_size: int, free_slots_fn) -> None:
+        if os.path.exists(self.filename):
+            with open(self.filename, "rb") as f:
+                raw = f.read()
+            if len(raw) >= HEADER.size:
+                slots, clean = HEADER.unpack_from(raw)
+                if clean and slots == heap_size and len(raw) == HEADER.size + (slots + 7) // 8:
+                    packed = np.frombuffer(raw, np.uint8, offset=HEADER.size)
+                    self._bits = np.unpackbits(packed, count=slots).astype(bool)
+                    self.size = slots
+                    self.count = int(np.count_nonzero(self._bits))
+                    return
+        self.rebuild(heap_size, free_slots_fn())
+
+    def rebuild(self, heap_size: int, free_slots: Iterable[int]) -> None:
+        """Todos los slots vivos salvo los de la free-list."""
+        self._touch()
+        self._bits = np.ones(heap_size, dtype=bool)
+        for pos in free_slots:
+            self._bits[pos] = False
+        self.size = heap_size
+        self.count = int(np.count_nonzero(self._bits))
+
+    def save(self) -> None:
+        if self._clean:
+            return
+        with open(self.filename, "wb") as f:
+            f.write(HEADER.pack(self.size, True))
+            f.write(np.packbits(self._bits[: self.size]).tobytes())
+        self._clean = True
+
+    def _touch(self) -> None:
+        """Antes del primer cambio en memoria marca el archivo como no consistente."""
+        if not self._clean:
+            return
+        self._clean = False
+        if os.path.exists(self.filename):
+            with open(self.filename, "r+b") as f:
+                f.write(HEADER.pack(self.size, False))
+
+    # ------------------------------------------------------------------
+    # Escrituras -------------------------------------------------------
+    # ------------------------------------------------------------------
+    def _grow(self, size: int) -> None:
+        if size > len(self._bits):
+            bits = np.zeros(max(size, 2 * len(self._bits)), dtype=bool)
+            bits[: self.size] = self._bits[: self.size]
+            self._bits = bits
+        self.size = max(self.size, size)
+
+    def extend(self, size: int) -> None:
+        """Agrega huecos hasta cubrir `size` slots (p. ej. una página nueva de un SlottedFile)."""
+        if size > self.size:
+            self._touch()
+            self._grow(size)
+
+    def set(self, pos: int) -> None:
+        self.set_many([pos])
+
+    def set_many(self, positions: Iterable[int]) -> None:
+        positions = list(positions)
+        if not positions:
+            return
+        self._touch()
+        self._grow(max(positions) + 1)
+        for pos in positions:
+            if not self._bits[pos]:
+                self._bits[pos] = True
+                self.count += 1
+
+    def clear(self, pos: int) -> None:
+        if pos < self.size and self._bits[pos]:
+            self._touch()
+            self._bits[pos] = False
+            self.count -= 1
+
+    # ------------------------------------------------------------------
+    # Consultas --------------------------------------------------------
+    # ------------------------------------------------------------------
+    def is_live(self, pos: int) -> bool:
+        return 0 <= pos < self.size and bool(self._bits[pos])
+
+    def mask(self, start: int = 0, stop: Optional[int] = None) -> np.ndarray:
+        """Vista de los bits de [start, stop)."""
+        stop = self.size if stop is None else min(stop, self.size)
+        return self._bits[start:stop]
+
+    def next_live(self, pos: int) -> Optional[int]:
+        """Primer slot vivo >= pos, o None si no queda ninguno."""
+        rest = self._bits[max(pos, 0) : self.size]
+        if not rest.size:
+            return None
+        i = int(np.argmax(rest))
+        return max(pos, 0) + i if rest[i] else None
+
+
+atexit.register(ValidityBitmap.save_all)
@@ -0,0 +1,603 @@
+import atexit
+import os
+import shutil
+import struct
+import time
+import zlib
+from contextlib import contextmanager
+from typing import Callable, Iterator, List, Optional, Set, Tuple
+
+# --------------------------------------------------------
+#  Configuración por defecto
+# --------------------------------------------------------
+DEFAULT_GROUP_SIZE = 64  # transacciones confirmadas por fsync del log
+DEFAULT_GROUP_DELAY = 0.05  # segundos: pasado esto el próximo commit hace fsync
+DEFAULT_CHECKPOINT_BYTES = 64 * 1024 * 1024  # log más grande → checkpoint
+WAL_FILENAME = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "tables", "wal.log"
+)
+
+# --------------------------------------------------------
+#  Formato de los registros del log
+# --------------------------------------------------------
+FRAME = struct.Struct("<II")  # largo del cuerpo, crc32 del cuerpo
+HEAD = struct.Struct("<Bq")  # tipo, txid
+ENTRY = struct.Struct("<HqqII")  # len(ruta), offset, tamaño previo, len(antes), len(después)
+
+KIND_WRITE = 1  # bytes `después` en `offset` (antes: lo que había)
+KIND_TRUNCATE = 2  # archivo cortado en `offset` (antes: los bytes que se perdieron)
+KIND_COMMIT = 3
+KIND_RENAME = 4  # `después` (ruta) reemplazó a la ruta; antes: ruta de la copia del viejo
+KIND_ABORT = 5  # la transacción ya se deshizo en los archivos: ni redo ni undo
+
+Entry = Tuple[int, int, str, int, int, bytes, bytes]  # kind, txid, ruta, offset, tamaño, antes, después
+
+
+class WriteAheadLog:
+    """Log de escrituras (undo/redo) para el heap, los archivos laterales y los índices.
+
+    • Cada escritura física se registra como (archivo, offset, bytes
+      anteriores, bytes nuevos) ANTES de tocar el archivo; el registro llega
+      al sistema operativo enseguida y el fsync se hace por grupos.
+    • Una transacción agrupa todas las escrituras de una sentencia
+      (heap + TEXT/SOUND + índices); fuera de una transacción cada
+      escritura se confirma sola (autocommit).
+    • Si la sentencia lanza una excepción, sus escrituras se deshacen en
+      los archivos (como en la recuperación), se sincronizan sólo esos
+      archivos y se registra un ABORT: la recuperación ya no la toca.
+    • Un archivo reemplazado entero (`wal_replace`) se registra como un
+      rename; el archivo viejo queda como copia de undo hasta el checkpoint.
+    • Group commit: el log se sincroniza cada `group_size` transacciones o
+      cuando pasaron `group_delay` segundos desde el último fsync; los
+      archivos de datos sólo se sincronizan en el checkpoint.
+    • Al iniciar, `recover` rehace lo confirmado y deshace la transacción
+      que quedó a medias, así heap e índices vuelven a ser consistentes;
+      no se registra nada nuevo encima de un log sin recuperar.
+    • El log siempre llega al disco antes que los datos: las páginas del
+      BufferPool lo sincronizan antes de bajar, y las escrituras directas
+      (laterales, índices) antes de cada write.
+    • El R-Tree (libspatialindex) escribe sus propios archivos: no pasa por
+      el log y se reconstruye tras una recuperación.
+    """
+
+    def __init__(
+        self,
+        filename: str = WAL_FILENAME,
+        group_size: int = DEFAULT_GROUP_SIZE,
+        group_delay: float = DEFAULT_GROUP_DELAY,
+        checkpoint_bytes: int = DEFAULT_CHECKPOINT_BYTES,
+    ):
+        self.filename = filename
+        self.group_size = group_size
+        self.group_delay = group_delay
+        self.checkpoint_bytes = checkpoint_bytes
+        self.enabled = True
+
+        self._fh = None
+        self._recovered = False
+        self._next_txid = time.time_ns()  # no se repite entre procesos
+        self._txid: Optional[int] = None  # transacción en curso
+        self._depth = 0  # transacciones anidadas: sólo la externa confirma
+        self._tx_writes = 0  # escrituras de la transacción en curso
+        self._tx_undo: List[Tuple[int, str, int, int, bytes, bytes]] = []  # para el rollback
+        self._backups: Set[str] = set()  # copias de undo de los renames, hasta el checkpoint
+        self._rollback_hooks: List[Callable[[Set[str]], None]] = []
+        self._pending = 0  # commits todavía sin fsync
+        self._unsynced = False  # hay registros sin fsync
+        self._last_sync = time.monotonic()
+        self._touched: Set[str] = set()  # archivos escritos desde el último checkpoint
+
+        self.commits = 0
+        self.syncs = 0
+        self.records = 0
+        self.bytes_logged = 0
+
+    # ------------------------------------------------------------------
+    # Configuración -----------------------------------------------------
+    # ------------------------------------------------------------------
+    def configure(
+        self,
+        group_size: Optional[int] = None,
+        group_delay: Optional[float] = None,
+        checkpoint_bytes: Optional[int] = None,
+        enabled: Optional[bool] = None,
+    ) -> None:
+        if group_size is not None:
+            if group_size <= 0:
+                raise ValueError("group_size debe ser positivo.")
+            self.group_size = group_size
+        if group_delay is not None:
+            if group_delay < 0:
+                raise ValueError("group_delay no puede ser negativo.")
+            self.group_delay = group_delay
+        if checkpoint_bytes is not None:
+            if checkpoint_bytes <= 0:
+                raise ValueError("checkpoint_bytes debe ser positivo.")
+            self.checkpoint_bytes = checkpoint_bytes
+        if enabled is not None:
+            if not enabled:
+                self.checkpoint()  # lo registrado hasta ahora queda en los archivos
+            self.enabled = enabled
+
+    def reset(self) -> None:
+        """Olvida el log SIN escribir ni recuperar nada (p. ej. en un proceso hijo
+        de sólo lectura): el log es de otro proceso, éste deja de registrar."""
+        self._fh = None  # el handle heredado del padre
+        self._recovered = True
+        self.enabled = False
+        self._txid = None
+        self._depth = 0
+        self._tx_undo = []
+        self._backups.clear()
+        self._touched.clear()
+        self._pending = 0
+        self._unsynced = False
+
+    def _handle(self):
+        if self._fh is None:
+            if not self._recovered and os.path.exists(self.filename) and os.path.getsize(self.filename):
+                raise RuntimeError(
+                    f"El WAL {self.filename} tiene registros de una ejecución anterior: "
+                    "llame a database.startup() antes de escribir."
+                )
+            os.makedirs(os.path.dirname(self.filename), exist_ok=True)
+            self._fh = open(self.filename, "ab")
+        return self._fh
+
+    # ------------------------------------------------------------------
+    # Transacciones -----------------------------------------------------
+    # ------------------------------------------------------------------
+    @contextmanager
+    def transaction(self) -> Iterator[int]:
+        """Agrupa las escrituras del bloque; el commit lo hace la más externa.
+
+        Si una excepción sale de la transacción externa se hace rollback en
+        vez de commit. Una excepción que atrapa un bloque externo no deshace
+        nada: lo escrito hasta ahí se confirma con el resto.
+        """
+        if self._depth == 0:
+            self._txid = self._next_txid
+            self._next_txid += 1
+            self._tx_writes = 0
+            self._tx_undo = []
+        self._depth += 1
+        aborted = False
+        try:
+            yield self._txid
+        except BaseException:
+            aborted = self._depth == 1
+            raise
+        finally:
+            self._depth -= 1
+            if self._depth == 0:
+                txid, self._txid = self._txid, None
+                undo, self._tx_undo = self._tx_undo, []
+                if aborted:
+                    if undo:
+                        self._rollback(txid, undo)
+                elif self._tx_writes:  # una sentencia que no escribió no va al log
+                    self._commit(txid)
+
+    def on_rollback(self, hook: Callable[[Set[str]], None]) -> None:
+        """`hook(rutas)` se llama tras cada rollback con los archivos repuestos,
+        para que se descarte lo que se deriva de ellos en memoria."""
+        self._rollback_hooks.append(hook)
+
+    def _rollback(self, txid: int, undo: list) -> None:
+        """Deshace en los archivos las escrituras de una transacción que no se confirmó."""
+        from .BufferPool import get_buffer_pool
+
+        pool = get_buffer_pool()
+        touched = {path for _, path, *_ in undo}
+        pool.flush_paths(touched)  # lo que quedó en páginas, al disco: se deshace ahí
+        for kind, path, offset, old_size, before, after in reversed(undo):
+            _undo(path, kind, offset, old_size, before, after)
+        pool.invalidate(touched)  # páginas y cabeceras se vuelven a leer del disco
+        # el undo en disco antes que el ABORT: sin él la recuperación la desharía
+        # otra vez (idempotente); con él no la toca, aunque después se confirme
+        # otra transacción sobre los mismos bytes
+        for path in touched:
+            _fsync_path(path)
+        self._append(HEAD.pack(KIND_ABORT, txid))
+        for hook in self._rollback_hooks:
+            hook(touched)
+
+    @property
+    def active(self) -> bool:
+        return self._txid is not None
+
+    def log_write(
+        self, filename: str, offset: int, after: bytes, before: bytes = b"", old_size: int = -1
+    ) -> None:
+        """Registra que `after` va a escribirse en `offset` (llamar ANTES de escribir).
+
+        `before` son los bytes que había (pueden ser menos si la escritura
+        agranda el archivo) y `old_size` el tamaño previo del archivo, o -1
+        si deshacer no debe recortarlo.
+        """
+        self._log(KIND_WRITE, filename, offset, old_size, before, after)
+
+    def log_truncate(self, filename: str, size: int, before: bytes, old_size: int) -> None:
+        """Registra que el archivo se va a cortar en `size`; `before` es lo que se pierde."""
+        self._log(KIND_TRUNCATE, filename, size, old_size, before, b"")
+
+    def log_rename(self, src: str, dst: str) -> None:
+        """Registra que `src` va a reemplazar a `dst` (llamar ANTES del rename, dentro
+        de una transacción; con `src` vacío, que `dst` se va a borrar) y deja el `dst` actual como copia de undo hasta el
+        checkpoint: un link duro, así el archivo no se lee ni se copia."""
+        if not self.enabled:
+            return
+        dst = os.path.abspath(dst)
+        backup = ""
+        old_size = -1  # dst no existía: deshacer es borrarlo
+        if os.path.exists(dst):
+            backup = f"{dst}.undo-{self._next_txid}-{self.records}"
+            old_size = os.path.getsize(dst)
+        self._log(
+            KIND_RENAME, dst, 0, old_size, backup.encode("utf-8"),
+            os.path.abspath(src).encode("utf-8") if src else b"",  # sin src: borrado
+        )
+        self.sync()  # el registro en disco antes de tocar los archivos
+        if backup:
+            try:
+                os.link(dst, backup)
+            except OSError:  # sistema de archivos sin links duros
+                shutil.copyfile(dst, backup)
+            self._backups.add(backup)
+
+    def _log(self, kind, filename, offset, old_size, before, after) -> None:
+        if not self.enabled:
+            return
+        path = os.path.abspath(filename)
+        encoded = path.encode("utf-8")
+        autocommit = self._txid is None
+        txid = self._next_txid if autocommit else self._txid
+        if autocommit:
+            self._next_txid += 1
+        else:
+            self._tx_writes += 1
+            self._tx_undo.append(
+                (kind, path, offset, old_size, bytes(before), after if kind == KIND_RENAME else b"")
+            )
+        self._append(
+            HEAD.pack(kind, txid)
+            + ENTRY.pack(len(encoded), offset, old_size, len(before), len(after))
+            + encoded
+            + bytes(before)
+            + bytes(after)
+        )
+        self._touched.add(path)
+        if autocommit:
+            self._commit(txid)
+
+    def _append(self, body: bytes) -> None:
+        fh = self._handle()
+        fh.write(FRAME.pack(len(body), zlib.crc32(body)) + body)
+        fh.flush()
+        self._unsynced = True
+        self.records += 1
+        self.bytes_logged += FRAME.size + len(body)
+
+    def _commit(self, txid: int) -> None:
+        self._append(HEAD.pack(KIND_COMMIT, txid))
+        self.commits += 1
+        self._pending += 1
+        if (
+            self._pending >= self.group_size
+            or time.monotonic() - self._last_sync >= self.group_delay
+        ):
+            self.sync()
+        if self._fh.tell() >= self.checkpoint_bytes:
+            self.checkpoint()
+
+    # ------------------------------------------------------------------
+    # Persistencia ------------------------------------------------------
+    # ------------------------------------------------------------------
+    def sync(self) -> None:
+        """fsync del log: todo lo confirmado hasta ahora sobrevive a una caída."""
+        if self._fh is not None and self._unsynced:
+            self._fh.flush()
+            os.fsync(self._fh.fileno())
+            self.syncs += 1
+        self._unsynced = False
+        self._pending = 0
+        self._last_sync = time.monotonic()
+
+    def checkpoint(self) -> None:
+        """Baja el BufferPool, sincroniza los archivos tocados y vacía el log.
+
+        No hace nada en medio de una transacción (se intenta en el próximo commit).
+        Las copias de undo de los renames se borran.
+        """
+        if self.active:
+            return
+        from .BufferPool import get_buffer_pool
+
+        self.sync()
+        get_buffer_pool().flush()
+        for path in self._touched:
+            _fsync_path(path)
+        self._touched.clear()
+        if self._fh is not None:
+            self._fh.truncate(0)
+            self._fh.seek(0)
+            os.fsync(self._fh.fileno())
+        for backup in self._backups:  # ya no hay nada que deshacer
+            if os.path.exists(backup):
+                os.remove(backup)
+        self._backups.clear()
+
+    def close(self) -> None:
+        self.checkpoint()
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
+
+    # ------------------------------------------------------------------
+    # Recuperación ------------------------------------------------------
+    # ------------------------------------------------------------------
+    def _entries(self) -> Iterator[Entry]:
+        """Registros válidos del log; se detiene en la primera cola rota."""
+        if not os.path.exists(self.filename):
+            return
+        with open(self.filename, "rb") as f:
+            raw = f.read()
+        pos = 0
+        while pos + FRAME.size <= len(raw):
+            length, crc = FRAME.unpack_from(raw, pos)
+            body = raw[pos + FRAME.size : pos + FRAME.size + length]
+            if len(body) < length or zlib.crc32(body) != crc:
+                break  # el proceso murió escribiendo este registro
+            pos += FRAME.size + length
+            kind, txid = HEAD.unpack_from(body)
+            if kind in (KIND_COMMIT, KIND_ABORT):
+                yield kind, txid, "", 0, -1, b"", b""
+                continue
+            path_len, offset, old_size, n_before, n_after = ENTRY.unpack_from(body, HEAD.size)
+            at = HEAD.size + ENTRY.size
+            path = body[at : at + path_len].decode("utf-8")
+            at += path_len
+            before = body[at : at + n_before]
+            after = body[at + n_before : at + n_before + n_after]
+            yield kind, txid, path, offset, old_size, before, after
+
+    def recover(self) -> Set[str]:
+        """Rehace las transacciones confirmadas y deshace las que no llegaron al commit.
+
+        Un rename confirmado ya está hecho (se sincroniza antes del commit):
+        lo escrito antes en ese archivo no se rehace, quedó en el reemplazado.
+        Una transacción con ABORT ya se deshizo al fallar: se saltea entera.
+
+        Devuelve las rutas de los archivos modificados, para que quien llama
+        reconstruya lo que se deriva de ellos. Al terminar el log queda vacío.
+        Si este proceso ya recuperó o escribió en el log, lo que hay es suyo:
+        no hace nada.
+        """
+        if self._fh is not None or self._recovered:
+            return set()
+        self._recovered = True
+        entries = list(self._entries())
+        committed = {txid for kind, txid, *_ in entries if kind == KIND_COMMIT}
+        aborted = {txid for kind, txid, *_ in entries if kind == KIND_ABORT}
+        writes = [e for e in entries if e[0] not in (KIND_COMMIT, KIND_ABORT) and e[1] not in aborted]
+        targets = _redo_targets(writes, committed)
+        touched = set()
+        # 1. redo en orden de log
+        for (kind, txid, path, offset, old_size, before, after), target in zip(writes, targets):
+            if txid in committed and target and _apply(target, kind, offset, after):
+                touched.add(path)
+        # 2. undo de la transacción incompleta, de atrás hacia adelante
+        for kind, txid, path, offset, old_size, before, after in reversed(writes):
+            if txid not in committed and _undo(path, kind, offset, old_size, before, after):
+                touched.add(path)
+        for path in touched:
+            _fsync_path(path)
+        from .BufferPool import get_buffer_pool
+
+        get_buffer_pool().invalidate(touched)  # por si algo se leyó antes de recuperar
+        if os.path.exists(self.filename):
+            with open(self.filename, "r+b") as f:
+                f.truncate(0)
+                os.fsync(f.fileno())
+        for kind, _, _, _, _, before, _ in writes:
+            if kind == KIND_RENAME and before and os.path.exists(before.decode("utf-8")):
+                os.remove(before.decode("utf-8"))
+        return touched
+
+    # ------------------------------------------------------------------
+    # Métricas ----------------------------------------------------------
+    # ------------------------------------------------------------------
+    def stats(self) -> dict:
+        return {
+            "commits": self.commits,
+            "syncs": self.syncs,
+            "commits_per_sync": self.commits / self.syncs if self.syncs else 0.0,
+            "records": self.records,
+            "bytes_logged": self.bytes_logged,
+            "group_size": self.group_size,
+            "group_delay": self.group_delay,
+        }
+
+
+def _fsync_path(path: str) -> None:
+    if os.path.exists(path):
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+
+def _fsync_dir(path: str) -> None:
+    """fsync del directorio de `path`: un rename sobrevive a una caída de la máquina."""
+    try:
+        fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    except OSError:  # sin directorios abribles (Windows)
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _redo_targets(writes: list, committed: Set[int]) -> List[Optional[str]]:
+    """Archivo donde rehacer cada registro (None: no se rehace).
+
+    Lo escrito en una ruta antes de un rename sobre ella fue al archivo
+    reemplazado: si el rename está confirmado ese archivo ya no sirve; si
+    no, está en la copia de undo (o sigue en la ruta si el rename no llegó
+    a hacerse) y el undo lo devuelve a su lugar.
+    """
+    targets, moved = [], {}
+    for kind, txid, path, offset, old_size, before, after in reversed(writes):
+        if kind == KIND_RENAME:
+            targets.append(None)
+            backup = before.decode("utf-8")
+            if txid in committed:
+                moved[path] = None
+            else:
+                moved[path] = backup if backup and os.path.exists(backup) else path
+        else:
+            targets.append(moved.get(path, path))
+    targets.reverse()
+    return targets
+
+
+def _apply(path: str, kind: int, offset: int, after: bytes) -> bool:
+    """Redo de un registro (idempotente). False si el archivo ya no tiene dónde ir."""
+    if not os.path.isdir(os.path.dirname(path)):
+        return False
+    with open(path, "r+b" if os.path.exists(path) else "w+b") as f:
+        if kind == KIND_TRUNCATE:
+            f.truncate(offset)
+        else:
+            f.seek(offset)
+            f.write(after)
+    return True
+
+
+def _undo(
+    path: str, kind: int, offset: int, old_size: int, before: bytes, after: bytes = b""
+) -> bool:
+    """Deshace un registro: repone los bytes anteriores y el tamaño previo, o el
+    archivo que reemplazó un rename."""
+    if kind == KIND_RENAME:
+        backup, src = before.decode("utf-8"), after.decode("utf-8")
+        if backup and os.path.exists(backup):
+            os.replace(backup, path)
+            if os.path.exists(backup):  # el rename no se hizo: era un link al mismo archivo
+                os.remove(backup)
+        elif old_size < 0 and os.path.exists(path):  # no existía antes del rename
+            os.remove(path)
+        if src and os.path.exists(src):  # el reemplazo que no llegó a usarse
+            os.remove(src)
+        _fsync_dir(path)
+        return True
+    if not os.path.exists(path):
+        return False
+    with open(path, "r+b") as f:
+        if before:
+            f.seek(offset)
+            f.write(before)
+        if kind == KIND_WRITE and old_size >= 0 and os.fstat(f.fileno()).st_size > old_size:
+            f.truncate(old_size)
+    return True
+
+
+class _LoggedFile:
+    """Archivo abierto con `wal_open`: cada write/truncate pasa antes por el log."""
+
+    def __init__(self, fh, filename: str, wal: WriteAheadLog):
+        self._fh = fh
+        self._filename = filename
+        self._wal = wal
+        self._readable = fh.readable()
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        offset = self._fh.tell()
+        before, old_size = b"", offset  # modo append: siempre al final
+        if self._readable:
+            before = self._fh.read(len(data))
+            old_size = self._fh.seek(0, os.SEEK_END)
+            self._fh.seek(offset)
+        self._wal.log_write(self._filename, offset, data, before, old_size)
+        self._wal.sync()  # el registro en disco antes que los datos
+        return self._fh.write(data)
+
+    def truncate(self, size: Optional[int] = None) -> int:
+        size = self._fh.tell() if size is None else size
+        offset = self._fh.tell()
+        old_size = self._fh.seek(0, os.SEEK_END)
+        before = b""
+        if self._readable and old_size > size:
+            self._fh.seek(size)
+            before = self._fh.read(old_size - size)
+        self._fh.seek(offset)
+        self._wal.log_truncate(self._filename, size, before, old_size)
+        self._wal.sync()
+        return self._fh.truncate(size)
+
+    def __getattr__(self, name):
+        return getattr(self._fh, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._fh.close()
+        return False
+
+
+def wal_open(filename: str, mode: str = "r+b"):
+    """Como `open` (modos binarios de escritura) pero registrando en el WAL.
+
+    Con "wb" el contenido que se pierde al truncar se guarda para poder
+    deshacerlo.
+    """
+    wal = get_wal()
+    if not wal.enabled:
+        return open(filename, mode)
+    if mode.startswith("w") and os.path.exists(filename):
+        with open(filename, "rb") as f:
+            old = f.read()
+        wal.log_truncate(filename, 0, old, len(old))
+        wal.sync()  # abrir con "w" ya corta el archivo
+    return _LoggedFile(open(filename, mode), filename, wal)
+
+
+def wal_replace(src: str, dst: str) -> None:
+    """`os.replace` registrado como rename: ni el archivo viejo ni el nuevo pasan
+    por el log; el viejo queda como copia de undo hasta el checkpoint."""
+    wal = get_wal()
+    if not wal.enabled:
+        os.replace(src, dst)
+        return
+    _fsync_path(src)  # el contenido nuevo, en disco antes de que el log lo nombre
+    with wal.transaction():  # el commit va después del rename
+        wal.log_rename(src, dst)
+        os.replace(src, dst)
+        _fsync_dir(dst)
+
+
+def wal_remove(path: str) -> None:
+    """`os.remove` registrado como rename sin reemplazo: deshacerlo repone el archivo."""
+    wal = get_wal()
+    if not wal.enabled:
+        os.remove(path)
+        return
+    with wal.transaction():
+        wal.log_rename("", path)
+        os.remove(path)
+        _fsync_dir(path)
+
+
+# Log compartido por todas las tablas del proceso
+_wal = WriteAheadLog()
+atexit.register(_wal.close)
+
+
+def get_wal() -> WriteAheadLog:
+    return _wal
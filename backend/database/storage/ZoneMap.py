@@ -0,0 +1,239 @@
+import atexit
+import os
+import struct
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .ScanEngine import KIND_NUM, ScanEngine
+
+ZONE_BLOCK_SLOTS = 1024  # slots por bloque del zone map
+HEADER = struct.Struct("<iiii?")  # block_slots, n_cols, covered, n_blocks, clean
+
+
+class ZoneMap:
+    """Mínimo y máximo por bloque de slots para las columnas numéricas (<tabla>.zonemap).
+
+    • Un bloque son `block_slots` slots consecutivos del heap; por cada
+      columna numérica (int / float / bool, sin contar TEXT) se guarda el
+      rango [min, max] de sus registros vivos.
+    • Los inserts y updates sólo ensanchan el rango del bloque; un borrado
+      lo marca como desactualizado y se recalcula recién al consultarlo.
+    • El rango siempre contiene a los valores reales, así que un bloque
+      descartado nunca tiene coincidencias.
+    • En disco lleva una marca `clean`: si el proceso no llegó a guardar
+      el mapa tras modificarlo, al abrirlo se reconstruye desde el heap.
+    """
+
+    _open_maps: Dict[str, "ZoneMap"] = {}
+
+    def __init__(self, filename: str, columns: List[str], block_slots: int):
+        self.filename = filename
+        self.columns = columns
+        self.block_slots = block_slots
+        self._col = {name: j for j, name in enumerate(columns)}
+        self.covered = 0  # slots [0, covered) reflejados en los bloques
+        self.mins = np.empty((0, len(columns)))
+        self.maxs = np.empty((0, len(columns)))
+        self.stale = np.zeros(0, dtype=bool)
+        self._clean = True  # lo que hay en disco coincide con memoria
+
+    # ------------------------------------------------------------------
+    # Apertura (una instancia por archivo y proceso) --------------------
+    # ------------------------------------------------------------------
+    @classmethod
+    def open(cls, heap, block_slots: int = ZONE_BLOCK_SLOTS) -> Optional["ZoneMap"]:
+        """Zone map de `heap`, o None si no tiene columnas numéricas mapeables."""
+        filename = heap.table_path + ".zonemap"
+        zm = cls._open_maps.get(filename)
+        if zm is not None:
+            return zm
+        try:
+            _, kinds = ScanEngine.build_dtype(heap.schema, heap.slot_size, heap.dictionaries)
+        except ValueError:
+            return None
+        columns = [
+            name
+            for name, fmt in heap.schema
+            if kinds[name] == KIND_NUM and fmt.upper() != "TEXT"
+        ]
+        if not columns:
+            return None
+        zm = cls(filename, columns, block_slots)
+        zm._load()
+        cls._open_maps[filename] = zm
+        return zm
+
+    @classmethod
+    def discard(cls, filename: str, remove_file: bool = False) -> None:
+        cls._open_maps.pop(filename, None)
+        if remove_file and os.path.exists(filename):
+            os.remove(filename)
+
+    @classmethod
+    def reset(cls) -> None:
+        """Olvida los mapas abiertos SIN guardarlos (p. ej. en un proceso hijo tras fork)."""
+        cls._open_maps.clear()
+
+    @classmethod
+    def save_open(cls, filename: str) -> None:
+        """Guarda el mapa de `filename` si está abierto en este proceso."""
+        zm = cls._open_maps.get(filename)
+        if zm is not None:
+            zm.save()
+
+    @classmethod
+    def save_all(cls) -> None:
+        for zm in cls._open_maps.values():
+            zm.save()
+
+    def _load(self) -> None:
+        if not os.path.exists(self.filename):
+            return
+        with open(self.filename, "rb") as f:
+            raw = f.read()
+        if len(raw) < HEADER.size:
+            return
+        block_slots, n_cols, covered, n_blocks, clean = HEADER.unpack_from(raw)
+        matrix = n_blocks * n_cols * 8
+        if (
+            not clean
+            or block_slots != self.block_slots
+            or n_cols != len(self.columns)
+            or len(raw) != HEADER.size + 2 * matrix + n_blocks
+        ):
+            return  # guardado a medias o de otro esquema: se recalcula todo
+        body = HEADER.size
+        shape = (n_blocks, n_cols)
+        self.mins = np.frombuffer(raw, np.float64, n_blocks * n_cols, body).reshape(shape).copy()
+        self.maxs = np.frombuffer(raw, np.float64, n_blocks * n_cols, body + matrix).reshape(shape).copy()
+        self.stale = np.frombuffer(raw, np.bool_, n_blocks, body + 2 * matrix).copy()
+        self.covered = covered
+
+    def save(self) -> None:
+        """Escribe el mapa completo y lo marca como consistente."""
+        if self._clean:
+            return
+        with open(self.filename, "wb") as f:
+            f.write(
+                HEADER.pack(
+                    self.block_slots, len(self.columns), self.covered, len(self.stale), True
+                )
+            )
+            f.write(self.mins.tobytes())
+            f.write(self.maxs.tobytes())
+            f.write(self.stale.tobytes())
+        self._clean = True
+
+    def _touch(self) -> None:
+        """Antes del primer cambio en memoria marca el archivo como no consistente."""
+        if not self._clean:
+            return
+        self._clean = False
+        if os.path.exists(self.filename):
+            with open(self.filename, "r+b") as f:
+                f.write(HEADER.pack(self.block_slots, len(self.columns), 0, 0, False))
+
+    # ------------------------------------------------------------------
+    # Mantenimiento en escrituras --------------------------------------
+    # ------------------------------------------------------------------
+    def widen(self, pos: int, values: Dict[str, object]) -> None:
+        """Incluye en el bloque de `pos` los valores de un registro escrito ahí."""
+        if pos >= self.covered:
+            return  # el bloque se calcula entero en el próximo refresh
+        self._touch()
+        block = pos // self.block_slots
+        for name, value in values.items():
+            j = self._col.get(name)
+            if j is None or value != value:  # columna no mapeada o NaN
+                continue
+            value = float(value)
+            if value < self.mins[block, j]:
+                self.mins[block, j] = value
+            if value > self.maxs[block, j]:
+                self.maxs[block, j] = value
+
+    def invalidate(self, pos: int) -> None:
+        """El bloque de `pos` perdió un registro: su rango se recalcula al consultarlo."""
+        if pos >= self.covered:
+            return
+        self._touch()
+        self.stale[pos // self.block_slots] = True
+
+    # ------------------------------------------------------------------
+    # Cálculo desde el heap --------------------------------------------
+    # ------------------------------------------------------------------
+    def up_to_date(self, size: int) -> bool:
+        return size == self.covered and not self.stale.any()
+
+    def refresh(self, engine: ScanEngine) -> None:
+        """Recalcula los bloques desactualizados y los slots nuevos del heap."""
+        size = engine.size
+        n_blocks = -(-size // self.block_slots)
+        first_new = min(self.covered // self.block_slots, n_blocks)
+        if self.up_to_date(size):
+            return
+        self._touch()
+        keep = min(first_new, len(self.stale))
+        self.mins = np.resize(self.mins[:keep], (n_blocks, len(self.columns)))
+        self.maxs = np.resize(self.maxs[:keep], (n_blocks, len(self.columns)))
+        self.stale = np.resize(self.stale[:keep], n_blocks)
+        self.stale[keep:] = False  # los bloques nuevos se calculan abajo
+        for block in np.flatnonzero(self.stale):
+            self._compute(engine, block, block + 1)
+        if first_new < n_blocks:
+            self._compute(engine, first_new, n_blocks)
+        self.covered = size
+
+    def _compute(self, engine: ScanEngine, first: int, last: int) -> None:
+        lo = first * self.block_slots
+        hi = min(last * self.block_slots, engine.size)
+        view = engine.window(lo, hi)
+        live = view.live_mask()
+        pad = (last - first) * self.block_slots - (hi - lo)
+        shape = (last - first, self.block_slots)
+        for j, name in enumerate(self.columns):
+            vals = view.numeric(name).astype(np.float64)
+            ok = live & ~np.isnan(vals)
+            low = np.pad(np.where(ok, vals, np.inf), (0, pad), constant_values=np.inf)
+            high = np.pad(np.where(ok, vals, -np.inf), (0, pad), constant_values=-np.inf)
+            self.mins[first:last, j] = low.reshape(shape).min(axis=1)
+            self.maxs[first:last, j] = high.reshape(shape).max(axis=1)
+        self.stale[first:last] = False
+
+    # ------------------------------------------------------------------
+    # Poda -------------------------------------------------------------
+    # ------------------------------------------------------------------
+    @property
+    def n_blocks(self) -> int:
+        return len(self.stale)
+
+    def has_column(self, name: str) -> bool:
+        return name in self._col
+
+    def overlaps(
+        self, name: str, lo=None, hi=None, lo_open: bool = False, hi_open: bool = False
+    ) -> np.ndarray:
+        """Bloques cuyo rango de `name` puede tener valores en el intervalo pedido."""
+        j = self._col[name]
+        mask = np.ones(self.n_blocks, dtype=bool)
+        if lo is not None:
+            mask &= self.maxs[:, j] > lo if lo_open else self.maxs[:, j] >= lo
+        if hi is not None:
+            mask &= self.mins[:, j] < hi if hi_open else self.mins[:, j] <= hi
+        return mask
+
+    def ranges(self, keep: np.ndarray) -> List[Tuple[int, int]]:
+        """Convierte la máscara de bloques en rangos de slots [lo, hi) contiguos."""
+        out = []
+        for block in np.flatnonzero(keep):
+            lo = int(block) * self.block_slots
+            hi = min(lo + self.block_slots, self.covered)
+            if out and out[-1][1] == lo:
+                out[-1] = (out[-1][0], hi)
+            else:
+                out.append((lo, hi))
+        return out
+
+
+atexit.register(ZoneMap.save_all)
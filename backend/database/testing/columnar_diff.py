@@ -0,0 +1,90 @@
+import os
+import random
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import database
+from database import *
+from scanner import Scanner
+from visitor import RunVisitor
+from yarasca import Parser
+
+# Misma carga en una tabla heap y en una USING COLUMNAR; toda consulta
+# tiene que devolver lo mismo en las dos.
+
+N_EXTRA = 20  # columnas INT de relleno: la tabla ancha es el caso columnar
+SCHEMA = [("id", "i"), ("nombre", "12s"), ("puntaje", "f"), ("activo", "?")] + [
+    (f"c{i}", "i") for i in range(N_EXTRA)
+]
+CONSULTAS = [
+    "SELECT id, c5 FROM {t} WHERE c3 = 42",
+    "SELECT * FROM {t} WHERE nombre = 'n5'",
+    "SELECT id FROM {t} WHERE puntaje > 500 AND activo = TRUE",
+    "SELECT id, nombre FROM {t} WHERE id = 78",
+    "SELECT id FROM {t} WHERE c10 BETWEEN 3 AND 5",
+    "SELECT id, c1 FROM {t} WHERE c1 = 7 OR nombre = 'n3'",
+    "SELECT id, puntaje FROM {t} WHERE NOT c2 < 90",
+]
+
+
+def _registros(n: int) -> list:
+    rnd = random.Random(1)
+    return [
+        Record(SCHEMA, [i, f"n{i % 37}", i / 4, i % 3 == 0] + [rnd.randint(0, 99) for _ in range(N_EXTRA)])
+        for i in range(n)
+    ]
+
+
+def _cargar(table_name: str, storage: str, n: int):
+    if os.path.exists(database._table_path(table_name) + ".dat"):
+        drop_table(table_name)
+    create_table(table_name, SCHEMA, primary_key="id", storage=storage)
+    registros = _registros(n)
+    corte = 2 * n // 3
+    insert_many(table_name, registros[:corte])
+    for rec in registros[corte:corte + 100]:
+        insert_record(table_name, rec)
+    for pk in range(0, corte + 100, 7):
+        delete_record(table_name, pk)
+    insert_many(table_name, registros[corte + 100:])  # reusa los huecos
+    create_btree_idx(table_name, "c3")
+    create_hash_idx(table_name, "nombre")
+
+
+def _resultados(visitor: RunVisitor, table_name: str) -> list:
+    salida = []
+    for sql in CONSULTAS:
+        res = visitor.visit_program(Parser(Scanner(sql.format(t=table_name))).parse_program())
+        salida.append(sorted(map(tuple, res.data)) if res.success else ("ERROR", res.message))
+    heap = HeapFile(database._table_path(table_name))
+    salida.append(sorted(heap.extract_index("c7")))
+    salida.append([r.values for r in heap.fetch_many([5, 3, 900], ["id", "c2"])])
+    salida.append(heap.live_count)
+    return salida
+
+
+def _test_columnar_diff(n: int):
+    tablas = {"heap": "diff_heap", "columnar": "diff_columnar"}
+    visitor = RunVisitor()
+    resultados = {}
+    for storage, table_name in tablas.items():
+        print(f"== CARGANDO {table_name} ({storage}) ==")
+        _cargar(table_name, storage, n)
+        antes = _resultados(visitor, table_name)
+        vacuum_table(table_name)
+        resultados[storage] = antes + _resultados(visitor, table_name)
+
+    diferencias = 0
+    for i, (esperado, obtenido) in enumerate(zip(resultados["heap"], resultados["columnar"])):
+        if esperado != obtenido:
+            diferencias += 1
+            print(f"   consulta {i}: heap {str(esperado)[:120]} | columnar {str(obtenido)[:120]}")
+    print("== COLUMNAR = HEAP ==" if not diferencias else f"== {diferencias} DIFERENCIAS ==")
+
+    for table_name in tablas.values():
+        drop_table(table_name)
+
+
+if __name__ == "__main__":
+    startup()
+    _test_columnar_diff(3000)
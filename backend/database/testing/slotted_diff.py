@@ -0,0 +1,111 @@
+import os
+import random
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import database
+from database import *
+from scanner import Scanner
+from visitor import RunVisitor
+from yarasca import Parser
+
+# Misma carga (con UPDATEs que agrandan y achican filas) en una tabla heap,
+# una USING SLOTTED y una USING SLOTTED con diccionario; toda consulta
+# tiene que devolver lo mismo en las tres.
+
+SCHEMA = [("id", "i"), ("genero", "20s"), ("descr", "512s"), ("anio", "i"), ("puntaje", "f"), ("bio", "text")]
+CONSULTAS = [
+    "SELECT id FROM {t} WHERE genero = 'jazz'",
+    "SELECT id, descr FROM {t} WHERE anio > 2010 AND genero != 'rock'",
+    "SELECT * FROM {t} WHERE id = 77",
+    "SELECT id, bio FROM {t} WHERE anio = 1999",
+    "SELECT id FROM {t} WHERE descr = 'y'",
+    "SELECT id, descr FROM {t} WHERE id BETWEEN 300 AND 320",
+    "SELECT id FROM {t} WHERE puntaje BETWEEN 10 AND 20",
+]
+
+
+def _registros(n: int) -> list:
+    rnd = random.Random(5)
+    return [
+        Record(SCHEMA, [
+            i,
+            rnd.choice(["rock", "pop", "jazz", "ñandú"]),
+            "d" * rnd.randint(0, 60) + str(i),
+            1950 + i % 70,
+            i / 3,
+            f"bio {i} " * (i % 4),
+        ])
+        for i in range(n)
+    ]
+
+
+def _cargar(table_name: str, storage: str, encodings, n: int):
+    if os.path.exists(database._table_path(table_name) + ".dat"):
+        drop_table(table_name)
+    create_table(table_name, SCHEMA, primary_key="id", storage=storage, encodings=encodings)
+    registros = _registros(n)
+    corte = 3 * n // 4
+    insert_many(table_name, registros[:corte])
+    for rec in registros[corte:corte + 100]:
+        insert_record(table_name, rec)
+    for pk in range(0, corte + 100, 4):
+        delete_record(table_name, pk)
+    insert_many(table_name, registros[corte + 100:])  # reusa los huecos
+    create_hash_idx(table_name, "genero")
+    create_btree_idx(table_name, "anio")
+    create_seq_idx(table_name, "puntaje")
+
+    # UPDATEs: filas que crecen (en slotted se mueven de página) y que se achican
+    heap = HeapFile(database._table_path(table_name))
+    for i, descr in [(i, "X" * (500 if i % 2 else 3)) for i in range(1, 400, 3)] + [(i, "y") for i in range(1, 400, 6)]:
+        encontrados = heap.search_by_field("id", i)
+        if encontrados:
+            valores = list(encontrados[0].values)
+            valores[2] = descr
+            heap.update_record(Record(SCHEMA, valores))
+
+
+def _resultados(visitor: RunVisitor, table_name: str) -> list:
+    salida = []
+    for sql in CONSULTAS:
+        res = visitor.visit_program(Parser(Scanner(sql.format(t=table_name))).parse_program())
+        salida.append(sorted(map(tuple, res.data)) if res.success else ("ERROR", res.message))
+    heap = HeapFile(database._table_path(table_name))
+    salida.append(sorted(r.values[0] for r in search_btree_idx(table_name, "anio", 1977)))
+    salida.append(sorted(r.values[0] for r in search_seq_idx_range(table_name, "puntaje", 10.0, 20.0)))
+    salida.append(sorted(len(r.values[0]) for r in heap.scan(["descr"]))[-5:])
+    salida.append(heap.live_count)
+    return salida
+
+
+def _test_slotted_diff(n: int):
+    tablas = {
+        "diff_heap": ("heap", None),
+        "diff_slotted": ("slotted", None),
+        "diff_slotted_dict": ("slotted", {"genero": "dict"}),
+    }
+    visitor = RunVisitor()
+    resultados = {}
+    for table_name, (storage, encodings) in tablas.items():
+        print(f"== CARGANDO {table_name} ({storage}) ==")
+        _cargar(table_name, storage, encodings, n)
+        antes = _resultados(visitor, table_name)
+        vacuum_table(table_name)
+        resultados[table_name] = antes + _resultados(visitor, table_name)
+
+    diferencias = 0
+    for table_name in ("diff_slotted", "diff_slotted_dict"):
+        for i, (esperado, obtenido) in enumerate(zip(resultados["diff_heap"], resultados[table_name])):
+            if esperado != obtenido:
+                diferencias += 1
+                print(f"   {table_name} consulta {i}: heap {str(esperado)[:100]} | {str(obtenido)[:100]}")
+    print("== SLOTTED = HEAP ==" if not diferencias else f"== {diferencias} DIFERENCIAS ==")
+
+    for table_name in tablas:
+        drop_table(table_name)
+
+
+if __name__ == "__main__":
+    startup()
+    _test_slotted_diff(4000)
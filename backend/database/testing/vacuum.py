@@ -0,0 +1,97 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import database
+from database import *
+
+TABLE_NAME = "vacuum_test"
+SCHEMA = [("id", "i"), ("nombre", "10s"), ("edad", "i"), ("bio", "text"), ("audio", "SOUND")]
+N_CLUSTERS = 4
+
+
+def _histograma(i: int) -> list:
+    return [i, i % 7, i % 11, 1]
+
+
+def _foto(heap: HeapFile) -> dict:
+    """id -> (RID según el PKLocator, valores en ese RID, histograma de esa fila)."""
+    cuentas, cargadas = HistogramMatrix(heap.table_path, "audio").load()
+    ids = sorted(r.values[0] for r in heap.scan(["id"]))
+    rids = [heap.pk_locator.get(i) for i in ids]
+    filas = {}
+    for i, rid, rec in zip(ids, rids, heap.fetch_many(rids)):
+        histograma = cuentas[rid].tolist() if cargadas[rid] else None
+        filas[i] = (rid, rec.values[0], tuple(rec.values[1:4]), rec.values[4], histograma)
+    return filas
+
+
+def _ids_por_indice() -> tuple:
+    seq = sorted(r.values[0] for r in search_seq_idx_range(TABLE_NAME, "edad", 0, 100))
+    btree = [search_btree_idx(TABLE_NAME, "id", i)[0].values[0] for i in seq]
+    return seq, btree
+
+
+def _test_vacuum(n: int):
+    table_path = database._table_path(TABLE_NAME)
+    if os.path.exists(table_path + ".dat"):
+        drop_table(TABLE_NAME)
+
+    print(f"== CREANDO {TABLE_NAME} CON {n} REGISTROS ==")
+    create_table(TABLE_NAME, SCHEMA, primary_key="id")
+    create_seq_idx(TABLE_NAME, "edad")
+    create_btree_idx(TABLE_NAME, "id")
+    rids = insert_many(
+        TABLE_NAME,
+        [Record(SCHEMA, [i, f"n{i}", i % 40, f"bio {i}", f"/sonidos/{i}.wav"]) for i in range(n)],
+    )
+    HistogramMatrix.build_file(table_path, "audio", N_CLUSTERS)
+    HeapFile(table_path).store_histograms("audio", rids, np.array([_histograma(i) for i in range(n)]))
+
+    print("== BORRANDO UNO DE CADA TRES ==")
+    for i in range(0, n, 3):
+        delete_record(TABLE_NAME, i)
+
+    antes = _foto(HeapFile(table_path))
+    tamanos = {ext: os.path.getsize(f"backend/database/tables/{TABLE_NAME}.{ext}") for ext in ("bio.text", "audio.dat")}
+
+    print("== VACUUM ==")
+    stats = vacuum_table(TABLE_NAME, return_map=True)
+    offset_map = stats["offset_map"]
+
+    heap = HeapFile(table_path)
+    despues = _foto(heap)
+    vivos = sorted(antes)
+    errores = []
+    if sorted(despues) != vivos:
+        errores.append("los registros vivos cambiaron")
+    for i in vivos:
+        rid_viejo, rid_nuevo = antes[i][0], despues.get(i, (None,))[0]
+        if offset_map.get(rid_viejo) != rid_nuevo:
+            errores.append(f"id {i}: RID {rid_viejo} -> {rid_nuevo}, el mapa dice {offset_map.get(rid_viejo)}")
+        elif despues[i][1:] != antes[i][1:] or antes[i][1] != i:
+            errores.append(f"id {i}: {despues[i][1:]} != {antes[i][1:]}")
+    if heap.heap_size != len(vivos) or heap.free_head != -1:
+        errores.append(f"heap sin compactar: {heap.heap_size} slots, free_head {heap.free_head}")
+    if HistogramMatrix(table_path, "audio").rows != len(vivos):
+        errores.append("la matriz de histogramas no se compactó")
+    if _ids_por_indice() != (vivos, vivos):
+        errores.append("los índices secuencial / B+ Tree no apuntan a los RIDs nuevos")
+    for ext, tamano in tamanos.items():
+        nuevo = os.path.getsize(f"backend/database/tables/{TABLE_NAME}.{ext}")
+        print(f"{ext}: {tamano} -> {nuevo} bytes")
+        if nuevo >= tamano:
+            errores.append(f"{ext} no se compactó")
+
+    for error in errores[:10]:
+        print("  ", error)
+    print("== VACUUM OK ==" if not errores else f"== {len(errores)} ERRORES ==")
+
+    drop_table(TABLE_NAME)
+
+
+if __name__ == "__main__":
+    startup()
+    _test_vacuum(300)
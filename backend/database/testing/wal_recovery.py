@@ -0,0 +1,163 @@
+import os
+import subprocess
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import database
+from database import *
+
+# Cada paso corre en un proceso aparte que muere con os._exit (sin flush,
+# sin checkpoint, sin atexit), como una caída real; el proceso siguiente
+# recupera el WAL con startup() y revisa que la tabla quede como tras el
+# último commit.
+
+TABLE_NAME = "wal_recovery_test"
+SCHEMA = [("id", "i"), ("nombre", "10s"), ("bio", "text"), ("edad", "i")]
+
+
+def _registro(i: int) -> Record:
+    return Record(SCHEMA, [i, f"n{i}", f"bio{i}", i % 50])
+
+
+def _esperado(n: int) -> dict:
+    ids = [i for i in range(n) if i % 7]
+    return {
+        "ids": ids,
+        "btree_13": [13],
+        "hash_n13": [13],
+        "seq_n13": [13],
+        "bio": f"bio{ids[-1]}",
+    }
+
+
+def _estado(n: int) -> dict:
+    heap = HeapFile(database._table_path(TABLE_NAME))
+    ids = sorted(r.values[0] for r in heap.scan(["id"]))
+    return {
+        "ids": ids,
+        "btree_13": [r.values[0] for r in search_btree_idx(TABLE_NAME, "id", 13)],
+        "hash_n13": [r.values[0] for r in search_hash_idx(TABLE_NAME, "nombre", "n13")],
+        "seq_n13": [r.values[0] for r in search_seq_idx(TABLE_NAME, "nombre", "n13")],
+        "bio": search_by_field(TABLE_NAME, "id", ids[-1])[0].values[2] if ids else None,
+    }
+
+
+def _comparar(etapa: str, n: int) -> bool:
+    estado, esperado = _estado(n), _esperado(n)
+    ok = estado == esperado
+    print(f"== {etapa}: {'OK' if ok else 'DISTINTO'} ==")
+    if not ok:
+        for clave in esperado:
+            if estado[clave] != esperado[clave]:
+                print(f"   {clave}: {estado[clave]} (esperado {esperado[clave]})")
+    return ok
+
+
+# ----------------------------------------------------------------------
+# Pasos (cada uno en su propio proceso) ---------------------------------
+# ----------------------------------------------------------------------
+def _paso_cargar(n: int):
+    """Crea e indexa la tabla y muere sin checkpoint: todo lo commiteado vive sólo en el WAL."""
+    if os.path.exists(database._table_path(TABLE_NAME) + ".dat"):
+        drop_table(TABLE_NAME)
+    create_table(TABLE_NAME, SCHEMA, primary_key="id")
+    create_btree_idx(TABLE_NAME, "id")
+    create_hash_idx(TABLE_NAME, "nombre")
+    create_seq_idx(TABLE_NAME, "nombre")
+    for i in range(n):
+        insert_record(TABLE_NAME, _registro(i))
+    for i in range(0, n, 7):
+        delete_record(TABLE_NAME, i)
+    os._exit(0)
+
+
+def _paso_insert_caido(n: int):
+    """Muere con el registro ya en el heap pero antes de los índices secundarios."""
+    database._update_secondary_indexes = lambda *args: os._exit(0)
+    insert_record(TABLE_NAME, _registro(n + 1000))
+
+
+def _paso_rollback(n: int):
+    """Un error a mitad de INSERT / DELETE deshace la sentencia en el mismo proceso."""
+    def falla(*args):
+        raise RuntimeError("falla simulada")
+
+    originales = database._update_secondary_indexes, database._remove_from_secondary_indexes
+    database._update_secondary_indexes = database._remove_from_secondary_indexes = falla
+    for accion in (lambda: insert_record(TABLE_NAME, _registro(n + 1000)),
+                   lambda: delete_record(TABLE_NAME, 13)):
+        try:
+            accion()
+            print("== SIN ERROR (se esperaba RuntimeError) ==")
+        except RuntimeError:
+            pass
+    ok = _comparar("TRAS ROLLBACK", n)
+    database._update_secondary_indexes, database._remove_from_secondary_indexes = originales
+    os._exit(0 if ok else 1)
+
+
+def _paso_vacuum(n: int, caida: bool):
+    """VACUUM que falla (o muere) tras reescribir el heap y el índice secuencial con renames."""
+    original = database.SequentialIndex.rebuild_file
+
+    def rebuild_file(self, *args, **kwargs):
+        original(self, *args, **kwargs)
+        if caida:
+            os._exit(0)
+        raise RuntimeError("falla simulada")
+
+    database.SequentialIndex.rebuild_file = rebuild_file
+    try:
+        vacuum_table(TABLE_NAME)
+        print("== SIN ERROR (se esperaba RuntimeError) ==")
+    except RuntimeError:
+        pass
+    ok = _comparar("TRAS ROLLBACK DEL VACUUM", n)
+    os._exit(0 if ok else 1)
+
+
+def _paso_verificar(n: int):
+    os._exit(0 if _comparar("TRAS RECUPERAR", n) else 1)
+
+
+PASOS = {
+    "cargar": _paso_cargar,
+    "insert_caido": _paso_insert_caido,
+    "rollback": _paso_rollback,
+    "vacuum_falla": lambda n: _paso_vacuum(n, caida=False),
+    "vacuum_caido": lambda n: _paso_vacuum(n, caida=True),
+    "verificar": _paso_verificar,
+}
+
+
+def _correr(paso: str, n: int) -> bool:
+    salida = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), paso, str(n)],
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    for linea in salida.stdout.splitlines():
+        if linea.startswith(("==", "   ")):
+            print(linea)
+    return salida.returncode == 0
+
+
+def _test_wal_recovery(n: int):
+    ok = True
+    for paso in ("cargar", "verificar", "insert_caido", "verificar", "rollback",
+                 "verificar", "vacuum_falla", "verificar", "vacuum_caido", "verificar"):
+        if paso != "verificar":
+            print(f"== PASO {paso.upper()} ==")
+        ok = _correr(paso, n) and ok
+    print("== TODO OK ==" if ok else "== HUBO DIFERENCIAS ==")
+
+    startup()
+    drop_table(TABLE_NAME)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 2:
+        startup()
+        PASOS[sys.argv[1]](int(sys.argv[2]))
+    else:
+        _test_wal_recovery(300)
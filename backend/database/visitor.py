@@ -1,40 +1,30 @@
 from contextlib import contextmanager
+import operator
+from itertools import islice
+
+import numpy as np
+
 from column_types import ColumnType, QueryResult, IndexType, OperationType
 
 from storage.HeapFile import HeapFile
 from storage.Record import Record
+from storage.ScanEngine import open_scan, KIND_DICT, KIND_NUM, KIND_STR
+from storage.ParallelScan import get_parallel_scan
 
 import os
 
 from fancytypes.schema import SchemaType
 
-from database import (
-    create_table,
-    create_seq_idx,
-    create_btree_idx,
-    create_rtree_idx,
-    create_hash_idx,
-    check_table_exists,
-    drop_table,
-    get_table_schema,
-    check_seq_idx,
-    check_btree_idx,
-    check_hash_idx,
-    check_rtree_idx,
-    drop_seq_idx,
-    drop_btree_idx,
-    drop_hash_idx,
-    drop_rtree_idx,
-    insert_record,
-    _table_path,
-)
+from database import Database
 
 from statement import (
+    Visitable,
     CreateTableStatement,
     CreateIndexStatement,
     InsertStatement,
     DropIndexStatement,
     DropTableStatement,
+    VacuumStatement,
     IntExpression,
     FloatExpression,
     StringExpression,
@@ -106,7 +96,9 @@ class Visitor:
 class RunVisitor:
     """Base visitor class for executing statements"""
 
-    def __init__(self):
+    def __init__(self, db: Database = None):
+        # one session for every statement, so heaps and indexes stay open
+        self.db = db if db is not None else Database()
         self.current_record: Record = None
 
     def generic_visit(self, node):
@@ -158,31 +150,42 @@ class RunVisitor:
         return lastResult
 
     def visit_createtablestatement(self, st: CreateTableStatement):
-        if check_table_exists(st.table_name):
+        if self.db.table_exists(st.table_name):
             raise ValueError(f"Table '{st.table_name}' already exists.")
         pk: str = None
         schema: SchemaType = []
+        encodings = {}
         for col in st.columns:
             fmt: str = column_type_to_fmt(col.column_type, col.varchar_length)
             if col.is_pk:
                 if pk is not None:
                     raise ValueError("Multiple primary keys are not allowed.")
                 pk = col.column_name
+            if col.encoding is not None:
+                encodings[col.column_name] = col.encoding
             schema.append((col.column_name, fmt))
 
-        create_table(st.table_name, schema, pk)
+        self.db.create_table(st.table_name, schema, pk, st.storage, encodings)
         return QueryResult(True, f"Table '{st.table_name}' created successfully.")
 
     def visit_droptablestatement(self, st: DropTableStatement):
-        if not check_table_exists(st.table_name):
+        if not self.db.table_exists(st.table_name):
             raise ValueError(f"Table '{st.table_name}' does not exist.")
-        drop_table(st.table_name)
+        self.db.drop_table(st.table_name)
         return QueryResult(True, f"Table '{st.table_name}' dropped successfully.")
 
+    def visit_vacuumstatement(self, st: VacuumStatement):
+        if not self.db.table_exists(st.table_name):
+            raise ValueError(f"Table '{st.table_name}' does not exist.")
+        stats = self.db.vacuum_table(st.table_name)
+        reclaimed = stats["heap_bytes_reclaimed"] + stats["side_bytes_reclaimed"]
+        return QueryResult(
+            True,
+            f"Table '{st.table_name}' vacuumed: {stats['slots_after']} live records, {reclaimed} bytes reclaimed.",
+        )
+
     def visit_createindexstatement(self, st: CreateIndexStatement):
-        schema: SchemaType = get_table_schema(
-            st.table_name
-        )  # also checks if table exists
+        schema: SchemaType = self.db.schema(st.table_name)  # also checks if table exists
         fmt: str = None
 
         for name, format in schema:  # WHY IS SCHEMA A LIST
@@ -206,19 +209,19 @@ class RunVisitor:
                 raise ValueError(
                     f"B+ Tree index can only be created on INT, FLOAT or VARCHAR columns, not {actual_type}."
                 )
-            create_btree_idx(st.table_name, st.column_name)
+            self.db.create_index(st.table_name, st.column_name, "btree")
         elif st.index_type == IndexType.EXTENDIBLEHASH:
             if actual_type not in (ColumnType.INT, ColumnType.VARCHAR):
                 raise ValueError(
                     f"Extendible Hash index can only be created on INT or VARCHAR columns, not {actual_type}."
                 )
-            create_hash_idx(st.table_name, st.column_name)
+            self.db.create_index(st.table_name, st.column_name, "hash")
         elif st.index_type == IndexType.RTREE:
             if actual_type not in (ColumnType.POINT2D, ColumnType.POINT3D):
                 raise ValueError(
                     f"R-Tree index can only be created on POINT2D or POINT3D columns, not {actual_type}."
                 )
-            create_rtree_idx(st.table_name, st.column_name)
+            self.db.create_index(st.table_name, st.column_name, "rtree")
         elif st.index_type == IndexType.SEQUENTIAL:
             if actual_type not in (
                 ColumnType.INT,
@@ -228,7 +231,7 @@ class RunVisitor:
                 raise ValueError(
                     f"Sequential index can only be created on INT, FLOAT or VARCHAR columns, not {actual_type}."
                 )
-            create_seq_idx(st.table_name, st.column_name)
+            self.db.create_index(st.table_name, st.column_name, "seq")
         else:
             raise ValueError(f"Unsupported index type: {st.index_type}")
 
@@ -239,29 +242,29 @@ class RunVisitor:
 
     def visit_dropindexstatement(self, st: DropIndexStatement):
         if st.index_type == IndexType.BPLUSTREE:
-            if not check_btree_idx(st.table_name, st.column_name):
+            if not self.db.has_index(st.table_name, st.column_name, "btree"):
                 raise ValueError(
                     f"B+ Tree index on column '{st.column_name}' in table '{st.table_name}' does not exist."
                 )
-            drop_btree_idx(st.table_name, st.column_name)
+            self.db.drop_index(st.table_name, st.column_name, "btree")
         elif st.index_type == IndexType.EXTENDIBLEHASH:
-            if not check_hash_idx(st.table_name, st.column_name):
+            if not self.db.has_index(st.table_name, st.column_name, "hash"):
                 raise ValueError(
                     f"Extendible Hash index on column '{st.column_name}' in table '{st.table_name}' does not exist."
                 )
-            drop_hash_idx(st.table_name, st.column_name)
+            self.db.drop_index(st.table_name, st.column_name, "hash")
         elif st.index_type == IndexType.RTREE:
-            if not check_rtree_idx(st.table_name, st.column_name):
+            if not self.db.has_index(st.table_name, st.column_name, "rtree"):
                 raise ValueError(
                     f"R-Tree index on column '{st.column_name}' in table '{st.table_name}' does not exist."
                 )
-            drop_rtree_idx(st.table_name, st.column_name)
+            self.db.drop_index(st.table_name, st.column_name, "rtree")
         elif st.index_type == IndexType.SEQUENTIAL:
-            if not check_seq_idx(st.table_name, st.column_name):
+            if not self.db.has_index(st.table_name, st.column_name, "seq"):
                 raise ValueError(
                     f"Sequential index on column '{st.column_name}' in table '{st.table_name}' does not exist."
                 )
-            drop_seq_idx(st.table_name, st.column_name)
+            self.db.drop_index(st.table_name, st.column_name, "seq")
         else:
             raise ValueError(f"Unsupported index type: {st.index_type}")
 
@@ -271,7 +274,7 @@ class RunVisitor:
         )
 
     def visit_insertstatement(self, st: InsertStatement):
-        if not check_table_exists(st.table_name):
+        if not self.db.table_exists(st.table_name):
             raise ValueError(f"Table '{st.table_name}' does not exist.")
 
         if len(st.column_names) != len(st.values):
@@ -283,7 +286,7 @@ class RunVisitor:
         # we must also follow the order of the column names
         # :(
 
-        schema: SchemaType = get_table_schema(st.table_name)
+        schema: SchemaType = self.db.schema(st.table_name)
         schema_dict = {name: fmt for name, fmt in schema}
 
         for col_name, const_exp in zip(st.column_names, st.values):
@@ -351,26 +354,28 @@ class RunVisitor:
                     f"Column '{name}' is missing in the insert statement. NULL is not supported yet."
                 )
         record = Record(schema, record_values)
-        insert_record(st.table_name, record)
+        self.db.insert_record(st.table_name, record)
         return QueryResult(
             True,
             f"Record inserted into table '{st.table_name}' successfully.",
         )
 
     def visit_selectstatement(self, st: SelectStatement):
-        if not check_table_exists(st.from_table):
+        if not self.db.table_exists(st.from_table):
             raise ValueError(f"Table '{st.from_table}' does not exist.")
-        heapfile = HeapFile(_table_path(st.from_table))
-        records = heapfile.get_all_records()
+        if st.limit is not None and st.limit < 0:
+            raise ValueError("Limit cannot be negative.")
+        heapfile = self.db.heap(st.from_table)
+        columns = self._needed_columns(st, heapfile)
         table_name = os.path.basename(heapfile.table_name)
         result = []
         n, c = None, None
 
-        for rec in records:
+        # rows are pulled from a cursor, so LIMIT stops the scan early
+        for rec in self._filtered_records(heapfile, st.where_statement, columns, st.limit):
+            if st.limit is not None and len(result) >= st.limit:
+                break
             self.current_record = rec
-            if st.where_statement is not None:
-                if not st.where_statement.accept(self):
-                    continue
             entry = []
             if st.select_all:
                 entry = rec.values
@@ -399,16 +404,101 @@ class RunVisitor:
                             "Record does not have a schema or values attribute???"
                         )
             result.append(entry)
-        if st.limit is not None:
-            if st.limit < 0:
-                raise ValueError("Limit cannot be negative.")
-            result = result[: st.limit]
         return QueryResult(
             True,
             f"Selected {len(result)} records from table '{st.from_table}'.",
             result,
         )  # result is an array of records
 
+    @staticmethod
+    def _column_expressions(node, out: list) -> list:
+        """Collects every ColumnExpression below a condition node."""
+        if isinstance(node, ColumnExpression):
+            out.append(node)
+        elif isinstance(node, Visitable):
+            for child in vars(node).values():
+                RunVisitor._column_expressions(child, out)
+        return out
+
+    def _needed_columns(self, st: SelectStatement, heapfile: HeapFile):
+        """Columns the SELECT actually reads (projection + WHERE), or None for all."""
+        if st.select_all:
+            return None
+        names = {name for name, _ in heapfile.schema}
+        needed = {col.split(".")[-1] for col in st.select_columns}
+        for expr in self._column_expressions(st.where_statement, []):
+            if expr.table_name:
+                return None  # the qualified-name check needs the full record
+            needed.add(expr.column_name)
+        # unknown names are left out so the usual "does not exist" errors fire
+        return [name for name, _ in heapfile.schema if name in needed & names]
+
+    def _filtered_records(
+        self, heapfile: HeapFile, where: WhereStatement, columns, limit=None
+    ):
+        """Streams the records that satisfy WHERE (in parallel / vectorized when possible)."""
+        ranges = self._zone_ranges(heapfile, where)
+        if where is not None:
+            cursor = get_parallel_scan().scan(
+                heapfile, WherePredicate(where), columns, ranges, limit
+            )
+            if cursor is not None:
+                yield from cursor
+                return
+        yield from self._range_records(heapfile, where, columns, ranges)
+
+    def _range_records(self, heapfile: HeapFile, where: WhereStatement, columns, ranges):
+        """Serial WHERE filter over the slot ranges (None = whole heap)."""
+        cursor = self._vectorized_where(heapfile, where, columns, ranges)
+        if cursor is not None:
+            yield from cursor
+            return
+        for rec in heapfile.scan(columns, ranges):
+            self.current_record = rec
+            if where is None or where.accept(self):
+                yield rec
+
+    @staticmethod
+    def _zone_ranges(heapfile: HeapFile, where: WhereStatement):
+        """Slot ranges whose zone-map blocks may satisfy WHERE, or None to scan all."""
+        if where is None:
+            return None
+        zones = heapfile.zones()
+        if zones is None:
+            return None
+        keep = WhereZoneVisitor.as_mask(where.accept(WhereZoneVisitor(zones)), zones.n_blocks)
+        if keep.all():
+            return None
+        return zones.ranges(keep)
+
+    def _vectorized_where(
+        self, heapfile: HeapFile, where: WhereStatement, columns=None, ranges=None
+    ):
+        """Cursor that evaluates WHERE as a mask, one window of slots at a time.
+
+        Returns None when the condition can't be vectorized and must be run
+        row by row.
+        """
+        if where is None:
+            return None
+        engine = open_scan(heapfile)
+        if engine is None:
+            return None
+        try:
+            # an empty window is enough to find out if the condition is supported
+            where.accept(WhereMaskVisitor(engine.window(0, 0)))
+        except NotVectorizable:
+            engine.close()
+            return None
+        return self._masked_records(engine, where, columns, ranges)
+
+    @staticmethod
+    def _masked_records(engine, where: WhereStatement, columns, ranges=None):
+        with engine:
+            for window in engine.windows(ranges=ranges):
+                mask = WhereMaskVisitor.as_mask(where.accept(WhereMaskVisitor(window)), window.size)
+                yield from window.iter_records(window.positions(window.live_mask() & mask), columns)
+
     # region RunVisitor Conditions
     def visit_orcondition(self, condition: OrCondition):
         if condition.or_condition is not None:
@@ -483,6 +573,289 @@ class RunVisitor:
 # endregion
 
 
+# region WhereMaskVisitor
+class NotVectorizable(Exception):
+    """The condition uses something the mask visitor can't evaluate column-wise."""
+
+
+_COMPARATORS = {
+    OperationType.EQUAL: operator.eq,
+    OperationType.NOT_EQUAL: operator.ne,
+    OperationType.LESS_THAN: operator.lt,
+    OperationType.LESS__EQUAL: operator.le,
+    OperationType.GREATER_THAN: operator.gt,
+    OperationType.GREATER__EQUAL: operator.ge,
+}
+
+
+class _Column:
+    """A whole column as a NumPy array plus how its values compare."""
+
+    def __init__(self, kind: str, values: np.ndarray, dictionary=None):
+        self.kind = kind
+        self.values = values
+        self.dictionary = dictionary  # ColumnDictionary when `values` are codes
+
+
+class WhereMaskVisitor:
+    """Evaluates a WHERE condition to a boolean mask over a ScanEngine.
+
+    Only fixed-width scalar columns (numbers, bools, VARCHAR) compared against
+    constants or other columns of the same kind are supported; anything else
+    raises NotVectorizable so the caller falls back to row-by-row evaluation.
+    Dictionary-encoded VARCHARs are compared against a string constant on
+    their codes, without decoding any row.
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+
+    @staticmethod
+    def as_mask(value, size: int) -> np.ndarray:
+        if isinstance(value, np.ndarray):
+            return value
+        return np.full(size, bool(value))
+
+    def generic_visit(self, node):
+        raise NotVectorizable(node.__class__.__name__)
+
+    def visit_intexpression(self, expr: IntExpression):
+        return expr.value
+
+    def visit_floatexpression(self, expr: FloatExpression):
+        return expr.value
+
+    def visit_stringexpression(self, expr: StringExpression):
+        return expr.value
+
+    def visit_boolexpression(self, expr: BoolExpression):
+        return expr.value
+
+    def visit_columnexpression(self, expr: ColumnExpression):
+        if expr.table_name or expr.column_name not in self.engine.kinds:
+            raise NotVectorizable(expr.column_name)  # row path reports the error
+        kind = self.engine.kinds[expr.column_name]
+        if kind == KIND_STR:
+            return _Column(kind, self.engine.column(expr.column_name))
+        if kind == KIND_NUM:
+            return _Column(kind, self.engine.numeric(expr.column_name))
+        if kind == KIND_DICT:
+            dictionary = self.engine.heap.dictionaries[expr.column_name]
+            return _Column(kind, self.engine.column(expr.column_name), dictionary)
+        raise NotVectorizable(expr.column_name)
+
+    def _operand(self, value, kind: str):
+        """Converts one side of a comparison to something NumPy compares like Python."""
+        if isinstance(value, _Column):
+            if value.kind != kind:
+                raise NotVectorizable("mixed column kinds")
+            return value.values
+        if kind == KIND_STR and isinstance(value, str):
+            return value.encode("utf-8")
+        if kind == KIND_NUM and isinstance(value, (bool, int, float)):
+            return value
+        raise NotVectorizable(type(value).__name__)
+
+    def _compare(self, op, left, right):
+        column = left if isinstance(left, _Column) else right
+        if not isinstance(column, _Column):
+            return op(left, right)  # constant vs constant
+        if column.kind == KIND_DICT:
+            return self._compare_codes(op, left, right)
+        return op(self._operand(left, column.kind), self._operand(right, column.kind))
+
+    @staticmethod
+    def _compare_codes(op, left, right):
+        """Dictionary column vs string constant, evaluated once per distinct value."""
+        column, constant = (left, right) if isinstance(left, _Column) else (right, left)
+        if isinstance(constant, _Column) or not isinstance(constant, str):
+            raise NotVectorizable("dictionary column")
+        if op in (operator.eq, operator.ne):
+            code = column.dictionary.lookup(constant)
+            if code is None:  # no row holds the constant
+                return np.full(len(column.values), op is operator.ne)
+            return op(column.values, code)
+        # ordering: compare each dictionary entry once, then look the codes up
+        values = column.dictionary.values
+        if column is left:
+            table = np.array([op(value, constant) for value in values], dtype=bool)
+        else:
+            table = np.array([op(constant, value) for value in values], dtype=bool)
+        return table[column.values]
+
+    def visit_orcondition(self, condition: OrCondition):
+        left = condition.and_condition.accept(self)
+        if condition.or_condition is None:
+            return left
+        return np.logical_or(left, condition.or_condition.accept(self))
+
+    def visit_andcondition(self, condition: AndCondition):
+        left = condition.not_condition.accept(self)
+        if condition.and_condition is None:
+            return left
+        return np.logical_and(left, condition.and_condition.accept(self))
+
+    def visit_notcondition(self, condition: NotCondition):
+        value = condition.primary_condition.accept(self)
+        return np.logical_not(value) if condition.is_not else value
+
+    def visit_constantcondition(self, condition: ConstantCondition):
+        return condition.bool_constant.accept(self)
+
+    def visit_simplecomparison(self, condition: SimpleComparison):
+        op = _COMPARATORS.get(condition.operator)
+        if op is None:
+            raise ValueError(f"Unsupported operator: {condition.operator}")
+        return self._compare(
+            op,
+            condition.left_expression.accept(self),
+            condition.right_expression.accept(self),
+        )
+
+    def visit_betweencomparison(self, condition: BetweenComparison):
+        value = condition.left_expression.accept(self)
+        lower = self._compare(operator.le, condition.lower_bound.accept(self), value)
+        upper = self._compare(operator.le, value, condition.upper_bound.accept(self))
+        return np.logical_and(lower, upper)
+
+    def visit_primarycondition(self, condition: PrimaryCondition):
+        return condition.condition.accept(self)
+
+    def visit_wherestatement(self, st: WhereStatement):
+        return st.or_condition.accept(self)
+
+
+# endregion
+
+
+# region WherePredicate
+class WherePredicate:
+    """Picklable WHERE filter that a parallel scan worker runs over its slot ranges."""
+
+    def __init__(self, where: WhereStatement):
+        self.where = where
+
+    def __call__(self, heapfile: HeapFile, ranges, columns, limit) -> list:
+        cursor = RunVisitor()._range_records(heapfile, self.where, columns, ranges)
+        return list(islice(cursor, limit))
+
+
+# endregion
+
+
+# region WhereZoneVisitor
+class WhereZoneVisitor:
+    """Evaluates a WHERE condition to a "may match" mask over zone-map blocks.
+
+    Column-vs-constant comparisons on zone-mapped columns are checked against
+    each block's [min, max]; everything else (other columns, NOT, column vs
+    column) is treated as "may match", so a False block never has a match.
+    """
+
+    _UNKNOWN = object()
+
+    def __init__(self, zones):
+        self.zones = zones
+
+    @staticmethod
+    def as_mask(value, size: int) -> np.ndarray:
+        return WhereMaskVisitor.as_mask(value, size)
+
+    def _all(self) -> np.ndarray:
+        return np.ones(self.zones.n_blocks, dtype=bool)
+
+    def generic_visit(self, node):
+        return self._UNKNOWN
+
+    def visit_intexpression(self, expr: IntExpression):
+        return expr.value
+
+    def visit_floatexpression(self, expr: FloatExpression):
+        return expr.value
+
+    def visit_stringexpression(self, expr: StringExpression):
+        return expr.value
+
+    def visit_boolexpression(self, expr: BoolExpression):
+        return expr.value
+
+    def visit_columnexpression(self, expr: ColumnExpression):
+        if expr.table_name or not self.zones.has_column(expr.column_name):
+            return self._UNKNOWN
+        return expr
+
+    def _range(self, column, lo=None, hi=None, lo_open=False, hi_open=False):
+        bounds = [b for b in (lo, hi) if b is not None]
+        if not isinstance(column, ColumnExpression) or not all(
+            isinstance(b, (int, float)) for b in bounds
+        ):
+            return self._all()
+        return self.zones.overlaps(column.column_name, lo, hi, lo_open, hi_open)
+
+    def visit_orcondition(self, condition: OrCondition):
+        left = condition.and_condition.accept(self)
+        if condition.or_condition is None:
+            return left
+        return np.logical_or(left, condition.or_condition.accept(self))
+
+    def visit_andcondition(self, condition: AndCondition):
+        left = condition.not_condition.accept(self)
+        if condition.and_condition is None:
+            return left
+        return np.logical_and(left, condition.and_condition.accept(self))
+
+    def visit_notcondition(self, condition: NotCondition):
+        if condition.is_not:
+            return self._all()  # a block range can't be negated
+        return condition.primary_condition.accept(self)
+
+    def visit_constantcondition(self, condition: ConstantCondition):
+        return condition.bool_constant.accept(self)
+
+    def visit_simplecomparison(self, condition: SimpleComparison):
+        left = condition.left_expression.accept(self)
+        right = condition.right_expression.accept(self)
+        op = condition.operator
+        if not isinstance(left, ColumnExpression):
+            # constant <op> column -> column <flipped op> constant
+            left, right = right, left
+            op = {
+                OperationType.LESS_THAN: OperationType.GREATER_THAN,
+                OperationType.LESS__EQUAL: OperationType.GREATER__EQUAL,
+                OperationType.GREATER_THAN: OperationType.LESS_THAN,
+                OperationType.GREATER__EQUAL: OperationType.LESS__EQUAL,
+            }.get(op, op)
+        match op:
+            case OperationType.EQUAL:
+                return self._range(left, right, right)
+            case OperationType.LESS_THAN:
+                return self._range(left, hi=right, hi_open=True)
+            case OperationType.LESS__EQUAL:
+                return self._range(left, hi=right)
+            case OperationType.GREATER_THAN:
+                return self._range(left, lo=right, lo_open=True)
+            case OperationType.GREATER__EQUAL:
+                return self._range(left, lo=right)
+            case _:
+                return self._all()
+
+    def visit_betweencomparison(self, condition: BetweenComparison):
+        return self._range(
+            condition.left_expression.accept(self),
+            condition.lower_bound.accept(self),
+            condition.upper_bound.accept(self),
+        )
+
+    def visit_primarycondition(self, condition: PrimaryCondition):
+        return condition.condition.accept(self)
+
+    def visit_wherestatement(self, st: WhereStatement):
+        return st.or_condition.accept(self)
+
+
+# endregion
+
+
 # region PrintVisitor
 
 
@@ -538,14 +911,19 @@ class PrintVisitor(Visitor):
                 column_def = f"{column.column_name} {column.column_type}{' PRIMARY KEY' if column.is_pk else ''}"
                 if column.column_type == ColumnType.VARCHAR:
                     column_def += f"({column.varchar_length})"
+                if column.encoding == "dict":
+                    column_def += " USING DICTIONARY"
                 self.print_line(
                     f"{column_def}{',' if column != st.columns[-1] else ''}"
                 )
-        self.print_line(");")
+        self.print_line(");" if st.storage == "heap" else f") USING {st.storage.upper()};")
 
     def visit_droptablestatement(self, statement: DropTableStatement):
         self.print_line(f"DROP TABLE {statement.table_name}")
 
+    def visit_vacuumstatement(self, st: VacuumStatement):
+        self.print_line(f"VACUUM {st.table_name};")
+
     def visit_createindexstatement(self, st: CreateIndexStatement):
         self.print_line(
             f"CREATE INDEX ON {st.table_name}({st.column_name}) USING {st.index_type};"
@@ -6,6 +6,7 @@ from statement import (
     Program,
     CreateTableStatement,
     DropTableStatement,
+    VacuumStatement,
     CreateIndexStatement,
     DropIndexStatement,
     CreateColumnDefinition,
@@ -152,8 +153,19 @@ class Parser:
             is_pk = True
 
         # TODO: allow for index usage in CREATE TABLE
+        encoding = None
+        if self.match(TokenType.USING):
+            if not self.match(TokenType.DICTIONARY):
+                raise SyntaxError(
+                    f"Expected column encoding (DICTIONARY) after USING, found {self.curr.text}"
+                )
+            if column_type != ColumnType.VARCHAR:
+                raise SyntaxError(
+                    f"DICTIONARY encoding is only supported for VARCHAR columns, found {column_type} for column {column_name}"
+                )
+            encoding = "dict"
 
-        return CreateColumnDefinition(column_name, column_type, varchar_length, is_pk)
+        return CreateColumnDefinition(column_name, column_type, varchar_length, is_pk, encoding)
 
     def parse_column_definition_list(self) -> list[CreateColumnDefinition]:
         self.print_debug("Parsing column definition list")
@@ -186,7 +198,17 @@ class Parser:
             raise SyntaxError(
                 f"Expected ')' after column definitions, found {self.curr.text}"
             )
-        return CreateTableStatement(table_name, columns)
+        storage = "heap"
+        if self.match(TokenType.USING):
+            if self.match(TokenType.COLUMNAR):
+                storage = "columnar"
+            elif self.match(TokenType.SLOTTED):
+                storage = "slotted"
+            else:
+                raise SyntaxError(
+                    f"Expected storage type (COLUMNAR or SLOTTED) after USING, found {self.curr.text}"
+                )
+        return CreateTableStatement(table_name, columns, storage)
 
     def parse_drop_table_statement(self) -> DropTableStatement:
         self.print_debug("Parsing DROP TABLE statement")
@@ -616,6 +638,13 @@ class Parser:
     def parse_delete_statement(self) -> Statement:
         raise NotImplementedError("DELETE statement parsing is not implemented yet")
 
+    def parse_vacuum_statement(self) -> VacuumStatement:
+        self.print_debug("Parsing VACUUM statement")
+        if not self.match(TokenType.USER_IDENTIFIER):
+            raise SyntaxError(f"Expected table name after VACUUM, found {self.curr.text}")
+        table_name = self.prev.text
+        return VacuumStatement(table_name)
+
     def parse_statement(self) -> Statement:
         if self.match(TokenType.CREATE):
             if self.match(TokenType.TABLE):
@@ -643,6 +672,8 @@ class Parser:
             return self.parse_update_statement()
         elif self.match(TokenType.DELETE):
             return self.parse_delete_statement()
+        elif self.match(TokenType.VACUUM):
+            return self.parse_vacuum_statement()
         else:
             raise SyntaxError(
                 f"Expected statement keyword (CREATE, DROP, etc.), found {self.curr.text}"
@@ -723,3 +754,5 @@ if __name__ == "__main__":
             if result.data is not None:
                 print(f"Query Result: {result.data}")
             time.sleep(instruction_delay)
+
+    runVisitor.db.close()